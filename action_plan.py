@@ -0,0 +1,149 @@
+"""
+Action Plan Module
+Compiled voice commands: controller calls (Actions) run as one batch (ActionPlan)
+"""
+
+import threading
+import time
+from concurrent.futures import Future
+from lazy_import import lazy_import
+from app_logging import get_logger
+
+pyautogui = lazy_import("pyautogui")
+logger = get_logger(__name__)
+
+
+class Action:
+    """One controller call, e.g. Action("mouse", "move_cursor", ("up", 200)).
+
+    `target` names a controller in the mapping passed to run() ("mouse",
+    "keyboard", "window", "parser"); `method` may be dotted ("grid.select").
+    If the call returns a Future (a cursor tween) the plan waits for it before
+    the next step, unless wait=False (e.g. a glide, which runs until stopped).
+    `error` is the phrase used in the message when the call raises.
+    """
+
+    __slots__ = ("target", "method", "args", "wait", "error")
+
+    def __init__(self, target, method, args=(), wait=True, error=None):
+        self.target = target
+        self.method = method
+        self.args = tuple(args)
+        self.wait = wait
+        self.error = error or f"running {target}.{method}"
+
+    def resolve(self, targets):
+        """Bound method for this action, or None if its controller isn't available."""
+        obj = targets.get(self.target)
+        if obj is None:
+            return None
+        for name in self.method.split("."):
+            obj = getattr(obj, name)
+        return obj
+
+    def run(self, targets):
+        fn = self.resolve(targets)
+        return fn(*self.args) if fn is not None else None
+
+    def to_list(self):
+        """Compact JSON-able form: [target, method, args] (+ [false] for no-wait steps)."""
+        data = [self.target, self.method, list(self.args)]
+        return data if self.wait else data + [False]
+
+    @classmethod
+    def from_list(cls, data):
+        target, method, args = data[:3]
+        return cls(target, method, args, wait=data[3] if len(data) > 3 else True)
+
+    def __eq__(self, other):
+        return isinstance(other, Action) and (
+            (self.target, self.method, self.args, self.wait) == (other.target, other.method, other.args, other.wait)
+        )
+
+    def __repr__(self):
+        args = ", ".join(repr(a) for a in self.args)
+        return f"{self.target}.{self.method}({args})"
+
+
+class ActionPlan:
+    """Ordered Actions compiled from one utterance, run as a single batch.
+
+    The plan is its own scheduler: pyautogui.PAUSE is suspended while it runs
+    and the only delay is `step_pause` between steps (plus waiting for cursor
+    tweens to land). cancel() may be called from any thread; the current step
+    finishes and nothing after it runs. `state`, `index` and `steps` can be
+    inspected while it runs. `timings` holds (step, seconds) for every step
+    that ran, including the wait for its tween but not the pause before it.
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    CANCELLED = "cancelled"
+
+    def __init__(self, steps, text="", step_pause=0.0, on_step=None):
+        self.steps = list(steps)
+        self.text = text
+        self.step_pause = step_pause
+        self.on_step = on_step  # called with each step that ran without error
+        self.state = self.PENDING
+        self.index = 0  # steps finished so far
+        self.errors = []
+        self.timings = []
+        self.compile_s = 0.0  # set by CommandParser.compile_plan
+        self._cancel = threading.Event()
+
+    def __len__(self):
+        return len(self.steps)
+
+    def __iter__(self):
+        return iter(self.steps)
+
+    def describe(self):
+        return [repr(step) for step in self.steps]
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        """Stop before the next step. Returns False if the plan had already finished."""
+        if self.state in (self.DONE, self.CANCELLED):
+            return False
+        self._cancel.set()
+        return True
+
+    def run(self, targets):
+        """Run every step in order on the calling thread."""
+        self.state = self.RUNNING
+        saved_pause = pyautogui.PAUSE
+        pyautogui.PAUSE = 0  # the plan paces itself
+        try:
+            for step in self.steps:
+                if self._cancel.is_set():
+                    break
+                if self.index and self.step_pause and self._cancel.wait(self.step_pause):
+                    break
+                started = time.perf_counter()
+                try:
+                    result = step.run(targets)
+                    if step.wait and isinstance(result, Future):
+                        self._wait_for(result)
+                    if self.on_step is not None:
+                        self.on_step(step)
+                except Exception as e:
+                    self.errors.append((step, e))
+                    logger.error("Error %s: %s", step.error, e)
+                self.timings.append((step, time.perf_counter() - started))
+                self.index += 1
+        finally:
+            pyautogui.PAUSE = saved_pause
+            self.state = self.CANCELLED if self._cancel.is_set() else self.DONE
+        return self
+
+    def _wait_for(self, future):
+        # poll so that cancel() is honoured while a tween is still running
+        while not future.done() and not self._cancel.wait(0.02):
+            pass
+        if future.done() and not future.cancelled():
+            future.result()  # re-raise a failed tween (e.g. pyautogui fail-safe)
@@ -0,0 +1,116 @@
+"""
+App Logging Module
+Central logging: per-module levels, a background queue writer, console and JSON-lines file sinks
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+
+APP_LOGGER = "click_to_talk"
+
+# Records at INFO and above reach whichever handlers exist (setup_logging's, or a
+# test's caplog) even before setup_logging() runs; DEBUG stays off until configured.
+logging.getLogger(APP_LOGGER).setLevel(logging.INFO)
+
+_state_lock = threading.Lock()
+_listener = None
+_queue_handler = None
+
+
+def get_logger(name):
+    """Logger for an app module, e.g. get_logger(__name__) -> "click_to_talk.speech_handler"."""
+    return logging.getLogger(f"{APP_LOGGER}.{name}")
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One compact JSON object per record: time, level, module, thread, message (+ exception)."""
+
+    def format(self, record):
+        entry = {
+            "t": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name.rpartition(".")[2] if record.name.startswith(APP_LOGGER + ".") else record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, separators=(",", ":"))
+
+
+class _ConsoleFormatter(logging.Formatter):
+    """Plain messages for INFO and below (as the old prints read); level-prefixed otherwise."""
+
+    def format(self, record):
+        message = super().format(record)
+        if record.levelno >= logging.WARNING:
+            return f"{record.levelname}: {message}"
+        return message
+
+
+def setup_logging(config):
+    """Route app logging through a queue to a console sink and a rotating JSON-lines file.
+
+    Calling threads only enqueue records; a QueueListener thread does the
+    formatting and I/O, so a slow console (Windows) or disk never stalls the
+    speech or action threads. Safe to call again: the previous setup is replaced.
+    """
+    global _listener, _queue_handler
+    shutdown_logging()
+
+    handlers = []
+    if config.log_console:
+        console = logging.StreamHandler()
+        console.setFormatter(_ConsoleFormatter("%(message)s"))
+        console.setLevel(config.log_console_level)
+        handlers.append(console)
+    if config.log_path:
+        try:
+            directory = os.path.dirname(config.log_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            file_sink = logging.handlers.RotatingFileHandler(
+                config.log_path,
+                maxBytes=config.log_max_bytes,
+                backupCount=config.log_backups,
+                encoding="utf-8",
+                delay=True,  # the file is only created once something is logged
+            )
+            file_sink.setFormatter(JsonLinesFormatter())
+            handlers.append(file_sink)
+        except OSError as e:
+            logging.getLogger(APP_LOGGER).warning("Log file %s unavailable: %s", config.log_path, e)
+
+    app_logger = logging.getLogger(APP_LOGGER)
+    app_logger.setLevel(config.log_level)
+    for module, level in config.log_levels.items():
+        get_logger(module).setLevel(level)
+
+    records = queue.SimpleQueue()
+    with _state_lock:
+        _queue_handler = logging.handlers.QueueHandler(records)
+        _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+        _listener.start()
+        app_logger.addHandler(_queue_handler)
+        app_logger.propagate = False  # the queue is the only path out; no duplicate lastResort output
+    return _listener
+
+
+def shutdown_logging():
+    """Flush queued records and detach the handlers installed by setup_logging()."""
+    global _listener, _queue_handler
+    with _state_lock:
+        listener, handler = _listener, _queue_handler
+        _listener = _queue_handler = None
+    if handler is None:
+        return
+    app_logger = logging.getLogger(APP_LOGGER)
+    app_logger.removeHandler(handler)
+    app_logger.propagate = True
+    listener.stop()  # drains the queue
+    for sink in listener.handlers:
+        sink.close()
@@ -0,0 +1,244 @@
+"""
+Audio Processing Module
+Voice activity detection, noise-floor tracking and the capture ring buffer for mic audio
+"""
+
+import threading
+from collections import deque
+from lazy_import import lazy_import
+
+np = lazy_import("numpy")
+sr = lazy_import("speech_recognition")
+
+
+def frame_features(samples, frame_len, sample_rate=16000, band=(100, 4000)):
+    """Per-frame RMS energy, zero-crossing rate and spectral flatness.
+
+    samples: 1-D int16/float array. Returns three arrays with one value per
+    complete frame (a trailing partial frame is ignored). Flatness is measured
+    over `band` (Hz), where voiced speech has its harmonics.
+    """
+    count = len(samples) // frame_len
+    if count == 0:
+        empty = np.zeros(0)
+        return empty, empty, empty
+    frames = np.asarray(samples[: count * frame_len], dtype=np.float64).reshape(count, frame_len)
+
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (frame_len - 1)
+
+    # flatness = geometric / arithmetic mean of the power spectrum: near 1 for
+    # broadband noise (fans, hiss, clicks), small for the harmonic peaks of speech
+    freqs = np.fft.rfftfreq(frame_len, 1.0 / sample_rate)
+    in_band = (freqs >= band[0]) & (freqs <= band[1])
+    power = np.abs(np.fft.rfft(frames * np.hanning(frame_len), axis=1))[:, in_band] ** 2 + 1e-10
+    flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+    return rms, zcr, flatness
+
+
+def longest_run(mask):
+    """Length of the longest stretch of True values."""
+    if not mask.any():
+        return 0
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return int((ends - starts).max())
+
+
+def frame_rms(samples, frame_len):
+    """RMS energy of each complete frame of a 1-D sample array."""
+    count = len(samples) // frame_len
+    frames = np.asarray(samples[: count * frame_len], dtype=np.float64).reshape(count, frame_len)
+    return np.sqrt(np.mean(frames * frames, axis=1))
+
+
+class NoiseFloorEstimator:
+    """Rolling estimate of the room's noise floor, and the energy threshold derived from it.
+
+    Observations are frame RMS values from audio known (or likely) to be idle:
+    the calibration recording, silent chunks between phrases, and the quietest
+    `noise_quantile` of each captured phrase (the pre-roll and trailing pause
+    around speech, or all of a noise-only phrase). The floor is the median of
+    the last `noise_window` observations, so it follows the room both up and
+    down; the threshold is noise_threshold_ratio times the floor.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self._lock = threading.Lock()
+        self._window = deque(maxlen=config.noise_window)
+        self.floor = None
+        self.threshold = config.energy_threshold  # until something has been measured
+        self.calibrated = False
+        self.updates = 0
+
+    def observe(self, raw, sample_rate, quantile=1.0):
+        """Add the quietest `quantile` of the frames in 16-bit PCM; returns the new threshold."""
+        samples = np.frombuffer(raw, dtype=np.int16)
+        rms = frame_rms(samples, max(2, int(sample_rate * self.config.vad_frame_ms / 1000)))
+        if quantile < 1.0 and len(rms):
+            rms = np.sort(rms)[: max(1, int(len(rms) * quantile))]
+        return self.observe_levels(rms)
+
+    def observe_levels(self, levels):
+        with self._lock:
+            self._window.extend(float(level) for level in levels)
+            if self._window:
+                cfg = self.config
+                self.floor = float(np.median(self._window))
+                self.threshold = float(
+                    np.clip(self.floor * cfg.noise_threshold_ratio, cfg.noise_min_threshold, cfg.noise_max_threshold)
+                )
+                self.updates += 1
+            return self.threshold
+
+    def stats(self):
+        with self._lock:
+            return {
+                "threshold": self.threshold,
+                "noise_floor": self.floor,
+                "calibrated": self.calibrated,
+                "updates": self.updates,
+            }
+
+
+class VoiceActivityDetector:
+    """Drops phrases with no speech in them and trims silence around the rest.
+
+    A frame counts as speech when it is loud relative to the phrase's own
+    quietest frames (and above an absolute floor), tonal (low spectral
+    flatness) and not hiss-like (low zero-crossing rate). A phrase is kept only
+    if it has at least vad_min_speech_ms of consecutive speech frames, which
+    rules out keyboard clicks and other short transients.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self._lock = threading.Lock()
+        self.segments = 0
+        self.dropped = 0
+        self.trimmed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def speech_mask(self, samples, sample_rate):
+        cfg = self.config
+        frame_len = max(2, int(sample_rate * cfg.vad_frame_ms / 1000))
+        rms, zcr, flatness = frame_features(samples, frame_len, sample_rate)
+        if len(rms) == 0:
+            return rms.astype(bool), frame_len
+        # relative to the quietest frames: steady noise never rises far above its own floor,
+        # while speech (even a phrase cut off mid-sentence) dips between syllables
+        floor = np.percentile(rms, 10)
+        threshold = max(cfg.vad_min_rms, floor * cfg.vad_energy_ratio)
+        mask = (rms >= threshold) & (flatness <= cfg.vad_flatness_max) & (zcr <= cfg.vad_zcr_max)
+        return mask, frame_len
+
+    def speech_bounds(self, samples, sample_rate):
+        """(first, last) sample of the speech plus vad_padding_ms either side, or None if there is no speech."""
+        cfg = self.config
+        mask, frame_len = self.speech_mask(samples, sample_rate)
+        frame_ms = 1000.0 * frame_len / sample_rate
+        if longest_run(mask) * frame_ms < cfg.vad_min_speech_ms:
+            return None
+        voiced = np.flatnonzero(mask)
+        pad = int(cfg.vad_padding_ms / frame_ms)
+        return max(0, voiced[0] - pad) * frame_len, min(len(samples), (voiced[-1] + 1 + pad) * frame_len)
+
+    def process(self, audio):
+        """Return the trimmed AudioData, or None if it holds no speech."""
+        raw = audio.frame_data
+        width = audio.sample_width
+        samples = np.frombuffer(audio.get_raw_data(convert_width=2), dtype=np.int16)
+        bounds = self.speech_bounds(samples, audio.sample_rate)
+        if bounds is None:
+            self._count(len(raw), 0)
+            return None
+
+        first, last = bounds
+        if first == 0 and last >= len(samples):
+            self._count(len(raw), len(raw))
+            return audio
+        trimmed = raw[first * width:last * width]
+        self._count(len(raw), len(trimmed))
+        return sr.AudioData(trimmed, audio.sample_rate, width)
+
+    def _count(self, bytes_in, bytes_out):
+        with self._lock:
+            self.segments += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            if bytes_out == 0:
+                self.dropped += 1
+            elif bytes_out < bytes_in:
+                self.trimmed += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "segments": self.segments,
+                "dropped": self.dropped,
+                "trimmed": self.trimmed,
+                "bytes_in": self.bytes_in,
+                "bytes_saved": self.bytes_in - self.bytes_out,
+            }
+
+
+class AudioRingBuffer:
+    """Fixed-size ring of raw PCM that the mic is written into continuously.
+
+    The storage is one preallocated bytearray of twice the capacity: every
+    chunk is written at its place and again one capacity further on, so any
+    span of up to `capacity` bytes is contiguous and segment() returns a
+    memoryview into it rather than a copy. Positions are byte counts since
+    the buffer was created; a span can be read while it is still within the
+    last `capacity` bytes written.
+    """
+
+    def __init__(self, capacity, sample_rate=16000, sample_width=2):
+        self.capacity = capacity - capacity % sample_width  # whole samples only
+        if self.capacity <= 0:
+            raise ValueError("ring buffer capacity must hold at least one sample")
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self._data = memoryview(bytearray(2 * self.capacity))
+        self.written = 0
+
+    @classmethod
+    def for_audio(cls, seconds, sample_rate, sample_width):
+        """A ring holding `seconds` of audio in the given format."""
+        return cls(max(1, int(seconds * sample_rate)) * sample_width, sample_rate, sample_width)
+
+    @property
+    def oldest(self):
+        """Position of the oldest byte still held."""
+        return max(0, self.written - self.capacity)
+
+    def write(self, chunk):
+        view = memoryview(chunk).cast("B")
+        if len(view) > self.capacity:  # only the newest capacity bytes can be kept
+            self.written += len(view) - self.capacity
+            view = view[-self.capacity:]
+        n = len(view)
+        start = self.written % self.capacity
+        head = min(n, self.capacity - start)
+        for offset in (start, start + self.capacity):
+            self._data[offset:offset + head] = view[:head]
+        if head < n:  # wrapped: the rest goes to the front of both halves
+            for offset in (0, self.capacity):
+                self._data[offset:offset + n - head] = view[head:]
+        self.written += n
+
+    def holds(self, start):
+        """Whether the bytes from `start` on have not been overwritten yet."""
+        return start >= self.oldest
+
+    def segment(self, start, end):
+        """Zero-copy memoryview of the bytes from position `start` up to `end`."""
+        if not self.oldest <= start <= end <= self.written:
+            raise ValueError(f"span {start}-{end} is not in the ring (holds {self.oldest}-{self.written})")
+        offset = start % self.capacity
+        return self._data[offset:offset + end - start]
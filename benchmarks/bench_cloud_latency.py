@@ -0,0 +1,81 @@
+"""
+Cloud request latency benchmark
+Per-phrase latency over a local stand-in for the service that now and then
+stalls, with a new connection per phrase, with pooled keep-alive connections,
+and with pooled connections plus a hedged second request
+
+One request in eight takes SLOW_S to answer and the rest FAST_S, so the p95
+column shows what hedging does to the tail. On 127.0.0.1 connecting costs
+next to nothing; against the real service each new connection adds DNS, TCP
+and TLS round trips, which the "connect ms" column would show.
+
+Run from the repository root:
+    python benchmarks/bench_cloud_latency.py [phrases]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import speech_recognition as sr
+
+from cloud_client import CloudRecognizer
+from config import Config
+from replay_harness import LocalRecognitionServer
+
+FAST_S = 0.08
+SLOW_S = 1.2
+SETUPS = (
+    # name, cloud_idle_s, cloud_attempts, cloud_hedge_after_s
+    ("new connection", 0.0, 1, 0.0),
+    ("keep-alive", 50.0, 1, 0.0),
+    ("keep-alive+hedge", 50.0, 2, 0.25),
+)
+
+
+def phrase(rate=16000):
+    rng = np.random.default_rng(0)
+    t = np.arange(int(rate * 0.6)) / rate
+    tone = np.sin(2 * np.pi * 140 * t) * 0.5 * (1 - np.cos(2 * np.pi * 3 * t)) * 3000
+    samples = np.concatenate([rng.normal(0, 30, rate // 4), tone, rng.normal(0, 30, rate // 4)])
+    return sr.AudioData(np.clip(samples, -32768, 32767).astype(np.int16).tobytes(), rate, 2)
+
+
+def measure(audio, phrases, idle_s, attempts, hedge_after_s):
+    rng = random.Random(3)
+    delays = [SLOW_S if rng.random() < 1 / 8 else FAST_S for _ in range(phrases * attempts)]
+    config = Config()
+    config.cloud_idle_s = idle_s
+    config.cloud_attempts = attempts
+    config.cloud_hedge_after_s = hedge_after_s
+    latencies = []
+    with LocalRecognitionServer(["click"], delay_s=delays) as server:
+        config.cloud_url = server.url
+        client = CloudRecognizer(config)
+        for _ in range(phrases):
+            started = time.perf_counter()
+            client.recognize(audio)
+            latencies.append((time.perf_counter() - started) * 1000)
+        client.close()
+    return np.array(latencies), client.stats()
+
+
+def main(phrases=40):
+    audio = phrase()
+    print(f"{'setup':>17} {'p50 ms':>7} {'p95 ms':>7} {'max ms':>7} {'connect ms':>11} {'opened':>7} {'hedged':>7}")
+    for name, idle_s, attempts, hedge_after_s in SETUPS:
+        latencies, stats = measure(audio, phrases, idle_s, attempts, hedge_after_s)
+        print(
+            f"{name:>17} {np.percentile(latencies, 50):>7.0f} {np.percentile(latencies, 95):>7.0f}"
+            f" {latencies.max():>7.0f} {stats['connect_ms'] / stats['requests']:>11.2f}"
+            f" {stats['connections']['opened']:>7} {stats['hedged']:>7}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 40))
@@ -0,0 +1,101 @@
+"""
+Dispatch micro-benchmark
+Compares CommandParser's compiled dispatch table with the old if/elif chain
+
+Run from the repository root:
+    python benchmarks/bench_dispatch.py [iterations]
+"""
+
+import contextlib
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from command_parser import (
+    CommandParser, FIND_PHRASES, MAXIMIZE_PHRASES, MINIMIZE_PHRASES, NAVIGATION_TRIGGERS, PRESS_TRIGGERS,
+    SHORTCUTS, TYPING_TRIGGERS,
+)
+from config import Config
+
+UTTERANCES = [
+    "click", "right click", "double click", "move up", "move right 100", "left",
+    "scroll down", "scroll up", "wheel down", "show position", "where is it",
+    "find my cursor", "hide panel", "show controls", "open gmail", "go to youtube",
+    "type hello world", "press enter", "hit escape", "new tab", "refresh",
+    "previous tab", "blah blah", "what time is it",
+]
+
+
+def _is_movement_command(text):
+    if text.startswith(("move", "go")):
+        return True
+    has_directional = any(keyword in text for keyword in ("up", "down", "left", "right"))
+    return has_directional and "scroll" not in text
+
+
+def _is_click_command(text):
+    return any(keyword in text for keyword in ("click", "tap"))
+
+
+def _is_scroll_command(text):
+    return any(keyword in text for keyword in ("scroll", "wheel"))
+
+
+def legacy_dispatch(parser, text):
+    """The pre-dispatch-table chain and its keyword checks, reduced to classification (no side effects)."""
+    if any(k in text.lower() for k in FIND_PHRASES):
+        return "find"
+    if any(k in text for k in MINIMIZE_PHRASES):
+        return "minimize"
+    if any(k in text for k in MAXIMIZE_PHRASES):
+        return "maximize"
+    if text.startswith(NAVIGATION_TRIGGERS):
+        return "navigate"
+    if text.startswith(TYPING_TRIGGERS):
+        return "type"
+    if text.startswith(PRESS_TRIGGERS):
+        return "press"
+    if text in SHORTCUTS:
+        return "shortcut"
+    if _is_click_command(text):
+        return "click"
+    if _is_movement_command(text):
+        return "move"
+    if _is_scroll_command(text):
+        return "scroll"
+    if "position" in text or "where" in text:
+        return "position"
+    return None
+
+
+def compiled_dispatch(parser, text):
+    spec = parser.match_command(text)
+    return spec.name if spec else None
+
+
+def main(iterations=2000):
+    parser = CommandParser(Config())
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        mismatches = [t for t in UTTERANCES if legacy_dispatch(parser, t) != compiled_dispatch(parser, t)]
+        results = {}
+        for label, fn in (("legacy chain", legacy_dispatch), ("compiled table", compiled_dispatch)):
+            elapsed = min(timeit.repeat(
+                lambda: [fn(parser, t) for t in UTTERANCES], number=iterations, repeat=5
+            ))
+            results[label] = elapsed / (iterations * len(UTTERANCES)) * 1e6
+
+    print(f"{len(UTTERANCES)} utterances x {iterations} iterations (best of 5)")
+    for label, usec in results.items():
+        print(f"  {label:<15} {usec:7.2f} us/utterance")
+    print(f"  speedup         {results['legacy chain'] / results['compiled table']:7.2f}x")
+    if mismatches:
+        print(f"  classification differs for: {mismatches}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
@@ -0,0 +1,66 @@
+"""
+Fuzzy matching benchmark
+Lookup cost of FuzzyIndex against vocabulary size, for near-misses and for unrelated text
+
+The vocabulary is the parser's own command phrases padded with made-up site
+aliases ("open <name>"), so the larger sizes stand for users with many aliases
+or macros.
+
+Run from the repository root:
+    python benchmarks/bench_fuzzy.py [iterations]
+"""
+
+import os
+import random
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from command_parser import CommandParser
+from config import Config
+from fuzzy_match import FuzzyIndex
+
+SIZES = (250, 1000, 5000, 20000)
+NEAR_MISSES = [
+    "scroll dawn", "right clique", "moov left", "dubble click", "new tap",
+    "find my curser", "minimise panel", "sell 5", "opin gmail", "clik",
+]
+UNRELATED = ["what time is it", "blah blah", "turn the music down", "hello there"]
+
+
+def vocabulary(size, seed=7):
+    parser = CommandParser(Config())
+    phrases = sorted({parser.normalize(phrase) for phrase in parser.grammar().phrases})
+    rng = random.Random(seed)
+    syllables = ["ka", "lo", "mi", "ne", "ru", "sa", "to", "vi", "ze", "bo", "pe", "du"]
+    while len(phrases) < size:
+        name = "".join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))
+        phrases.append(f"open {name}")
+    return phrases[:size]
+
+
+def main(iterations=200):
+    print(f"{'phrases':>8} {'build ms':>9} {'near-miss us':>13} {'unrelated us':>13} {'resolved':>9}")
+    for size in SIZES:
+        phrases = vocabulary(size)
+        started = time.perf_counter()
+        index = FuzzyIndex(phrases)
+        build_ms = (time.perf_counter() - started) * 1000
+        timings = {}
+        for label, queries in (("near", NEAR_MISSES), ("unrelated", UNRELATED)):
+            elapsed = min(timeit.repeat(
+                lambda: [index.match(q) for q in queries], number=iterations, repeat=3
+            ))
+            timings[label] = elapsed / (iterations * len(queries)) * 1e6
+        resolved = sum(index.match(q) is not None for q in NEAR_MISSES)
+        print(
+            f"{size:>8} {build_ms:>9.1f} {timings['near']:>13.1f} {timings['unrelated']:>13.1f}"
+            f" {resolved:>5}/{len(NEAR_MISSES)}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200))
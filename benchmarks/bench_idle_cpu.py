@@ -0,0 +1,113 @@
+"""
+Idle CPU benchmark
+Measures how much CPU the panel burns while nobody is using it
+
+Compares the old 50 ms polling loop (update()/geometry()/pointer checks on
+every tick) with the current event-driven ClickToTalkApp.start(). Needs a
+display; the app runs a real SpeechHandler on the replay backend whose
+microphone never hears anyone.
+
+Run from the repository root:
+    python benchmarks/bench_idle_cpu.py [seconds]
+"""
+
+import contextlib
+import os
+import sys
+import threading
+import time
+import tkinter as tk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import speech_recognition as sr
+
+import main
+from command_parser import CommandParser
+from config import Config
+from speech_handler import SpeechHandler
+
+
+def idle_config():
+    """The app's defaults, with the replay backend so nothing loads an engine or opens a connection."""
+    config = Config()
+    config.recognizer_backend = "replay"
+    config.recognizer_fallbacks = []
+    config.noise_calibration_s = 0  # there is no room to measure
+    config.capture_ring_s = 0  # phrases come from listen(), which idle_listen() replaces
+    config.streaming_enabled = False
+    return config
+
+
+def silence_microphone(handler):
+    """Replace the real SpeechHandler's mic with one where nobody ever speaks.
+
+    listen() waits out listen_timeout and raises WaitTimeoutError, as
+    speech_recognition does in a quiet room, so the capture loop keeps running.
+    """
+    handler.microphone = contextlib.nullcontext()
+
+    def idle_listen(source, timeout=None, phrase_time_limit=None):
+        time.sleep(timeout or handler.config.listen_timeout)
+        raise sr.WaitTimeoutError("listening timed out while waiting for phrase to start")
+
+    handler.recognizer.listen = idle_listen
+
+
+def legacy_polling_loop(seconds):
+    """The removed main loop: poll every 50 ms no matter what, with the same idle speech thread."""
+    config = idle_config()
+    handler = SpeechHandler(config, CommandParser(config), None)  # no command ever reaches the mouse
+    silence_microphone(handler)
+    threading.Thread(target=handler.start_listening, daemon=True).start()
+    root = tk.Tk()
+    root.overrideredirect(True)
+    root.geometry("500x700+100+100")
+    status_var = tk.StringVar(value="Status: stopped")
+    tk.Label(root, textvariable=status_var).pack()
+
+    start = time.process_time()
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        root.update_idletasks()
+        root.update()
+        g = root.geometry()
+        size, pos = g.split("+", 1)
+        x_str, y_str = pos.split("+")
+        px, py = root.winfo_pointerx(), root.winfo_pointery()
+        _ = (int(x_str) <= px <= int(x_str) + 500) and (int(y_str) <= py <= int(y_str) + 700)
+        status_var.set("Status: stopped")
+        time.sleep(0.05)
+    used = time.process_time() - start
+    handler.stop_listening()
+    root.destroy()
+    return used
+
+
+def event_driven_app(seconds):
+    """Run the real app and ask it to stop from another thread, as the speech thread would."""
+    app = main.ClickToTalkApp(idle_config())
+    silence_microphone(app.speech_handler)
+    threading.Timer(seconds, app.stop).start()
+    start = time.process_time()
+    app.start()
+    return time.process_time() - start
+
+
+def main_cli(seconds=10.0):
+    try:
+        results = {
+            "legacy 50 ms polling": legacy_polling_loop(seconds),
+            "event-driven mainloop": event_driven_app(seconds),
+        }
+    except tk.TclError as e:
+        print(f"Needs a display ({e}); on a headless machine use: xvfb-run -a python benchmarks/bench_idle_cpu.py")
+        return 1
+    print(f"CPU time over {seconds:.0f} s of idle panel")
+    for label, used in results.items():
+        print(f"  {label:<22} {used * 1000:8.1f} ms  ({used / seconds * 100:5.2f}% of one core)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli(float(sys.argv[1]) if len(sys.argv) > 1 else 10.0))
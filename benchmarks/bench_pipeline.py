@@ -0,0 +1,131 @@
+"""
+Pipeline benchmark
+Replays scripted sessions through SpeechHandler and CommandParser (no mic, no real I/O)
+and writes a JSON report that can be compared with one from another version
+
+Scenarios: a 1,000-command parse storm, recording and replaying a macro, and
+mixed navigation (browser, typing, shortcuts, grid). Recognition is the
+"replay" backend and plan_step_pause is 0, so the numbers are the app's own
+overhead from a captured phrase to its last action.
+
+Run from the repository root:
+    python benchmarks/bench_pipeline.py [--output report.json] [--compare old.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import Config
+from replay_harness import ReplayHarness
+
+STORM_COMMANDS = [
+    "move up", "move right 100", "left", "down 200", "click", "right click", "double click",
+    "scroll down", "scroll up", "press enter", "hit escape", "new tab", "refresh",
+    "type hello world", "show position", "grid", "cell 5", "close grid",
+]
+
+MACRO_SCRIPT = [
+    "start recording", "move up 100", "click", "type hello", "press enter", "scroll down",
+    "save as bench",
+] + ["run bench"] * 50
+
+NAVIGATION_SCRIPT = [
+    "open gmail", "new tab", "go to youtube", "type lecture notes", "press enter",
+    "scroll down", "scroll down", "grid", "cell 3", "cell 7", "click", "previous tab",
+    "move left 200", "move down then click", "find my cursor", "close tab",
+] * 10
+
+
+def scenarios(storm_size):
+    return {
+        "parse_storm": [STORM_COMMANDS[i % len(STORM_COMMANDS)] for i in range(storm_size)],
+        "macro_replay": MACRO_SCRIPT,
+        "mixed_navigation": NAVIGATION_SCRIPT,
+    }
+
+
+def version():
+    """`git describe` of the tree being measured, or "unknown" outside a checkout."""
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(storm_size=1000):
+    results = {}
+    for name, script in scenarios(storm_size).items():
+        with tempfile.TemporaryDirectory() as tmp:
+            config = Config()
+            config.macro_path = os.path.join(tmp, "macros.jsonl")
+            config.plan_step_pause = 0
+            results[name] = ReplayHarness(config).run_transcripts(script)
+    return {
+        "version": version(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scenarios": results,
+    }
+
+
+def compare(report, baseline, tolerance):
+    """Print throughput and p95 response changes; returns the scenarios that got slower than `tolerance`."""
+    regressions = []
+    print(f"vs {baseline.get('version', '?')}:")
+    for name, result in report["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if not old:
+            continue
+        rate, old_rate = result["commands_per_s"], old["commands_per_s"]
+        p95 = result["latency"]["response"]["p95"]
+        old_p95 = old["latency"]["response"]["p95"]
+        print(f"  {name:<17} {old_rate:>9.1f} -> {rate:>9.1f} cmd/s | p95 {old_p95:.2f} -> {p95:.2f} ms")
+        if rate < old_rate * (1 - tolerance):
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="earlier JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed throughput loss (0.2 = 20%%)")
+    parser.add_argument("--storm", type=int, default=1000, help="commands in the parse storm")
+    args = parser.parse_args(argv)
+
+    report = run(args.storm)
+    for name, result in report["scenarios"].items():
+        response = result["latency"]["response"]
+        print(
+            f"{name:<17} {result['executed']:>5} commands {result['actions']:>5} actions"
+            f" {result['commands_per_s']:>9.1f} cmd/s"
+            f" | response p50 {response['p50']:.2f} p95 {response['p95']:.2f} p99 {response['p99']:.2f} ms"
+        )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print(f"  slower than allowed: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
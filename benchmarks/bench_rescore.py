@@ -0,0 +1,61 @@
+"""
+N-best rescoring benchmark
+Cost of picking the best of a recognizer's alternatives against alias table size
+
+Each size adds that many made-up site aliases to the config, so the command
+vocabulary grows with it. "first ms" includes building the vocabulary, which
+happens once per change of keywords, aliases or macros.
+
+Run from the repository root:
+    python benchmarks/bench_rescore.py [iterations]
+"""
+
+import os
+import random
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from command_parser import CommandParser
+from config import Config
+from hypothesis_rescorer import HypothesisRescorer
+
+SIZES = (0, 1000, 5000, 20000)
+NBEST_LISTS = [
+    ["scroll dawn", "scroll down", "scroll town", "scroll dune", "scroll done"],
+    ["moo flat", "move left", "move lift", "moved left", "move laughed"],
+    ["click", "clique", "click it", "cliq", "clicks"],
+    ["type hello world", "tie pillow world", "type hollow world", "type hello word", "tight hello world"],
+]
+
+
+def make_parser(aliases, seed=7):
+    config = Config()
+    rng = random.Random(seed)
+    syllables = ["ka", "lo", "mi", "ne", "ru", "sa", "to", "vi", "ze", "bo", "pe", "du"]
+    while len(config.site_aliases) < aliases:
+        name = "".join(rng.choice(syllables) for _ in range(rng.randint(2, 4)))
+        config.site_aliases.setdefault(name, f"https://{name}.example")
+    return CommandParser(config)
+
+
+def main(iterations=500):
+    print(f"{'aliases':>8} {'first ms':>9} {'per list us':>12} {'reranked':>9}")
+    for size in SIZES:
+        rescorer = HypothesisRescorer(make_parser(size))
+        started = time.perf_counter()
+        rescorer.best(NBEST_LISTS[0])
+        first_ms = (time.perf_counter() - started) * 1000
+        elapsed = min(timeit.repeat(
+            lambda: [rescorer.best(alternatives) for alternatives in NBEST_LISTS], number=iterations, repeat=3
+        ))
+        per_list = elapsed / (iterations * len(NBEST_LISTS)) * 1e6
+        reranked = sum(rescorer.best(alternatives)[0] > 0 for alternatives in NBEST_LISTS)
+        print(f"{size:>8} {first_ms:>9.1f} {per_list:>12.1f} {reranked:>5}/{len(NBEST_LISTS)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 500))
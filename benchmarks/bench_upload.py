@@ -0,0 +1,71 @@
+"""
+Cloud upload benchmark
+Bytes sent and request time per phrase, full-rate FLAC (what recognize_google uploads)
+against the trimmed 16 kHz upload, over a throttled local stand-in for the service
+
+The phrase is 3 s captured at 48 kHz with 0.6 s of speech in it, about what a
+short command sent with the default phrase_time_limit looks like.
+
+Run from the repository root:
+    python benchmarks/bench_upload.py [repeats]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import speech_recognition as sr
+
+from cloud_client import CloudRecognizer
+from config import Config
+from replay_harness import LocalRecognitionServer
+
+UPLINKS = (64_000, 256_000, 1_000_000)  # bytes per second
+SERVICE_S = 0.1  # the stand-in's "recognition" time
+
+
+def phrase(rate=48000):
+    rng = np.random.default_rng(0)
+    t = np.arange(int(rate * 0.6)) / rate
+    tone = sum(np.sin(2 * np.pi * 140 * k * t) / k for k in range(1, 12)) * 0.5 * (1 - np.cos(2 * np.pi * 3 * t)) * 3000
+    samples = np.concatenate([rng.normal(0, 30, rate // 2), tone, rng.normal(0, 30, int(rate * 1.9))])
+    return sr.AudioData(np.clip(samples, -32768, 32767).astype(np.int16).tobytes(), rate, 2)
+
+
+def measure(audio, uplink, preprocess, repeats):
+    config = Config()
+    config.vad_enabled = False
+    if not preprocess:
+        config.cloud_sample_rate = 0
+        config.cloud_trim_silence = False
+    with LocalRecognitionServer(["click"], upload_bytes_per_s=uplink, delay_s=SERVICE_S) as server:
+        config.cloud_url = server.url
+        client = CloudRecognizer(config)
+        best = None
+        for _ in range(repeats):
+            started = time.perf_counter()
+            client.recognize(audio)
+            elapsed = (time.perf_counter() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+    return client.last, best
+
+
+def main(repeats=3):
+    audio = phrase()
+    print(f"{'uplink KB/s':>11} {'full bytes':>10} {'sent bytes':>10} {'full ms':>8} {'sent ms':>8}"
+          f" {'saved ms':>9} {'estimated':>10}")
+    for uplink in UPLINKS:
+        full, full_ms = measure(audio, uplink, False, repeats)
+        sent, sent_ms = measure(audio, uplink, True, repeats)
+        print(
+            f"{uplink // 1000:>11} {full['bytes_sent']:>10} {sent['bytes_sent']:>10} {full_ms:>8.0f} {sent_ms:>8.0f}"
+            f" {full_ms - sent_ms:>9.0f} {sent['saved_ms']:>10.0f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 3))
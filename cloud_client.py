@@ -0,0 +1,412 @@
+"""
+Cloud Client Module
+Uploads phrases to the cloud speech service in the most compact form it accepts
+(silence trimmed, 16 kHz, FLAC) over pooled keep-alive connections, hedging slow
+requests, and reports where each request's time went
+"""
+
+import http.client
+import json
+import queue
+import threading
+import time
+from collections import namedtuple
+from urllib.parse import urlencode, urlsplit
+from audio_processing import VoiceActivityDetector
+from app_logging import get_logger
+from lazy_import import lazy_import
+
+np = lazy_import("numpy")
+sr = lazy_import("speech_recognition")
+logger = get_logger(__name__)
+
+PreparedUpload = namedtuple("PreparedUpload", "body content_type sample_rate")
+
+CONTENT_TYPES = {"flac": "audio/x-flac", "l16": "audio/l16"}
+
+
+def estimate_flac_bytes(samples, sample_rate, frame_ms=20):
+    """Approximate FLAC size of 16-bit mono samples without running the encoder.
+
+    FLAC stores a prediction residual, Rice-coded at about log2 of its
+    magnitude plus 1.5 bits per sample; the second difference of each
+    20 ms frame stands in for the encoder's predictor. Within ~15% of the
+    reference encoder on speech and room noise.
+    """
+    frame_len = max(2, int(sample_rate * frame_ms / 1000))
+    count = len(samples) // frame_len
+    if count == 0:
+        return len(samples) * 2
+    frames = np.asarray(samples[: count * frame_len], dtype=np.float64).reshape(count, frame_len)
+    residual = np.diff(frames, n=2, axis=1)
+    bits = np.maximum(1.0, np.log2(np.sqrt(np.mean(residual * residual, axis=1)) + 1) + 1.5)
+    return int(frame_len * bits.sum() / 8) + (len(samples) - count * frame_len) * 2
+
+
+class UploadPreprocessor:
+    """Turns captured AudioData into a request body for the cloud recognizer.
+
+    Silence around the speech is trimmed (unless the VAD stage has already
+    done it), the audio is resampled to cloud_sample_rate as 16-bit mono and
+    encoded with cloud_encoding. FLAC is the most compact format Google's web
+    speech API accepts; if no FLAC encoder is available, raw 16-bit PCM
+    ("l16") is sent instead.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.vad = VoiceActivityDetector(config)
+        self.encoding = config.cloud_encoding
+
+    def prepare(self, audio):
+        cfg = self.config
+        rate = audio.sample_rate
+        if cfg.cloud_sample_rate and rate > cfg.cloud_sample_rate:
+            pcm = audio.get_raw_data(convert_rate=cfg.cloud_sample_rate, convert_width=2)
+            rate = cfg.cloud_sample_rate
+        else:
+            pcm = audio.get_raw_data(convert_width=2)
+        if cfg.cloud_trim_silence and not cfg.vad_enabled:  # the VAD stage trims with the same rules
+            bounds = self.vad.speech_bounds(np.frombuffer(pcm, dtype=np.int16), rate)
+            if bounds is not None:  # no speech found: let the service decide
+                pcm = memoryview(pcm)[bounds[0] * 2:bounds[1] * 2]
+
+        body = pcm
+        if self.encoding == "flac":
+            try:
+                body = sr.AudioData(pcm, rate, 2).get_flac_data()
+            except OSError as e:
+                logger.warning("No FLAC encoder (%s); uploading raw 16-bit PCM instead", e)
+                self.encoding = "l16"
+        return PreparedUpload(body, f"{CONTENT_TYPES[self.encoding]}; rate={rate}", rate)
+
+    def unprepared_bytes(self, audio):
+        """Size of the upload without preprocessing: the whole phrase at the mic's rate (FLAC estimated)."""
+        pcm = audio.get_raw_data(convert_width=2)
+        if self.encoding != "flac":
+            return len(pcm)
+        return estimate_flac_bytes(np.frombuffer(pcm, dtype=np.int16), audio.sample_rate)
+
+
+# One answered HTTP request; times in ms
+Exchange = namedtuple("Exchange", "status text connect_ms transfer_ms server_ms total_ms reused")
+
+# What a kept-alive connection the server has meanwhile closed fails with
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    BrokenPipeError,
+    ConnectionAbortedError,
+    ConnectionResetError,
+)
+
+
+class ConnectionPool:
+    """Keep-alive HTTP(S) connections to one host, shared by the recognizer workers.
+
+    A connection goes back to the pool once its response has been read and is
+    handed out again for the next request, so only a new connection pays for
+    DNS, TCP and TLS setup. Connections idle for longer than `idle_s` are
+    closed instead of reused, as servers drop them around then; at most
+    `size` idle connections are kept.
+    """
+
+    def __init__(self, url, size, timeout, idle_s):
+        parts = urlsplit(url)
+        self._connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.host = parts.netloc
+        self.size = size
+        self.timeout = timeout
+        self.idle_s = idle_s
+        self._lock = threading.Lock()
+        self._idle = []  # (connection, monotonic time it was released), most recent last
+        self.opened = 0
+        self.reused = 0
+
+    def acquire(self):
+        """(connection, reused); a new connection is not connected yet."""
+        now = time.monotonic()
+        with self._lock:
+            while self._idle:
+                connection, released = self._idle.pop()
+                if now - released <= self.idle_s:
+                    self.reused += 1
+                    return connection, True
+                connection.close()
+        return self.new_connection(), False
+
+    def new_connection(self):
+        with self._lock:
+            self.opened += 1
+        return self._connection_class(self.host, timeout=self.timeout)
+
+    def release(self, connection):
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append((connection, time.monotonic()))
+                return
+        connection.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            connection.close()
+
+    def stats(self):
+        with self._lock:
+            return {"opened": self.opened, "reused": self.reused, "idle": len(self._idle)}
+
+
+class CloudRecognizer:
+    """Google web speech API client (the request recognize_google makes), with upload
+    preprocessing, keep-alive connections and hedged requests.
+
+    cloud_url can point at any service that speaks the same protocol, such
+    as replay_harness.LocalRecognitionServer. Requests share a ConnectionPool
+    that warm_up() fills at startup. If a phrase has no answer after
+    cloud_hedge_after_s, it is sent again on another connection and the
+    first answer wins; a failed request is retried straight away. Both count
+    towards cloud_attempts, and cloud_timeout bounds the whole wait.
+
+    Each answer is timed as connect (DNS, TCP and TLS; 0 on a reused
+    connection), server (the service's Server-Timing figure or, without one,
+    the wait for the response once the request was written) and transfer
+    (the rest: sending the audio and reading the answer). The bytes the
+    preprocessing saved are estimated while the service works, and the time
+    saved is priced at the transfer rate just measured.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.preprocessor = UploadPreprocessor(config)
+        self.pool = ConnectionPool(config.cloud_url, config.cloud_pool_size, config.cloud_timeout, config.cloud_idle_s)
+        query = urlencode({
+            "client": "chromium",
+            "lang": config.cloud_language,
+            "key": config.cloud_key,
+            "pFilter": 0,
+        })
+        self._path = f"{urlsplit(config.cloud_url).path or '/'}?{query}"
+        self._lock = threading.Lock()
+        self._totals = {
+            "requests": 0, "attempts": 0, "hedged": 0, "retried": 0, "rescued": 0, "failed": 0,
+            "bytes_sent": 0, "bytes_saved": 0,
+            "connect_ms": 0.0, "transfer_ms": 0.0, "server_ms": 0.0, "saved_ms": 0.0,
+        }
+        self.last = None  # the latest answered request's figures (see _record)
+
+    def warm_up(self):
+        """Open cloud_warm_connections connections, each with a short silent request.
+
+        The first phrases then skip DNS, TCP and TLS setup. A failure is only
+        logged, since the service may just be unreachable for now.
+        """
+        count = self.config.cloud_warm_connections
+        if count <= 0:
+            return
+        upload = self.preprocessor.prepare(sr.AudioData(bytes(3200), 16000, 2))  # 0.1 s of silence
+        held = [self.pool.acquire() for _ in range(count)]  # held at once, so each is its own connection
+        errors = []
+
+        def request(connection, reused):
+            try:
+                self._round_trip(connection, reused, upload)
+            except (OSError, http.client.HTTPException) as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=request, args=pair, daemon=True) for pair in held]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            logger.warning("Cloud recognition warm-up failed: %s", errors[0])
+        else:
+            logger.debug("Cloud recognition warmed up %d connection(s)", count)
+
+    def recognize(self, audio):
+        """The first result of the service's response: {"alternative": [{"transcript": ...}, ...], ...}."""
+        upload = self.preprocessor.prepare(audio)
+        exchange, full_bytes = self._send(upload, lambda: self.preprocessor.unprepared_bytes(audio))
+        self._record(upload, full_bytes, exchange)
+        return self.parse_response(exchange.text)
+
+    def _send(self, upload, while_waiting):
+        """Get one answer for `upload`, hedging and retrying as configured.
+
+        Returns (the first Exchange to succeed, what while_waiting() returned;
+        it runs while the first request is out).
+        """
+        cfg = self.config
+        answers = queue.Queue()
+        launched = 0
+
+        def attempt(number):
+            try:
+                answers.put((number, self._exchange(upload)))
+            except sr.RequestError as e:
+                answers.put((number, e))
+
+        def launch():
+            nonlocal launched
+            threading.Thread(target=attempt, args=(launched,), daemon=True).start()
+            launched += 1
+
+        started = time.perf_counter()
+        deadline = started + cfg.cloud_timeout
+        hedge_at = started + cfg.cloud_hedge_after_s if cfg.cloud_hedge_after_s > 0 else None
+        launch()
+        waited_for = while_waiting()
+        finished, hedged, retried, errors = 0, 0, 0, []
+        answer = None
+        while finished < launched:
+            can_launch = launched < cfg.cloud_attempts
+            wake = min(deadline, hedge_at) if can_launch and hedge_at is not None else deadline
+            try:
+                number, result = answers.get(timeout=max(0.0, wake - time.perf_counter()))
+            except queue.Empty:
+                if time.perf_counter() >= deadline:
+                    break
+                if launched >= cfg.cloud_attempts:
+                    continue  # out of attempts: wait for what is in flight
+                launch()  # still no answer: send it again on another connection
+                hedged += 1
+                hedge_at = time.perf_counter() + cfg.cloud_hedge_after_s
+                continue
+            finished += 1
+            if not isinstance(result, sr.RequestError):
+                answer = result
+                break
+            errors.append(str(result))
+            if can_launch and finished == launched and time.perf_counter() < deadline:
+                launch()  # nothing else in flight: retry right away
+                retried += 1
+
+        with self._lock:
+            totals = self._totals
+            totals["attempts"] += launched
+            totals["hedged"] += hedged
+            totals["retried"] += retried
+            if answer is None:
+                totals["failed"] += 1
+            elif number > 0:
+                totals["rescued"] += 1  # answered by a hedge or retry
+        if answer is None:
+            raise sr.RequestError("; ".join(errors) or f"no answer within {cfg.cloud_timeout} s")
+        return answer, waited_for
+
+    def _exchange(self, upload):
+        """One request on a pooled connection; a kept-alive one the server has dropped is replaced once."""
+        connection, reused = self.pool.acquire()
+        try:
+            try:
+                exchange = self._round_trip(connection, reused, upload)
+            except STALE_CONNECTION_ERRORS:
+                if not reused:
+                    raise
+                logger.debug("Kept-alive connection was closed by the server; reconnecting")
+                exchange = self._round_trip(self.pool.new_connection(), False, upload)
+        except (OSError, http.client.HTTPException) as e:
+            raise sr.RequestError(f"recognition connection failed: {e}") from e
+        if exchange.status != 200:
+            raise sr.RequestError(f"recognition request failed: {exchange.status}")
+        return exchange
+
+    def _round_trip(self, connection, reused, upload):
+        started = time.perf_counter()
+        try:
+            if connection.sock is None:
+                connection.connect()
+                connected = time.perf_counter()
+            else:
+                connected = started
+            connection.request("POST", self._path, body=upload.body, headers={"Content-Type": upload.content_type})
+            written = time.perf_counter()
+            response = connection.getresponse()
+            answered = time.perf_counter()
+            text = response.read().decode("utf-8")
+        except BaseException:
+            connection.close()
+            raise
+        done = time.perf_counter()
+        if response.will_close:
+            connection.close()
+        else:
+            self.pool.release(connection)
+
+        header = response.getheader("Server-Timing")
+        server_ms = self.server_time(header) if header else (answered - written) * 1000.0
+        connect_ms = (connected - started) * 1000.0
+        total_ms = (done - started) * 1000.0
+        transfer_ms = max(0.0, total_ms - connect_ms - server_ms)
+        return Exchange(response.status, text, connect_ms, transfer_ms, server_ms, total_ms, reused)
+
+    @staticmethod
+    def server_time(header):
+        """Total of the durations in a Server-Timing header ("recognize;dur=212.5"), in ms."""
+        total = 0.0
+        for metric in (header or "").split(","):
+            for param in metric.split(";")[1:]:
+                name, _, value = param.strip().partition("=")
+                if name == "dur":
+                    try:
+                        total += float(value.strip('"'))
+                    except ValueError:
+                        pass
+        return total
+
+    @staticmethod
+    def parse_response(text):
+        """The first non-empty result; one JSON object per line, usually an empty one first."""
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            results = json.loads(line).get("result") or []
+            if results and results[0].get("alternative"):
+                return results[0]
+        raise sr.UnknownValueError()
+
+    def _record(self, upload, full_bytes, exchange):
+        sent = len(upload.body)
+        saved = max(0, full_bytes - sent)
+        saved_ms = saved * exchange.transfer_ms / sent if sent else 0.0
+        self.last = {
+            "bytes_sent": sent,
+            "bytes_saved": saved,
+            "sample_rate": upload.sample_rate,
+            "reused_connection": exchange.reused,
+            "connect_ms": round(exchange.connect_ms, 3),
+            "transfer_ms": round(exchange.transfer_ms, 3),
+            "server_ms": round(exchange.server_ms, 3),
+            "total_ms": round(exchange.total_ms, 3),
+            "saved_ms": round(saved_ms, 3),
+        }
+        with self._lock:
+            totals = self._totals
+            totals["requests"] += 1
+            totals["bytes_sent"] += sent
+            totals["bytes_saved"] += saved
+            totals["connect_ms"] += exchange.connect_ms
+            totals["transfer_ms"] += exchange.transfer_ms
+            totals["server_ms"] += exchange.server_ms
+            totals["saved_ms"] += saved_ms
+        logger.debug(
+            "Cloud request %.1f ms (connect %.1f, transfer %.1f, server %.1f): %d bytes at %d Hz,"
+            " ~%d bytes and ~%.1f ms saved",
+            exchange.total_ms, exchange.connect_ms, exchange.transfer_ms, exchange.server_ms,
+            sent, upload.sample_rate, saved, saved_ms,
+        )
+
+    def stats(self):
+        """Totals over all phrases so far (times summed, in ms), the connection pool and the latest request."""
+        with self._lock:
+            totals = dict(self._totals)
+        for key in ("connect_ms", "transfer_ms", "server_ms", "saved_ms"):
+            totals[key] = round(totals[key], 3)
+        totals["encoding"] = self.preprocessor.encoding
+        totals["connections"] = self.pool.stats()
+        totals["last"] = self.last
+        return totals
+
+    def close(self):
+        self.pool.close()
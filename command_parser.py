@@ -5,7 +5,233 @@ Interprets voice commands and executes corresponding mouse actions
 
 import re
 import sys  # NEW: for platform-aware shortcuts
+import json
+import threading
+import time
+from collections import OrderedDict, namedtuple
 from config import Config
+from action_plan import Action, ActionPlan
+from macros import MacroStore
+from fuzzy_match import FuzzyIndex
+from app_logging import get_logger
+
+logger = get_logger(__name__)
+
+# One dispatch table entry: `pattern` is matched at the start of the text,
+# `priority` decides between entries that both match, `handler(text)` compiles
+# it into the Action(s) to run.
+CommandSpec = namedtuple("CommandSpec", "name pattern priority handler")
+
+# What compiling one normalized utterance produced: the steps (None if nothing
+# was recognized), the segments to report as unrecognized, and whether the
+# result may be reused for the same key (a macro's steps can change under it).
+CompiledCommand = namedtuple("CompiledCommand", "steps unrecognized cacheable")
+
+# Trigger phrases (shared by the matchers below and by the exported grammar)
+FIND_PHRASES = ("find cursor", "find my cursor", "find mouse", "find my mouse")
+MINIMIZE_PHRASES = ("minimize panel", "minimize gui", "hide panel", "hide controls")
+MAXIMIZE_PHRASES = ("maximize panel", "maximize gui", "show panel", "show controls")
+NAVIGATION_TRIGGERS = ("open ", "go to ", "navigate to ")
+TYPING_TRIGGERS = ("type ", "dictate ")
+PRESS_TRIGGERS = ("press ", "hit ")
+SHORTCUTS = {  # phrase -> keys; {mod} is the platform's primary modifier
+    "new tab": "{mod} t",
+    "close tab": "{mod} w",
+    "next tab": "ctrl tab",
+    "previous tab": "ctrl shift tab",
+    "prev tab": "ctrl shift tab",
+    "address bar": "{mod} l",
+    "focus address bar": "{mod} l",
+    "refresh": "{mod} r",
+    "reload": "{mod} r",
+}
+SHORTCUT_PHRASES = tuple(SHORTCUTS)
+# "move up 200 then click and scroll down" -> three commands
+CONNECTOR_PATTERN = re.compile(r"\s*,?\s*\b(?:and then|after that|then|and)\b\s*|\s*,\s*")
+POSITION_PHRASES = ("show position", "position", "where")
+GLIDE_TRIGGERS = ("glide", "keep moving", "keep going")
+GLIDE_SPEED_PHRASES = {"faster": True, "speed up": True, "slower": False, "slow down": False}
+DIRECTIONS = ("up", "down", "left", "right")
+GRID_PHRASES = ("mouse grid", "show grid", "grid")
+GRID_CLOSE_PHRASES = ("close grid", "hide grid", "cancel grid")
+GRID_BACK_PHRASES = ("back", "grid back")
+MACRO_RECORD_PHRASES = ("start recording", "begin recording")
+MACRO_CANCEL_PHRASES = ("cancel recording", "discard recording")
+MACRO_SAVE_TRIGGERS = ("save macro as ", "save as ")
+MACRO_RUN_TRIGGERS = ("run macro ", "play macro ")
+MACRO_NAME_TRIGGERS = ("run ", "play ")  # only followed by the name of a saved macro
+# Commands whose trailing words are a payload, never corrected by fuzzy matching
+PAYLOAD_COMMANDS = ("type", "navigate", "press", "macro_save", "macro_run", "macro_run_named")
+# Segments starting with one carry a payload, which normalize() leaves as spoken
+# (a typing payload runs to the end of the utterance)
+FREE_FORM_TRIGGERS = NAVIGATION_TRIGGERS + PRESS_TRIGGERS + MACRO_SAVE_TRIGGERS + MACRO_RUN_TRIGGERS
+PAYLOAD_TRIGGERS = TYPING_TRIGGERS + FREE_FORM_TRIGGERS
+# parser methods that control recording; never recorded themselves
+MACRO_METHODS = ("_start_recording", "_cancel_recording", "_save_macro")
+CELL_WORDS = ("one", "two", "three", "four", "five", "six", "seven", "eight", "nine")
+# Commands whose phrase can legitimately keep going ("move up" -> "move up 200",
+# "type ..."), so a partial hypothesis never settles them early
+OPEN_ENDED_COMMANDS = ("move", "type", "navigate", "press", "macro_save", "macro_run", "macro_run_named")
+# Commands whose result depends on state outside the utterance and config
+UNCACHEABLE_COMMANDS = ("macro_run", "macro_run_named")
+# Commands that only exist while the mouse grid is shown ("five", "back")
+GRID_MODE_COMMANDS = ("grid_back", "grid_cell")
+KEY_NAMES = (
+    "enter", "return", "escape", "tab", "space", "backspace", "delete", "home", "end",
+    "page up", "page down", "up", "down", "left", "right",
+    "ctrl", "control", "shift", "alt", "cmd", "command", "windows",
+) + tuple("abcdefghijklmnopqrstuvwxyz")
+
+NUMBER_WORDS = {
+    "zero": 0, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6,
+    "seven": 7, "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12,
+    "thirteen": 13, "fourteen": 14, "fifteen": 15, "sixteen": 16, "seventeen": 17,
+    "eighteen": 18, "nineteen": 19, "twenty": 20, "thirty": 30, "forty": 40,
+    "fifty": 50, "sixty": 60, "seventy": 70, "eighty": 80, "ninety": 90,
+}
+SCALE_WORDS = {"hundred": 100, "thousand": 1000}
+
+
+def words_to_digits(text):
+    """Rewrite spoken numbers as digits ('move up one hundred fifty' -> 'move up 150').
+
+    Local recognizers decoding against the grammar return number words,
+    while the cloud recognizer already returns digits. A word only extends
+    the number before it where it fills an empty place ("twenty five"), so
+    digit-by-digit phrases stay apart ('grid one two' -> 'grid 1 2').
+    """
+    out = []
+    total = current = 0
+    in_number = False
+    last = None  # value of the previous number word; None after a scale word
+
+    def flush():
+        if in_number:
+            out.append(str(total + current))
+
+    for word in text.split():
+        if word in NUMBER_WORDS:
+            value = NUMBER_WORDS[word]
+            joins = last is None or (last >= 20 and last % 10 == 0 and value < 10)
+            if in_number and not joins:
+                flush()
+                total = current = 0
+            current += value
+            in_number = True
+            last = value
+        elif word in SCALE_WORDS and in_number:
+            if SCALE_WORDS[word] == 1000:
+                total, current = (total + max(current, 1)) * 1000, 0
+            else:
+                current = max(current, 1) * 100
+            last = None
+        else:
+            flush()
+            total = current = 0
+            in_number = False
+            last = None
+            out.append(word)
+    flush()
+    return " ".join(out)
+
+
+class LRUCache:
+    """Bounded, thread-safe mapping that forgets the least recently used key first."""
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+    def get(self, key):
+        """The cached value (now most recently used), or None."""
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._items),
+                "capacity": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else None,
+            }
+
+
+class CommandGrammar:
+    """Closed vocabulary of everything CommandParser understands.
+
+    Local recognizers decode against `words` (or the derived Vosk/JSGF forms)
+    instead of free dictation. Only the payload after a free-form trigger
+    ("type ...", "dictate ...") or an out-of-vocabulary word needs a second,
+    open-vocabulary pass; see needs_open_vocabulary().
+    """
+
+    def __init__(self, phrases, extra_words=(), free_form_triggers=(), fingerprint=None):
+        self.phrases = tuple(sorted(set(phrases)))
+        words = {w for p in self.phrases for w in p.split()} | set(extra_words)
+        self.words = tuple(sorted(w for w in words if re.fullmatch(r"[a-z0-9']+", w)))
+        self.free_form_triggers = tuple(free_form_triggers)
+        self.fingerprint = fingerprint
+        self._vosk = None
+        self._prefixes = {
+            " ".join(words[:i]) for words in (p.split() for p in self.phrases) for i in range(1, len(words))
+        }
+
+    def is_complete(self, text):
+        """True if text is a whole phrase and not the start of a longer one ("right" vs "right click")."""
+        return text in self.phrases and text not in self._prefixes
+
+    def needs_open_vocabulary(self, text):
+        """True when a constrained transcript carries a payload the grammar can't spell."""
+        words = text.split()
+        return bool(words) and (words[0] in self.free_form_triggers or "[unk]" in words)
+
+    def to_vosk(self):
+        """Word list in the JSON form KaldiRecognizer accepts as a grammar."""
+        if self._vosk is None:
+            self._vosk = json.dumps(list(self.words) + ["[unk]"])
+        return self._vosk
+
+    def to_jsgf(self, words=None):
+        """JSGF word loop (any sequence of command words) for PocketSphinx."""
+        words = self.words if words is None else words
+        return (
+            "#JSGF V1.0;\n"
+            "grammar commands;\n"
+            f"public <command> = ( {' | '.join(words)} )+ ;\n"
+        )
+
 
 class CommandParser:
     def __init__(self, config):
@@ -15,18 +241,39 @@ class CommandParser:
         self.keyboard_controller = None  # NEW: injected for typing/shortcuts
         self.ui_minimize_callback = None   # for GUI minimize
         self.ui_maximize_callback = None   # for GUI maximize
+        self._grammar = None
+        self.current_plan = None  # ActionPlan being run, so "stop" can cancel it
+        self.macros = MacroStore(config.macro_path)  # read on first use
+        self.recording = None  # Actions recorded since "start recording"
+        self._commands = {}
+        self._dispatch_regex = None
+        self._macro_version = None  # MacroStore.version the macro_run_named entry was built for
+        self._register_builtin_commands()
+        # Compiled steps by normalized transcript (see compile_plan)
+        self.plan_cache = LRUCache(config.parse_cache_size)
+        self._normalized = LRUCache(config.parse_cache_size)  # spoken text -> key
+        self._cache_fingerprint = None
+        self._cache_checked_at = 0.0
+        self._cache_settings = None
+        self._word_synonyms = {}
+        self._phrase_synonyms = {}
+        self._fuzzy = None  # (command index, alias index), rebuilt with the cache
+        self._vocabulary = None  # words of the normalized grammar phrases, rebuilt with the cache
 
     def set_mouse_controller(self, mouse_controller):
         """Set the mouse controller instance"""
         self.mouse_controller = mouse_controller
+        self.invalidate_cache()
 
     # NEW: allow main.py to inject WindowManager
     def set_window_manager(self, wm):
         self.window_manager = wm  # NEW
+        self.invalidate_cache()  # navigation compiles to nothing without one
 
     # NEW: allow main.py to inject KeyboardController
     def set_keyboard_controller(self, kc):
         self.keyboard_controller = kc  # NEW
+        self.invalidate_cache()  # as do shortcut phrases
 
     def set_ui_callbacks(self, minimize_callback=None, maximize_callback=None):
         """Set callbacks used for GUI minimize/maximize via voice commands."""
@@ -34,120 +281,588 @@ class CommandParser:
         self.ui_maximize_callback = maximize_callback
 
 
+    def _grammar_fingerprint(self):
+        """Cheap snapshot of every config value the grammar is built from."""
+        cfg = self.config
+        return repr((
+            sorted(cfg.movement_commands.items()),
+            sorted(cfg.click_commands.items()),
+            sorted(cfg.scroll_commands.items()),
+            list(cfg.stop_commands),
+            sorted(cfg.site_aliases),
+            self.macros.names(),
+        ))
+
+    def grammar(self):
+        """Return the command grammar, rebuilding it if keywords or aliases changed."""
+        fingerprint = self._grammar_fingerprint()
+        if self._grammar is None or self._grammar.fingerprint != fingerprint:
+            self._grammar = self._build_grammar(fingerprint)
+        return self._grammar
+
+    def _build_grammar(self, fingerprint):
+        cfg = self.config
+        phrases = list(FIND_PHRASES + MINIMIZE_PHRASES + MAXIMIZE_PHRASES)
+        phrases += SHORTCUT_PHRASES + POSITION_PHRASES + tuple(GLIDE_SPEED_PHRASES)
+        phrases += [f"{trig} {d}" for trig in GLIDE_TRIGGERS for d in DIRECTIONS]
+        phrases += GRID_PHRASES + GRID_CLOSE_PHRASES + GRID_BACK_PHRASES
+        phrases += MACRO_RECORD_PHRASES + MACRO_CANCEL_PHRASES + tuple(t.strip() for t in MACRO_SAVE_TRIGGERS)
+        phrases += [trig + name for trig in MACRO_RUN_TRIGGERS + MACRO_NAME_TRIGGERS for name in self.macros.names()]
+        phrases += [f"{prefix} {n}" for prefix in ("grid", "cell") for n in CELL_WORDS]
+        phrases += CELL_WORDS
+        phrases += cfg.stop_commands
+        phrases += [t.strip() for t in TYPING_TRIGGERS]
+        targets = list(cfg.site_aliases) + ["browser"]
+        phrases += [trig + target for trig in NAVIGATION_TRIGGERS for target in targets]
+        phrases += [trig + key for trig in PRESS_TRIGGERS for key in KEY_NAMES]
+        phrases += ["tap", "scroll", "wheel"]
+        for keywords in list(cfg.click_commands.values()) + list(cfg.scroll_commands.values()):
+            phrases += keywords
+        for keywords in cfg.movement_commands.values():
+            for kw in keywords:
+                phrases += [kw, f"move {kw}", f"go {kw}"]
+        return CommandGrammar(
+            phrases,
+            extra_words=list(NUMBER_WORDS) + list(SCALE_WORDS),
+            # new macro names are free-form too ("save as <anything>")
+            free_form_triggers=[t.strip() for t in TYPING_TRIGGERS] + ["save"],
+            fingerprint=fingerprint,
+        )
+
     def _primary_mod(self) -> str:
         """NEW: Return platform's primary modifier for common shortcuts."""
         return "command" if sys.platform == "darwin" else "ctrl"  # NEW
 
     def _extract_target_after_trigger(self, text: str):
         """NEW: Return the substring after specific voice triggers, trimmed."""
-        triggers = ("open ", "go to ", "navigate to ")
-        for trig in triggers:
+        for trig in NAVIGATION_TRIGGERS:
             if text.startswith(trig):
                 return text[len(trig):].strip()
         return None
 
     def parse_command(self, text):
-        """Parse voice command and execute action"""
+        """Parse voice command and execute action(s). Returns the ActionPlan that ran."""
         if not self.mouse_controller:
-            return
+            return None
 
-        text = text.lower().strip()
+        plan = self.compile_plan(text)
+        if plan is None:
+            return None
+        self.current_plan = plan
+        try:
+            return plan.run(self._targets())
+        finally:
+            self.current_plan = None
 
-        # Handle visual locate before generic 'where'
-        if self._is_find_command(text):  
-            try:  
-                self.mouse_controller.highlight_cursor()  
-            except Exception as e:  
-                print(f"Error highlighting cursor: {e}")  
-            return  
-        
-        # GUI minimize / maximize via voice
-        if self._is_minimize_command(text):
-            if self.ui_minimize_callback:
-                self.ui_minimize_callback()
-            else:
-                print("Minimize panel requested (no UI callback configured).")
+    # --- Normalization and the plan cache ----------------------------------
+
+    def invalidate_cache(self):
+        """Forget compiled commands and re-read the keyword synonyms on the next compile."""
+        self._cache_fingerprint = None
+
+    def _check_cache(self):
+        """Clear the cache if anything a compiled command depends on has changed.
+
+        The move distance and glide factor (GUI sliders) and the macro store's
+        version are compared on every call; keyword and alias tables are only fingerprinted once per
+        `parse_cache_check_s`, since that costs about as much as a parse.
+        """
+        cfg = self.config
+        settings = (cfg.default_move_distance, cfg.glide_speed_factor, self.macros.version)
+        now = time.monotonic()
+        if (
+            settings == self._cache_settings
+            and self._cache_fingerprint is not None
+            and now - self._cache_checked_at < cfg.parse_cache_check_s
+        ):
             return
+        fingerprint = self._grammar_fingerprint()
+        if settings != self._cache_settings or fingerprint != self._cache_fingerprint:
+            self.plan_cache.clear()
+            self._normalized.clear()
+            self._fuzzy = None
+            self._vocabulary = None
+            self._build_synonyms()
+        self._cache_settings, self._cache_fingerprint, self._cache_checked_at = settings, fingerprint, now
 
-        if self._is_maximize_command(text):
-            if self.ui_maximize_callback:
-                self.ui_maximize_callback()
-            else:
-                print("Maximize panel requested (no UI callback configured).")
+    def _build_synonyms(self):
+        """Synonym tables from config: movement words by word, click/scroll phrases by whole segment.
+
+        Words that start a payload command are left out: a bare "press" is
+        the key-press trigger, not the click keyword config also lists it as.
+        """
+        cfg = self.config
+        self._word_synonyms = {
+            word: direction
+            for direction, words in cfg.movement_commands.items()
+            for word in words
+            if " " not in word and word != direction
+        }
+        self._phrase_synonyms = {
+            phrase: phrases[0]
+            for table in (cfg.click_commands, cfg.scroll_commands)
+            for phrases in table.values()
+            for phrase in phrases[1:]
+            if phrase + " " not in PAYLOAD_TRIGGERS
+        }
+
+    def normalize(self, text):
+        """Canonical form of an utterance, used as the cache key and then compiled.
+
+        Lowercased with whitespace collapsed and every connector made " then ".
+        In each command, number words become digits and configured synonyms
+        collapse to the first keyword of their group ("north" -> "up", "left
+        click" -> "click"), except in commands that carry a free-form payload
+        ("open ...", "press ...", macro names), which are left as spoken. A
+        typing command's payload is the rest of the utterance.
+        """
+        self._check_cache()
+        key = self._normalized.get(text)
+        if key is None:
+            key = self._normalize(text)
+            self._normalized.put(text, key)
+        return key
+
+    def _normalize(self, text):
+        text = " ".join(text.lower().split())
+        segments = []
+        start = 0
+        for connector in list(CONNECTOR_PATTERN.finditer(text)) + [None]:
+            end = connector.start() if connector else len(text)
+            segment = text[start:end]
+            if segment.startswith(TYPING_TRIGGERS):
+                segments.append(text[start:])
+                break
+            start = connector.end() if connector else end
+            if not segment:
+                continue
+            if not segment.startswith(FREE_FORM_TRIGGERS) and not self._is_named_macro_run(segment):
+                segment = self._phrase_synonyms.get(segment, segment)
+                segment = " ".join(self._word_synonyms.get(word, word) for word in words_to_digits(segment).split())
+            segments.append(segment)
+        return " then ".join(segments) or text  # nothing but connectors: report it as heard
+
+    def _is_named_macro_run(self, segment):
+        """ "run <name>" / "play <name>" for a saved macro, whose name is left as spoken."""
+        return segment.startswith(MACRO_NAME_TRIGGERS) and (
+            self.macros.get(self._macro_name(segment, MACRO_NAME_TRIGGERS)) is not None
+        )
+
+    def _fuzzy_indexes(self):
+        """Phonetic indexes over the (normalized) grammar phrases and over the site aliases."""
+        if self._fuzzy is None:
+            min_confidence = self.config.fuzzy_min_confidence
+            self._fuzzy = (
+                FuzzyIndex(self._normalized_phrases(), min_confidence),
+                FuzzyIndex(self.config.site_aliases, min_confidence),
+            )
+        return self._fuzzy
+
+    def _normalized_phrases(self):
+        return {self._normalize(phrase) for phrase in self.grammar().phrases}
+
+    def _words(self):
+        if self._vocabulary is None:
+            self._vocabulary = frozenset(word for phrase in self._normalized_phrases() for word in phrase.split())
+        return self._vocabulary
+
+    def vocabulary(self):
+        """Every word of the normalized command phrases; a new object whenever the cache is rebuilt."""
+        self._check_cache()
+        return self._words()
+
+    def _needs_correction(self, segment, spec):
+        """Unmatched, or matched only loosely around words outside the vocabulary ("right clique")."""
+        if not self.config.fuzzy_matching:
+            return False
+        if spec is None:
+            return True
+        if spec.name in PAYLOAD_COMMANDS:
+            return False
+        vocabulary = self._words()
+        return any(word not in vocabulary and not word.isdigit() for word in segment.split())
+
+    def _fuzzy_correct(self, segment):
+        """Nearest known command for a misheard segment ("scroll dawn" -> "scroll down"), or None.
+
+        If the whole segment has no match, trailing numbers are set aside, so
+        "moov left 100" is looked up as "moov left" and becomes "move left 100".
+        """
+        index = self._fuzzy_indexes()[0]
+        words = segment.split()
+        split = len(words)
+        match = index.match(segment)
+        if match is None:
+            while split and words[split - 1].isdigit():
+                split -= 1
+            if split in (0, len(words)):
+                return None
+            match = index.match(" ".join(words[:split]))
+        if match is None or match.phrase == segment:
+            return None
+        corrected = " ".join([match.phrase] + words[split:])
+        logger.info("Heard '%s' as '%s' (confidence %.2f)", segment, corrected, match.confidence)
+        return corrected
+
+    def cache_stats(self):
+        """Hit rate and size of the compiled-command cache."""
+        return self.plan_cache.stats()
+
+    def compile_plan(self, text):
+        """Split an utterance on connectors ("then", "and", ",") and compile each command.
+
+        A typing command takes the rest of the utterance as its payload, so
+        "type milk and eggs" types all three words. Returns None if nothing in
+        the utterance was recognized. The steps are memoized by the normalized
+        utterance and whether the mouse grid is shown, so frequent phrases skip
+        matching and the handlers.
+        """
+        started = time.perf_counter()
+        key = self.normalize(text)
+        grid_active = self._grid_active()
+        compiled = self.plan_cache.get((key, grid_active))
+        if compiled is None:
+            compiled = self._compile(key, grid_active)
+            if compiled.cacheable:
+                self.plan_cache.put((key, grid_active), compiled)
+        for segment in compiled.unrecognized:
+            logger.info("Unrecognized command: %s", segment)
+        if compiled.steps is None:
+            return None
+        plan = ActionPlan(compiled.steps, text=key, step_pause=self.config.plan_step_pause, on_step=self._record_step)
+        plan.compile_s = time.perf_counter() - started
+        return plan
+
+    def _grid_active(self):
+        grid = getattr(self.mouse_controller, "grid", None)
+        return bool(grid is not None and grid.active)
+
+    def _compile(self, text, grid_active):
+        """Match and compile each command of a normalized utterance (uncached).
+
+        grid_active is whether the mouse grid is shown; opening or closing it
+        part-way through ("show grid then five") applies to the commands after.
+        """
+        cacheable = True
+        steps = []
+        recognized = False
+        unrecognized = []
+        start = 0
+        for connector in list(CONNECTOR_PATTERN.finditer(text)) + [None]:
+            end = connector.start() if connector else len(text)
+            if end < start:
+                continue  # this connector sits inside a typing payload already consumed
+            segment = text[start:end]
+            spec = self.match_command(segment, grid_active) if segment else None
+            if segment and self._needs_correction(segment, spec):
+                corrected = self._fuzzy_correct(segment)
+                corrected_spec = self.match_command(corrected, grid_active) if corrected is not None else None
+                if corrected_spec is not None:
+                    segment, spec = corrected, corrected_spec
+            if spec is not None and spec.name == "type":
+                segment, end = text[start:], len(text)
+            start = connector.end() if connector else end
+            if not segment:
+                continue
+            if spec is None:
+                unrecognized.append(segment)
+                continue
+            recognized = True
+            if spec.name in ("grid", "grid_close"):
+                grid_active = spec.name == "grid"
+            if spec.name in UNCACHEABLE_COMMANDS:
+                cacheable = False
+            compiled = spec.handler(segment)
+            if isinstance(compiled, Action):
+                steps.append(compiled)
+            elif compiled:
+                steps.extend(compiled)
+            if end == len(text):
+                break
+        if not recognized:
+            return CompiledCommand(None, (text,), cacheable)
+        return CompiledCommand(tuple(steps), tuple(unrecognized), cacheable)
+
+    def early_command(self, partial):
+        """CommandSpec that a partial (streaming) hypothesis already settles, or None.
+
+        Only a complete grammar phrase that cannot grow into a different command
+        qualifies; anything with arguments or a connector waits for the final.
+        """
+        text = partial.lower().strip()
+        if not text or CONNECTOR_PATTERN.search(text):
+            return None
+        spec = self.match_command(text)
+        if spec is None or spec.name in OPEN_ENDED_COMMANDS:
+            return None
+        return spec if self.grammar().is_complete(text) else None
+
+    @staticmethod
+    def continuation(committed, final):
+        """The rest of `final` if it is `committed` followed by a connector ("click then ..."), else None."""
+        if not final.startswith(committed):
+            return None
+        m = CONNECTOR_PATTERN.match(final, len(committed))
+        return final[m.end():] if m and m.end() < len(final) else None
+
+    def cancel_plan(self):
+        """Cancel the plan being run (from any thread). Returns True if there was one."""
+        plan = self.current_plan
+        if plan is None or not plan.cancel():
+            return False
+        if self.mouse_controller is not None and self.mouse_controller.is_moving():
+            self.mouse_controller.stop_motion()
+        logger.info("Command sequence cancelled")
+        return True
+
+    # --- Macros -----------------------------------------------------------
+
+    def _record_step(self, step):
+        if self.recording is not None and not (step.target == "parser" and step.method in MACRO_METHODS):
+            self.recording.append(step)
+
+    def _start_recording(self):
+        self.recording = []
+        logger.info("Recording macro...")
+
+    def _cancel_recording(self):
+        self.recording = None
+        logger.info("Macro recording discarded")
+
+    def _save_macro(self, name):
+        if self.recording is None:
+            logger.info("Not recording; say 'start recording' first")
+            return
+        if not self.recording:
+            logger.info("Nothing recorded; macro not saved")
             return
+        self.macros.save(name, self.recording)
+        logger.info("Saved macro '%s' (%d steps)", name, len(self.recording))
+        self.recording = None
+
+    @staticmethod
+    def _macro_name(text, triggers):
+        for trig in triggers:
+            if text.startswith(trig):
+                return text[len(trig):].strip()
+        return text
+
+    def _handle_macro_record(self, text):
+        return Action("parser", "_start_recording")
+
+    def _handle_macro_cancel(self, text):
+        return Action("parser", "_cancel_recording")
+
+    def _handle_macro_save(self, text):
+        return Action("parser", "_save_macro", (self._macro_name(text, MACRO_SAVE_TRIGGERS),))
+
+    def _handle_macro_run(self, text):
+        """Expand a stored macro into its Actions; nothing is re-parsed."""
+        name = self._macro_name(text, MACRO_RUN_TRIGGERS + MACRO_NAME_TRIGGERS)
+        steps = self.macros.get(name)
+        if steps is None:
+            logger.info("No macro named '%s'", name)
+            return None
+        return list(steps)
+
+    def _targets(self):
+        """Names that compiled Actions refer to."""
+        return {
+            "mouse": self.mouse_controller,
+            "keyboard": self.keyboard_controller,
+            "window": self.window_manager,
+            "parser": self,
+        }
+
+    # --- Dispatch table ---------------------------------------------------
+
+    def register_command(self, name, pattern, priority, handler):
+        """Add (or replace) a dispatch table entry.
+
+        `pattern` is a regex matched at the start of the normalized text
+        (prefix it with `.*?` to match anywhere). When several entries match,
+        the highest priority wins; ties go to the entry registered first.
+        `handler(text)` returns an Action, a list of Actions or None; it should
+        not act by itself, so that the command can be batched and replayed.
+        """
+        self._commands[name] = CommandSpec(name, pattern, priority, handler)
+        self._dispatch_regex = None
+        self.invalidate_cache()
+
+    def _register_builtin_commands(self):
+        """Built-in commands, in the precedence the old if/elif chain had."""
+        def any_of(phrases):
+            return "|".join(re.escape(p) for p in phrases)
+
+        # Macro commands take a free-form name, which must not trigger anything else
+        self.register_command("macro_record", f"(?:{any_of(MACRO_RECORD_PHRASES)})$", 110, self._handle_macro_record)
+        self.register_command("macro_cancel", f"(?:{any_of(MACRO_CANCEL_PHRASES)})$", 110, self._handle_macro_cancel)
+        self.register_command("macro_save", rf"(?:{any_of(MACRO_SAVE_TRIGGERS)})\S", 110, self._handle_macro_save)
+        self.register_command("macro_run", rf"(?:{any_of(MACRO_RUN_TRIGGERS)})\S", 110, self._handle_macro_run)
+        # Handle visual locate before generic 'where'
+        self.register_command("find", f".*?(?:{any_of(FIND_PHRASES)})", 100, self._handle_find)
+        self.register_command("minimize", f".*?(?:{any_of(MINIMIZE_PHRASES)})", 95, self._handle_minimize)
+        self.register_command("maximize", f".*?(?:{any_of(MAXIMIZE_PHRASES)})", 90, self._handle_maximize)
+        self.register_command("grid_close", f"(?:{any_of(GRID_CLOSE_PHRASES)})$", 86, self._handle_grid_close)
+        self.register_command("grid", f"(?:{any_of(GRID_PHRASES)})$", 85, self._handle_grid)
+        self.register_command("grid_back", f"(?:{any_of(GRID_BACK_PHRASES)})$", 85, self._handle_grid_back)
+        self.register_command(
+            "grid_cell", rf"(?:grid |cell )?(?:[1-9]|{any_of(CELL_WORDS)})$", 85, self._handle_grid_cell
+        )
+        self.register_command("navigate", any_of(NAVIGATION_TRIGGERS), 80, self._handle_navigation)
+        self.register_command("type", any_of(TYPING_TRIGGERS), 75, self._handle_typing)
+        # 'press enter' must win over click
+        self.register_command("press", any_of(PRESS_TRIGGERS), 70, self._handle_press)
+        self.register_command("shortcut", f"(?:{any_of(SHORTCUT_PHRASES)})$", 60, self._handle_shortcut)
+        self.register_command("click", r".*?(?:click|tap)", 50, self._handle_click)
+        # both must win over move: "glide right" / "slow down" contain a direction
+        self.register_command("glide", rf"(?:{any_of(GLIDE_TRIGGERS)})\b", 45, self._handle_glide)
+        self.register_command(
+            "glide_speed", f"(?:{any_of(GLIDE_SPEED_PHRASES)})$", 45, self._handle_glide_speed
+        )
+        self.register_command(
+            "move", r"(?:move|go)|(?!.*scroll).*?(?:up|down|left|right)", 40, self._handle_movement
+        )
+        self.register_command("scroll", r".*?(?:scroll|wheel)", 30, self._handle_scroll)
+        self.register_command("position", r".*?(?:position|where)", 20, self._handle_position)
+
+    def _register_named_macros(self):
+        """(Re)build the entry for bare "run <name>": saved names only, below every built-in.
+
+        "run ..." that names no macro is left to the other commands (or
+        reported unrecognized) rather than failing as an unknown macro.
+        """
+        names = self.macros.names()
+        self._macro_version = self.macros.version
+        alternatives = "|".join(re.escape(name) for name in sorted(names, key=len, reverse=True)) or "(?!)"
+        triggers = "|".join(re.escape(t) for t in MACRO_NAME_TRIGGERS)
+        pattern = f"(?:{triggers})(?:{alternatives})$"
+        # not register_command(): the caches already follow macros.version (see _check_cache)
+        self._commands["macro_run_named"] = CommandSpec("macro_run_named", pattern, 10, self._handle_macro_run)
+        self._dispatch_regex = None
+
+    def _compile_dispatch(self):
+        """Fold every entry into one alternation of anchored lookaheads.
+
+        The regex engine tries alternatives left to right, so ordering them by
+        priority makes the first successful branch the winner: one match call
+        per utterance, with precedence stated explicitly instead of implied
+        by the order of if statements.
+        """
+        ordered = sorted(
+            enumerate(self._commands.values()), key=lambda item: (-item[1].priority, item[0])
+        )
+        self._dispatch_specs = [spec for _, spec in ordered]
+        branches = [f"(?P<c{i}>(?={spec.pattern}))" for i, spec in enumerate(self._dispatch_specs)]
+        self._dispatch_regex = re.compile("|".join(branches), re.DOTALL)
+        # the same without the grid-only entries, for when no grid is shown
+        self._dispatch_regex_no_grid = re.compile(
+            "|".join(
+                branch for branch, spec in zip(branches, self._dispatch_specs) if spec.name not in GRID_MODE_COMMANDS
+            ) or "(?!)",
+            re.DOTALL,
+        )
+
+    def match_command(self, text, grid_active=None):
+        """Return the CommandSpec that handles normalized text, or None.
+
+        Cell numbers and "back" only match while the mouse grid is shown;
+        grid_active overrides the mouse controller's current state.
+        """
+        if self._macro_version != self.macros.version:
+            self._register_named_macros()
+        if self._dispatch_regex is None:
+            self._compile_dispatch()
+        if grid_active is None:
+            grid_active = self._grid_active()
+        m = (self._dispatch_regex if grid_active else self._dispatch_regex_no_grid).match(text)
+        if m is None:
+            return None
+        return self._dispatch_specs[int(m.lastgroup[1:])]
 
-        # NEW: Browser navigation / open (URLs or aliases)
-        if text.startswith(("open ", "go to ", "navigate to ")):  # NEW
-            if self.window_manager:  # NEW
-                target = self._extract_target_after_trigger(text)  # NEW
-                if target:  # NEW
-                    self.window_manager.open(target)  # NEW
-                else:  # NEW
-                    print("No navigation target recognized.")  # NEW
-            return  # NEW
-
-        # NEW: Typing / dictation
-        if text.startswith(("type ", "dictate ")):  # NEW
-            if self.keyboard_controller:  # NEW
-                content = text.split(" ", 1)[1]
-                self.keyboard_controller.type_text(content)  # NEW
-            return  # NEW
-
-        # NEW: Press / shortcuts (handle before click so 'press enter' isn't a click)
-        if text.startswith(("press ", "hit ")):  # NEW
-            if self.keyboard_controller:  # NEW
-                keys_phrase = text.split(" ", 1)[1]
-                self.keyboard_controller.press_keys(keys_phrase)  # NEW
-            return  # NEW
-
-        # NEW: Convenience phrases mapped to shortcuts
-        if self.keyboard_controller:  # NEW
-            mod = self._primary_mod()  # NEW
-            if text in {"new tab"}:
-                self.keyboard_controller.press_keys(f"{mod} t")  # NEW
-                return
-            if text in {"close tab"}:
-                self.keyboard_controller.press_keys(f"{mod} w")  # NEW
-                return
-            if text in {"next tab"}:
-                self.keyboard_controller.press_keys("ctrl tab")  # NEW
-                return
-            if text in {"previous tab", "prev tab"}:
-                self.keyboard_controller.press_keys("ctrl shift tab")  # NEW
-                return
-            if text in {"address bar", "focus address bar"}:
-                self.keyboard_controller.press_keys(f"{mod} l")  # NEW
-                return
-            if text in {"refresh", "reload"}:
-                self.keyboard_controller.press_keys(f"{mod} r")  # NEW
-                return
-
-        # Check for click commands first (more specific)
-        if self._is_click_command(text):
-            self._handle_click(text)
-        # Movement commands
-        elif self._is_movement_command(text):
-            self._handle_movement(text)
-        # Scroll commands
-        elif self._is_scroll_command(text):
-            self._handle_scroll(text)
-        # Position commands
-        elif "position" in text or "where" in text:
-            self.mouse_controller.show_cursor_position()
+    # --- Handlers ---------------------------------------------------------
+
+    def _handle_find(self, text):
+        return Action("mouse", "highlight_cursor", error="highlighting cursor")
+
+    def _handle_minimize(self, text):
+        return Action("parser", "_minimize_panel")
+
+    def _handle_maximize(self, text):
+        return Action("parser", "_maximize_panel")
+
+    def _minimize_panel(self):
+        if self.ui_minimize_callback:
+            self.ui_minimize_callback()
         else:
-            print(f"Unrecognized command: {text}")
+            logger.warning("Minimize panel requested (no UI callback configured).")
 
-    def _is_movement_command(self, text):
-        """Check if text contains movement command"""
-        movement_keywords = ["move", "go"]
-        # Check if text starts with movement keywords or contains directional words without scroll
-        if any(text.startswith(keyword) for keyword in movement_keywords):
-            return True
-        # Check for directional commands that don't contain scroll
-        directional_keywords = ["up", "down", "left", "right"]
-        has_directional = any(keyword in text for keyword in directional_keywords)
-        has_scroll = "scroll" in text
-        return has_directional and not has_scroll
+    def _maximize_panel(self):
+        if self.ui_maximize_callback:
+            self.ui_maximize_callback()
+        else:
+            logger.warning("Maximize panel requested (no UI callback configured).")
+
+    def _handle_navigation(self, text):
+        """Browser navigation / open (URLs or aliases)"""
+        if self.window_manager:
+            target = self._extract_target_after_trigger(text)
+            if target and self.config.fuzzy_matching and target not in self.config.site_aliases and "." not in target:
+                match = self._fuzzy_indexes()[1].match(target)  # "open g mail" -> "gmail"
+                if match is not None:
+                    target = match.phrase
+            if target:
+                return Action("window", "open", (target,))
+            logger.info("No navigation target recognized.")
+        return None
+
+    def _handle_typing(self, text):
+        """Typing / dictation"""
+        content = text.split(" ", 1)[1]
+        return Action("keyboard", "type_text", (content,))
+
+    def _handle_press(self, text):
+        """Press / shortcuts"""
+        keys_phrase = text.split(" ", 1)[1]
+        return Action("keyboard", "press_keys", (keys_phrase,))
+
+    def _handle_shortcut(self, text):
+        """Convenience phrases mapped to shortcuts"""
+        if not self.keyboard_controller:
+            logger.info("Unrecognized command: %s", text)
+            return None
+        return Action("keyboard", "press_keys", (SHORTCUTS[text].format(mod=self._primary_mod()),))
+
+    def _handle_glide(self, text):
+        """Continuous motion until "stop" or the screen edge"""
+        direction = next((d for d in DIRECTIONS if d in text.split()), None)
+        if direction is None:
+            logger.info("No glide direction in: %s", text)
+            return None
+        # a glide's future only resolves at the screen edge: don't hold the plan for it
+        return Action("mouse", "glide", (direction,), wait=False, error="starting glide")
+
+    def _handle_glide_speed(self, text):
+        """'faster' / 'slower' adjust the glide in flight without re-targeting"""
+        factor = self.config.glide_speed_factor
+        return Action("mouse", "change_glide_speed", (factor if GLIDE_SPEED_PHRASES[text] else 1 / factor,))
+
+    def _handle_grid(self, text):
+        return Action("mouse", "grid.start")
+
+    def _handle_grid_close(self, text):
+        return Action("mouse", "grid.close")
+
+    def _handle_grid_back(self, text):
+        return Action("mouse", "grid.back")
+
+    def _handle_grid_cell(self, text):
+        """Zoom the mouse grid into the spoken cell ('five', '5', 'grid five')"""
+        number = int(words_to_digits(text).split()[-1])
+        return Action("mouse", "grid.select", (number,))
+
+    def _handle_position(self, text):
+        return Action("mouse", "show_cursor_position")
 
     def _handle_movement(self, text):
         """Handle movement commands"""
@@ -164,8 +879,8 @@ class CommandParser:
         elif "right" in text:
             direction = "right"
 
-        # Try to extract number (distance)
-        numbers = re.findall(r'\d+', text)
+        # Try to extract number (distance); grammar-constrained recognizers spell them out
+        numbers = re.findall(r'\d+', words_to_digits(text))
         if numbers:
             try:
                 distance = int(numbers[0])
@@ -175,70 +890,23 @@ class CommandParser:
                 distance = self.config.default_move_distance
 
         if direction:
-            try:
-                self.mouse_controller.move_cursor(direction, distance)
-            except Exception as e:
-                print(f"Error moving cursor: {e}")
-
-    def _is_click_command(self, text):
-        """Check if text contains click command"""
-        # NEW: removed "press" so 'press enter' is not misread as a click
-        click_keywords = ["click", "tap"]  # NEW: was ["click","press","tap"]
-        return any(keyword in text for keyword in click_keywords)
+            return Action("mouse", "move_cursor", (direction, distance), error="moving cursor")
+        return None
 
     def _handle_click(self, text):
         """Handle click commands"""
-        try:
-            if "right" in text:
-                self.mouse_controller.click("right")
-            elif "double" in text:
-                self.mouse_controller.click("double")
-            else:
-                self.mouse_controller.click("left")
-        except Exception as e:
-            print(f"Error performing click: {e}")
-
-    def _is_scroll_command(self, text):
-        """Check if text contains scroll command"""
-        scroll_keywords = ["scroll", "wheel"]
-        return any(keyword in text for keyword in scroll_keywords)
+        if "right" in text:
+            button = "right"
+        elif "double" in text:
+            button = "double"
+        else:
+            button = "left"
+        return Action("mouse", "click", (button,), error="performing click")
 
     def _handle_scroll(self, text):
         """Handle scroll commands"""
-        try:
-            if "up" in text:
-                self.mouse_controller.scroll("up")
-            elif "down" in text:
-                self.mouse_controller.scroll("down")
-            else:
-                # Default to down if unclear
-                self.mouse_controller.scroll("down")
-        except Exception as e:
-            print(f"Error scrolling: {e}")
-
-    def _is_find_command(self, text):
-        keywords = [
-            "find cursor", "find my cursor", "find mouse", "find my mouse"
-        ]
-        t = text.lower()
-        hit = any(k in t for k in keywords)
-        print(f"[DEBUG] _is_find_command: text='{t}', hit={hit}")
-        return hit
-  
-    def _is_minimize_command(self, text):
-        keywords = [
-            "minimize panel",
-            "minimize gui",
-            "hide panel",
-            "hide controls",
-        ]
-        return any(k in text for k in keywords)
-
-    def _is_maximize_command(self, text):
-        keywords = [
-            "maximize panel",
-            "maximize gui",
-            "show panel",
-            "show controls",
-        ]
-        return any(k in text for k in keywords)
+        if "up" in text:
+            direction = "up"
+        else:
+            direction = "down"  # also the default if unclear
+        return Action("mouse", "scroll", (direction,), error="scrolling")
@@ -0,0 +1,220 @@
+"""
+Fuzzy Match Module
+Resolves misrecognized transcripts ("scroll dawn", "right clique") to the nearest known phrase
+using Metaphone keys, a deletion index over those keys and edit distance
+"""
+
+from collections import namedtuple
+
+# One resolved phrase: `confidence` is 1 - edit distance / length of the longer string
+FuzzyMatch = namedtuple("FuzzyMatch", "phrase confidence distance")
+
+VOWELS = "aeiou"
+
+
+def metaphone(word):
+    """Metaphone key of one word ("click" -> "KLK", "clique" -> "KLK").
+
+    The classic rule set, slightly simplified: initial vowels are kept,
+    other vowels dropped, and letters are folded into sound classes.
+    """
+    word = "".join(c for c in word.lower() if "a" <= c <= "z")
+    if not word:
+        return ""
+    if word[:2] in ("ae", "gn", "kn", "pn", "wr"):
+        word = word[1:]
+    elif word[0] == "x":
+        word = "s" + word[1:]
+    elif word[:2] == "wh":
+        word = "w" + word[2:]
+
+    out = []
+    n = len(word)
+    i = 0
+    while i < n:
+        c = word[i]
+        prev = word[i - 1] if i else ""
+        nxt = word[i + 1] if i + 1 < n else ""
+        nxt2 = word[i + 2] if i + 2 < n else ""
+        if c == prev and c != "c":
+            i += 1
+            continue
+        if c in VOWELS:
+            if i == 0:
+                out.append(c.upper())
+        elif c == "b":
+            if not (prev == "m" and i == n - 1):  # "thumb"
+                out.append("B")
+        elif c == "c":
+            if nxt == "i" and nxt2 == "a":
+                out.append("X")
+            elif nxt == "h":
+                out.append("K" if prev == "s" else "X")
+                i += 1
+            elif nxt in ("i", "e", "y"):
+                if prev != "s":
+                    out.append("S")
+            else:
+                out.append("K")
+        elif c == "d":
+            if nxt == "g" and nxt2 in ("e", "i", "y"):
+                out.append("J")
+                i += 1
+            else:
+                out.append("T")
+        elif c == "g":
+            if nxt == "h" and nxt2 not in VOWELS:  # "right", "high"
+                i += 1
+            elif nxt == "n" and word[i + 2:] in ("", "ed"):  # "sign", "signed"
+                pass
+            elif nxt in ("i", "e", "y") and prev != "g":
+                out.append("J")
+            else:
+                out.append("K")
+        elif c == "h":
+            if nxt in VOWELS and prev not in ("c", "s", "p", "t", "g"):
+                out.append("H")
+        elif c == "k":
+            if prev != "c":
+                out.append("K")
+        elif c == "p":
+            if nxt == "h":
+                out.append("F")
+                i += 1
+            else:
+                out.append("P")
+        elif c == "q":
+            out.append("K")
+        elif c == "s":
+            if nxt == "h":
+                out.append("X")
+                i += 1
+            elif nxt == "i" and nxt2 in ("o", "a"):
+                out.append("X")
+            else:
+                out.append("S")
+        elif c == "t":
+            if nxt == "i" and nxt2 in ("o", "a"):
+                out.append("X")
+            elif nxt == "h":
+                out.append("0")  # "th"
+                i += 1
+            elif not (nxt == "c" and nxt2 == "h"):
+                out.append("T")
+        elif c == "v":
+            out.append("F")
+        elif c in ("w", "y"):
+            if nxt in VOWELS:
+                out.append(c.upper())
+        elif c == "x":
+            out.append("KS")
+        elif c == "z":
+            out.append("S")
+        else:  # f j l m n r
+            out.append(c.upper())
+        i += 1
+    return "".join(out)
+
+
+def phonetic_key(text):
+    """Metaphone key per word; digits are kept as they are ("cell 5" -> "SL 5")."""
+    return " ".join(metaphone(word) if word.isalpha() else word for word in text.split())
+
+
+def edit_distance(a, b, limit=None):
+    """Levenshtein distance; stops early and returns limit + 1 once it must exceed `limit`."""
+    if a == b:
+        return 0
+    # a shared prefix and suffix never change the distance; near-misses are mostly that
+    start = 0
+    end_a, end_b = len(a), len(b)
+    while start < end_a and start < end_b and a[start] == b[start]:
+        start += 1
+    while end_a > start and end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    a, b = a[start:end_a], b[start:end_b]
+    if len(a) < len(b):
+        a, b = b, a
+    if not b:
+        return len(a) if limit is None or len(a) <= limit else limit + 1
+    if limit is not None and len(a) - len(b) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous = current
+    d = previous[-1]
+    return d if limit is None or d <= limit else limit + 1
+
+
+def deletions(text, depth):
+    """`text` and every string made from it by deleting up to `depth` characters."""
+    variants = {text}
+    frontier = {text}
+    for _ in range(depth):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        variants |= frontier
+    return variants
+
+
+class FuzzyIndex:
+    """Nearest-phrase lookup over a fixed vocabulary (command phrases, site aliases).
+
+    Phrases are grouped by phonetic key. A query whose key matches exactly
+    only has to rank that group. Otherwise keys one edit away (two for long
+    keys) are found through a deletion index (the SymSpell scheme): two
+    strings within n edits share a variant with at most n characters
+    deleted, so every key is stored under its deletion variants and a query
+    costs a few dict lookups whatever the vocabulary size. The best candidate
+    by character edit distance is returned if its confidence reaches
+    `min_confidence`.
+    """
+
+    MAX_KEY_EDITS = 2
+
+    def __init__(self, phrases, min_confidence=0.7):
+        self.min_confidence = min_confidence
+        self._by_key = {}
+        for phrase in phrases:
+            self._by_key.setdefault(phonetic_key(phrase), []).append(phrase)
+        self._near = {}  # deletion variant -> keys
+        for key in self._by_key:
+            for variant in deletions(key, self.MAX_KEY_EDITS):
+                self._near.setdefault(variant, []).append(key)
+
+    def __len__(self):
+        return sum(len(group) for group in self._by_key.values())
+
+    @staticmethod
+    def _key_edits(key):
+        """Phonetic slack allowed for a key: none for very short keys, more for long ones."""
+        return 0 if len(key) < 4 else 1 if len(key) < 10 else 2
+
+    def _candidates(self, key):
+        group = self._by_key.get(key)
+        if group is not None:
+            return group
+        edits = self._key_edits(key)
+        if not edits:
+            return ()
+        keys = {near for variant in deletions(key, edits) for near in self._near.get(variant, ())}
+        return [phrase for near in keys if edit_distance(key, near, edits) <= edits for phrase in self._by_key[near]]
+
+    def match(self, text):
+        """The closest phrase as a FuzzyMatch, or None if nothing is close enough."""
+        text = " ".join(text.lower().split())
+        if not text:
+            return None
+        best = None
+        for phrase in self._candidates(phonetic_key(text)):
+            longest = max(len(text), len(phrase))
+            limit = int(longest * (1 - self.min_confidence))
+            d = edit_distance(text, phrase, limit)
+            if d <= limit and (best is None or d < best.distance):
+                best = FuzzyMatch(phrase, 1 - d / longest, d)
+        return best
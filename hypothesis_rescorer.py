@@ -0,0 +1,73 @@
+"""
+Hypothesis Rescorer Module
+Picks the recognizer alternative (N-best list) that makes the best command
+"""
+
+from command_parser import PAYLOAD_COMMANDS
+from lazy_import import lazy_import
+
+np = lazy_import("numpy")
+
+NUMBER_TOKEN = "<number>"
+
+
+class HypothesisRescorer:
+    """Scores a recognizer's alternatives against CommandParser's vocabulary.
+
+    Each alternative gets `VALID` if the dispatch table accepts it, plus the
+    share of its words that are in the command vocabulary (payload commands
+    such as "type ..." count as fully covered), minus `RANK` per place below
+    the top. So the recognizer's first choice wins unless it is not a command
+    and a later one is. Vocabulary lookups for all alternatives are a single
+    searchsorted over the sorted word hashes, which stays cheap however many
+    site aliases and macros the vocabulary holds.
+    """
+
+    VALID = 2.0
+    RANK = 0.1
+
+    def __init__(self, parser):
+        self.parser = parser
+        self._words = None
+        self._hashes = None  # sorted int64 hashes of self._words
+
+    def _vocabulary_hashes(self):
+        words = self.parser.vocabulary()
+        if words is not self._words:  # only rebuilt when keywords, aliases or macros change
+            words_and_number = set(words) | {NUMBER_TOKEN}
+            self._hashes = np.unique(
+                np.fromiter((hash(w) for w in words_and_number), dtype=np.int64, count=len(words_and_number))
+            )
+            self._words = words
+        return self._hashes
+
+    def score(self, alternatives):
+        """numpy array with one score per alternative (same order)."""
+        texts = [self.parser.normalize(text) for text in alternatives]
+        specs = [self.parser.match_command(text) if text else None for text in texts]
+        valid = np.array([spec is not None for spec in specs], dtype=np.float64)
+
+        tokens, owners = [], []
+        for i, text in enumerate(texts):
+            for word in text.split():
+                tokens.append(hash(NUMBER_TOKEN if word.isdigit() else word))
+                owners.append(i)
+        coverage = np.zeros(len(texts))
+        if tokens:
+            vocabulary = self._vocabulary_hashes()
+            tokens = np.array(tokens, dtype=np.int64)
+            owners = np.array(owners)
+            found = vocabulary[np.minimum(np.searchsorted(vocabulary, tokens), len(vocabulary) - 1)] == tokens
+            coverage = np.bincount(owners, weights=found, minlength=len(texts)) / np.maximum(
+                np.bincount(owners, minlength=len(texts)), 1
+            )
+        payload = np.array([spec is not None and spec.name in PAYLOAD_COMMANDS for spec in specs])
+        coverage = np.where(payload, 1.0, coverage)
+        return self.VALID * valid + coverage - self.RANK * np.arange(len(texts))
+
+    def best(self, alternatives):
+        """(index, transcript) of the highest-scoring alternative; ties go to the recognizer's order."""
+        if len(alternatives) == 1:
+            return 0, alternatives[0]
+        index = int(np.argmax(self.score(alternatives)))
+        return index, alternatives[index]
@@ -1,14 +1,18 @@
 # keyboard_controller.py
-import pyautogui
+from lazy_import import lazy_import
+from app_logging import get_logger
 import re
 
+pyautogui = lazy_import("pyautogui")
+logger = get_logger(__name__)
+
 class KeyboardController:
     def __init__(self, pause=0.05):
         pyautogui.PAUSE = pause
 
     def type_text(self, text: str):
         pyautogui.typewrite(text, interval=0.01)
-        print(f"Typed: {text}")
+        logger.debug("Typed: %s", text)
 
     def press_keys(self, keys_phrase: str):
         # Examples: "enter", "escape", "tab", "ctrl c", "ctrl v", "cmd l", "alt tab"
@@ -20,4 +24,4 @@ class KeyboardController:
             pyautogui.press(tokens[0])
         else:
             pyautogui.hotkey(*tokens)
-        print(f"Pressed: {' + '.join(tokens)}")
+        logger.debug("Pressed: %s", " + ".join(tokens))
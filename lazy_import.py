@@ -0,0 +1,114 @@
+"""
+Lazy Import Module
+Defers heavy imports (pyautogui, speech_recognition, numpy, tkinter) and hardware setup until first use
+"""
+
+import importlib
+import threading
+
+_modules = {}
+_modules_lock = threading.Lock()
+
+
+class LazyModule:
+    """Stands in for a module and imports it the first time one of its attributes is used.
+
+    Assignments made before the import (pyautogui.PAUSE = 0.1 in a constructor)
+    are remembered and applied once the module loads, so setting options does
+    not pull the module in on its own. Attributes are looked up on the real
+    module every time, which keeps unittest.mock patches on it visible.
+    """
+
+    def __init__(self, name):
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_module", None)
+        object.__setattr__(self, "_pending", {})
+        object.__setattr__(self, "_lock", threading.RLock())
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def _load(self):
+        module = self._module
+        if module is None:
+            with self._lock:
+                module = self._module
+                if module is None:
+                    module = importlib.import_module(self._name)
+                    for attr, value in self._pending.items():
+                        setattr(module, attr, value)
+                    self._pending.clear()
+                    object.__setattr__(self, "_module", module)
+        return module
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            with self._lock:
+                if attr in self._pending:
+                    return self._pending[attr]
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        with self._lock:
+            if self._module is None:
+                self._pending[attr] = value
+                return
+        setattr(self._module, attr, value)
+
+    def __repr__(self):
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+
+def lazy_import(name):
+    """Shared LazyModule for `name` (one per module, so pending assignments keep their order)."""
+    with _modules_lock:
+        module = _modules.get(name)
+        if module is None:
+            module = _modules[name] = LazyModule(name)
+        return module
+
+
+def load_all():
+    """Import every module lazy_import() has handed out; returns {name: error} for those that failed.
+
+    Frozen builds only bundle what PyInstaller saw imported statically, so
+    main --self-test runs this to catch a module missing from the build.
+    """
+    with _modules_lock:
+        modules = dict(_modules)
+    failed = {}
+    for name, module in modules.items():
+        try:
+            module._load()
+        except Exception as e:  # pyautogui raises more than ImportError without a display
+            failed[name] = e
+    return failed
+
+
+class deferred:
+    """Like functools.cached_property, but built once even when threads race for it.
+
+    Used for hardware and engines (microphone, recognizer backends) that should
+    be created off the startup path. Assigning the attribute replaces the value.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.name = factory.__name__
+        self.__doc__ = factory.__doc__
+        self._lock = threading.RLock()  # reentrant: one factory may use another deferred attribute
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        with self._lock:
+            try:
+                return obj.__dict__[self.name]
+            except KeyError:
+                value = obj.__dict__[self.name] = self.factory(obj)
+                return value
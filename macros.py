@@ -0,0 +1,102 @@
+"""
+Macros Module
+Named, recorded sequences of compiled commands, persisted between sessions
+"""
+
+import json
+import os
+import threading
+from action_plan import Action
+from app_logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class MacroStore:
+    """Macros kept in a JSON-lines file: {"name": ..., "steps": [[target, method, args], ...]}.
+
+    The file is only read the first time a macro is looked up. Saving appends
+    one line (the latest line for a name wins); the file is rewritten compactly
+    once superseded lines outnumber live ones.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._macros = None  # name -> tuple of Actions, loaded lazily
+        self._lines = 0  # lines in the file, live or superseded
+        self.version = 0  # bumped by every save and delete
+
+    def _load(self):
+        if self._macros is not None:
+            return self._macros
+        macros = {}
+        lines = 0
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    lines += 1
+                    try:
+                        entry = json.loads(line)
+                        macros[entry["name"]] = tuple(Action.from_list(step) for step in entry["steps"])
+                    except (ValueError, KeyError, TypeError) as e:
+                        logger.warning("Skipping bad macro entry: %s", e)
+        except FileNotFoundError:
+            pass
+        self._macros, self._lines = macros, lines
+        return macros
+
+    def names(self):
+        with self._lock:
+            return sorted(self._load())
+
+    def get(self, name):
+        """Steps of a macro (a tuple of Actions), or None."""
+        with self._lock:
+            return self._load().get(name)
+
+    def save(self, name, steps):
+        steps = tuple(steps)
+        with self._lock:
+            macros = self._load()
+            macros[name] = steps
+            self.version += 1
+            if self._lines >= 2 * len(macros):
+                self._rewrite(macros)
+            else:
+                self._append(name, steps)
+
+    def delete(self, name):
+        with self._lock:
+            macros = self._load()
+            if macros.pop(name, None) is None:
+                return False
+            self.version += 1
+            self._rewrite(macros)
+            return True
+
+    @staticmethod
+    def _encode(name, steps):
+        entry = {"name": name, "steps": [step.to_list() for step in steps]}
+        return json.dumps(entry, separators=(",", ":")) + "\n"
+
+    def _append(self, name, steps):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(self._encode(name, steps))
+        self._lines += 1
+
+    def _rewrite(self, macros):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for name, steps in macros.items():
+                f.write(self._encode(name, steps))
+        os.replace(tmp, self.path)
+        self._lines = len(macros)
@@ -4,23 +4,29 @@ Click-to-Talk: Voice Controlled Mouse Navigation
 Main application entry point
 """
 
+from telemetry import startup_timer  # first, so the startup clock covers every import below
 import sys
 import time
 import threading
-import tkinter as tk
-from tkinter import ttk
 
+from lazy_import import lazy_import, load_all
 from speech_handler import SpeechHandler
 from mouse_controller import MouseController
 from command_parser import CommandParser
 from config import Config
 from keyboard_controller import KeyboardController
 from window_manager import WindowManager
+from app_logging import get_logger, setup_logging, shutdown_logging
+
+tk = lazy_import("tkinter")  # loaded when start() builds the panel
+ttk = lazy_import("tkinter.ttk")
+logger = get_logger(__name__)
+startup_timer.mark("imports")
 
 
 class ClickToTalkApp:
-    def __init__(self):
-        self.config = Config()
+    def __init__(self, config=None):
+        self.config = config or Config()
         self.mouse_controller = MouseController(self.config)
         self.command_parser = CommandParser(self.config)
         self.keyboard_controller = KeyboardController(self.config)
@@ -43,6 +49,7 @@ class ClickToTalkApp:
 
         self.running = False
         self.root = None
+        startup_timer.mark("app_init")
 
     def start(self):
         """Start the voice control application"""
@@ -93,11 +100,15 @@ class ClickToTalkApp:
         root.overrideredirect(True)        # frameless window
         root.attributes("-topmost", True)  # keep above normal windows
 
+        # Reusable "find cursor" ring, owned by this (GUI) thread
+        self.mouse_controller.attach_overlay(root)
+
         W = self.config.gui_width
         H = self.config.gui_height
         TAB = 28                    # visible pull-tab width
-        step_px = 20                # slide step per tick
-        autohide_seconds = 30       # auto-hide delay
+        step_px = 20                # slide step per animation frame
+        frame_ms = 50               # animation frame interval
+        autohide_ms = 30 * 1000     # auto-hide delay
 
         sw = root.winfo_screenwidth()
         sh = root.winfo_screenheight()
@@ -109,40 +120,79 @@ class ClickToTalkApp:
         current_target_x = shown_x  # start fully visible
         last_interaction = time.time()
 
+        # Panel position is kept here instead of being parsed back out of root.geometry()
+        panel_x = shown_x
+        panel_y = y_default
+
+        # Pending after() jobs; None means that timer is not running
+        anim_job = None
+        autohide_job = None
+
+        def move_panel(x_val):
+            """Place the panel at x (y stays on the docked edge)."""
+            nonlocal panel_x
+            panel_x = x_val
+            root.geometry(f"{W}x{H}+{panel_x}+{panel_y}")
+
         # Start fully visible
-        root.geometry(f"{W}x{H}+{shown_x}+{y_default}")
-
-        def geom_tuple():
-            """Return (x, w, y) from current geometry safely."""
-            g = root.geometry()  # e.g. "320x420+1600+200"
-            try:
-                size, pos = g.split("+", 1)
-                w_str, h_str = size.split("x")
-                x_str, y_str = pos.split("+")
-                w_val = int(w_str)
-                x_val = int(x_str)
-                y_val = int(y_str)
-            except Exception:
-                w_val = W
-                x_val = shown_x
-                y_val = y_default
-            return x_val, w_val, y_val
+        move_panel(shown_x)
 
         def pointer_inside():
             """Check if the mouse pointer is inside the panel bounds."""
             px = root.winfo_pointerx()
             py = root.winfo_pointery()
-            x_val, _, y_val = geom_tuple()
-            return (x_val <= px <= x_val + W) and (y_val <= py <= y_val + H)
+            return (panel_x <= px <= panel_x + W) and (panel_y <= py <= panel_y + H)
 
         def touch(event=None):
             """Record user interaction (for auto-hide timer)."""
             nonlocal last_interaction
             last_interaction = time.time()
 
+        def animate():
+            """One slide step towards the target; re-schedules itself until it arrives."""
+            nonlocal anim_job
+            anim_job = None
+            x_val = panel_x
+            if abs(current_target_x - x_val) <= step_px:
+                x_val = current_target_x
+            else:
+                x_val += step_px if current_target_x > x_val else -step_px
+            move_panel(x_val)
+            place_tab()
+            if panel_x != current_target_x:
+                anim_job = root.after(frame_ms, animate)
+
+        def slide_to(x_val):
+            """Set the slide target; the animation only runs while there is distance left."""
+            nonlocal current_target_x, anim_job
+            current_target_x = x_val
+            if anim_job is None and panel_x != current_target_x:
+                anim_job = root.after(frame_ms, animate)
+            if current_target_x == shown_x:
+                schedule_autohide()
+
+        def schedule_autohide(delay_ms=autohide_ms):
+            nonlocal autohide_job
+            if autohide_job is None:
+                autohide_job = root.after(delay_ms, check_autohide)
+
+        def check_autohide():
+            """Auto-hide after inactivity, otherwise re-arm for the time that is left."""
+            nonlocal autohide_job
+            autohide_job = None
+            if current_target_x == hidden_x:
+                return  # already hidden: no timer until the panel is shown again
+            idle_ms = int((time.time() - last_interaction) * 1000)
+            if idle_ms < autohide_ms:
+                schedule_autohide(autohide_ms - idle_ms)
+            elif pointer_inside():
+                schedule_autohide()
+            else:
+                slide_to(hidden_x)
+
         def set_side(side):
             """Dock panel to left or right edge."""
-            nonlocal dock_side, shown_x, hidden_x, current_target_x
+            nonlocal dock_side, shown_x, hidden_x
             if side == dock_side:
                 return
             dock_side = side
@@ -153,40 +203,34 @@ class ClickToTalkApp:
             else:
                 shown_x = 0
                 hidden_x = -(W - TAB)      # only right chunk shown when hidden
-            x_val, _, y_val = geom_tuple()
-            root.geometry(f"{W}x{H}+{shown_x}+{y_val}")
-            current_target_x = shown_x
+            move_panel(shown_x)
+            slide_to(shown_x)
             touch()
             place_tab()
 
         def slide_open(event=None):
             """Slide panel fully into view."""
-            nonlocal current_target_x
             touch()
-            current_target_x = shown_x
+            slide_to(shown_x)
 
         def slide_close(event=None):
             """Slide panel out, leaving only the tab visible."""
-            nonlocal current_target_x
             if not pointer_inside():
-                current_target_x = hidden_x
+                slide_to(hidden_x)
 
         def minimize_panel(event=None):
             """Explicit minimize: hide the panel regardless of pointer location."""
-            nonlocal current_target_x
             touch()
-            current_target_x = hidden_x
+            slide_to(hidden_x)
 
         def maximize_panel(event=None):
             """Explicit maximize: show the panel fully."""
-            nonlocal current_target_x
             touch()
-            current_target_x = shown_x
+            slide_to(shown_x)
 
 
         def toggle_panel(event=None):
             """Toggle between open/closed."""
-            nonlocal current_target_x
             touch()
             if current_target_x == shown_x:
                 slide_close()
@@ -202,6 +246,25 @@ class ClickToTalkApp:
         status_var = tk.StringVar(value="Status: stopped")
         ttk.Label(content, textvariable=status_var, font=("Segoe UI", 11, "bold")).pack(pady=(10, 6))
 
+        def refresh_status():
+            status = "listening" if self.speech_handler.listening else "stopped"
+            status_var.set(f"Status: {status}")
+
+        # Only redraw the status when the listener actually starts/stops
+        self.speech_handler.set_status_callback(lambda listening: self._post_to_gui(refresh_status))
+
+        # Mic sensitivity: background calibration, then the tracked noise floor
+        noise_var = tk.StringVar(value="Mic threshold: calibrating...")
+        ttk.Label(content, textvariable=noise_var).pack(pady=(0, 6))
+
+        def refresh_noise(threshold, floor):
+            floor_text = f"{floor:.0f}" if floor is not None else "?"
+            noise_var.set(f"Mic threshold: {threshold:.0f} (noise floor {floor_text})")
+
+        self.speech_handler.set_noise_callback(
+            lambda threshold, floor: self._post_to_gui(lambda: refresh_noise(threshold, floor))
+        )
+
         # Start / Stop buttons (stacked)
         btn_col = ttk.Frame(content)
         btn_col.pack(pady=6, fill="x")
@@ -219,6 +282,20 @@ class ClickToTalkApp:
         ttk.Button(btn_col, text="Start Listening", command=_start_listen).pack(fill="x", padx=10)
         ttk.Button(btn_col, text="Stop", command=_stop_listen).pack(fill="x", padx=10, pady=(6, 0))
 
+        # Command latency (p50/p95/p99 over recent commands), refreshed as commands finish
+        latency_var = tk.StringVar(value="No commands timed yet")
+        ttk.Label(content, textvariable=latency_var, justify="left").pack(pady=(10, 2))
+
+        def refresh_latency():
+            latency_var.set(self.speech_handler.latency.format_summary())
+
+        def _export_latency():
+            touch()
+            self.export_latency()
+
+        self.speech_handler.latency.on_complete = lambda trace: self._post_to_gui(refresh_latency)
+        ttk.Button(content, text="Export timings", command=_export_latency).pack(fill="x", padx=10)
+
         # Movement distance slider
         ttk.Label(content, text="Movement distance (pixels)").pack(pady=(12, 2))
 
@@ -341,8 +418,11 @@ class ClickToTalkApp:
 
         place_tab()
 
-        # Allow voice commands to control the panel
-        self.command_parser.set_ui_callbacks(minimize_panel, maximize_panel)
+        # Allow voice commands to control the panel (they arrive on the speech thread)
+        self.command_parser.set_ui_callbacks(
+            lambda: self._post_to_gui(minimize_panel),
+            lambda: self._post_to_gui(maximize_panel),
+        )
 
         # Dock side hotkeys
         root.bind("<Control-Left>", lambda e: set_side("left"))
@@ -351,52 +431,75 @@ class ClickToTalkApp:
         # Escape to quit
         root.bind("<Escape>", lambda e: (self.stop(), root.destroy()))
 
+        refresh_status()
+        schedule_autohide()
+        root.after(0, self._gui_ready)  # first thing mainloop runs, i.e. once the panel is up
+
+        # Everything above is driven by Tk events and after() timers that only
+        # exist while there is work to do, so an idle panel costs no CPU.
         try:
-            while self.running:
-                root.update_idletasks()
-                root.update()
-
-                # Slide animation towards target x
-                x_val, _, y_val = geom_tuple()
-                if x_val != current_target_x:
-                    if abs(current_target_x - x_val) <= step_px:
-                        x_val = current_target_x
-                    else:
-                        x_val += step_px if current_target_x > x_val else -step_px
-                    root.geometry(f"{W}x{H}+{x_val}+{y_val}")
-                    place_tab()
-
-                # Auto-hide after inactivity
-                if (
-                    time.time() - last_interaction > autohide_seconds
-                    and current_target_x != hidden_x
-                    and not pointer_inside()
-                ):
-                    current_target_x = hidden_x
-
-                status = "listening" if self.speech_handler.listening else "stopped"
-                status_var.set(f"Status: {status}")
-                time.sleep(0.05)
+            root.mainloop()
         except KeyboardInterrupt:
-            print("\nInterrupted by user...")
+            logger.info("Interrupted by user...")
         finally:
             self.stop()
 
+    def export_latency(self):
+        """Append the command timings not yet exported to config.latency_log_path as JSON lines."""
+        path = self.config.latency_log_path
+        try:
+            count = self.speech_handler.latency.export_jsonl(path)
+            logger.info("Exported %d command timings to %s", count, path)
+        except OSError as e:
+            logger.error("Could not export command timings: %s", e)
+
+    @staticmethod
+    def _gui_ready():
+        if startup_timer.mark("gui_ready"):
+            logger.info(startup_timer.summary())
+
+    def _post_to_gui(self, callback):
+        """Run callback on the Tk thread (tkinter marshals after() calls from other threads)."""
+        if self.root is None:
+            return
+        try:
+            self.root.after(0, callback)
+        except (RuntimeError, tk.TclError):
+            pass  # GUI already gone
+
     def stop(self):
         """Stop the application"""
         self.running = False
         self.speech_handler.stop_listening()
-        print("Application stopped.")
+        if self.root is not None:
+            self._post_to_gui(self.root.quit)  # ends mainloop() when called from another thread
+        logger.info("Application stopped.")
+
+
+def self_test():
+    """Load every lazily imported module and exit; CI runs this on the frozen binary."""
+    failed = load_all()
+    for name, error in failed.items():
+        print(f"self-test: cannot import {name}: {error}")
+    if not failed:
+        print("self-test: ok")
+    return 1 if failed else 0
 
 
 def main():
     """Main entry point"""
+    if "--self-test" in sys.argv[1:]:
+        sys.exit(self_test())
+    config = Config()
+    setup_logging(config)
     try:
-        app = ClickToTalkApp()
+        app = ClickToTalkApp(config)
         app.start()
     except Exception as e:
-        print(f"Error starting application: {e}")
+        logger.error("Error starting application: %s", e)
         sys.exit(1)
+    finally:
+        shutdown_logging()  # flush whatever the queue still holds
 
 
 if __name__ == "__main__":
@@ -1,4 +1,5 @@
 # -*- mode: python ; coding: utf-8 -*-
+import sys
 
 
 a = Analysis(
@@ -6,7 +7,11 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[],
-    hiddenimports=[],
+    # imported lazily (lazy_import.py) or only when their backend loads, so invisible to the analysis
+    hiddenimports=[
+        'pyautogui', 'speech_recognition', 'numpy', 'tkinter', 'tkinter.ttk',
+        'vosk', 'pocketsphinx',
+    ],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -29,10 +34,14 @@ exe = EXE(
     upx=True,
     upx_exclude=[],
     runtime_tmpdir=None,
-    console=True,
+    console=False,  # windowed, as the release builds have always been
     disable_windowed_traceback=False,
     argv_emulation=False,
     target_arch=None,
     codesign_identity=None,
     entitlements_file=None,
 )
+
+if sys.platform == 'darwin':
+    # what --onefile --windowed produced before: the binary plus a main.app bundle
+    app = BUNDLE(exe, name='main.app', icon=None, bundle_identifier=None)
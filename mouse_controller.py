@@ -3,136 +3,754 @@ Mouse Controller Module
 Handles mouse movement and click simulation using pyautogui
 """
 
-import pyautogui
 from config import Config
-import threading  
-import tkinter as tk  
-import time  
+import queue
 import sys
+from functools import lru_cache
+import threading
+from concurrent.futures import Future, InvalidStateError
+import time
+from collections import deque
+from lazy_import import lazy_import
+from app_logging import get_logger
+
+pyautogui = lazy_import("pyautogui")
+tk = lazy_import("tkinter")  # only the overlays need it
+logger = get_logger(__name__)
+
+def _windows_monitors():
+    """Monitor rects via EnumDisplayMonitors (virtual-desktop coordinates)."""
+    import ctypes
+    from ctypes import wintypes
+
+    monitors = []
+    enum_proc = ctypes.WINFUNCTYPE(
+        ctypes.c_int, wintypes.HMONITOR, wintypes.HDC, ctypes.POINTER(wintypes.RECT), wintypes.LPARAM
+    )
+
+    def _collect(_monitor, _dc, rect, _data):
+        r = rect.contents
+        monitors.append((r.left, r.top, r.right - r.left, r.bottom - r.top))
+        return 1
+
+    ctypes.windll.user32.EnumDisplayMonitors(None, None, enum_proc(_collect), 0)
+    return monitors
+
+
+def _macos_monitors():
+    """Monitor rects via Quartz (ships with pyobjc, which pyautogui uses on macOS)."""
+    import Quartz
+
+    _err, display_ids, _count = Quartz.CGGetActiveDisplayList(16, None, None)
+    monitors = []
+    for display_id in display_ids:
+        b = Quartz.CGDisplayBounds(display_id)
+        monitors.append((int(b.origin.x), int(b.origin.y), int(b.size.width), int(b.size.height)))
+    return monitors
+
+
+class ScreenGeometry:
+    """Cached monitor layout and the virtual-desktop bounds that contain it.
+
+    The display server is asked at most once per `ttl` seconds; invalidate()
+    forces a fresh query (e.g. when the cursor turns up outside the known
+    desktop, which means a monitor was added or rearranged).
+    """
+
+    def __init__(self, ttl=5.0):
+        self.ttl = ttl
+        self.queries = 0  # how often the OS was actually asked
+        self._lock = threading.Lock()
+        self._monitors = None
+        self._bounds = None
+        self._fetched_at = 0.0
+
+    def invalidate(self):
+        with self._lock:
+            self._monitors = None
+
+    @property
+    def monitors(self):
+        """List of (left, top, width, height), one per monitor."""
+        return self._refresh()[0]
+
+    @property
+    def bounds(self):
+        """(left, top, right, bottom) of the whole virtual desktop."""
+        return self._refresh()[1]
+
+    def contains(self, x, y):
+        left, top, right, bottom = self.bounds
+        return left <= x <= right and top <= y <= bottom
+
+    def clamp(self, x, y):
+        left, top, right, bottom = self.bounds
+        return min(max(x, left), right), min(max(y, top), bottom)
+
+    def _refresh(self):
+        with self._lock:
+            now = time.monotonic()
+            if self._monitors is None or now - self._fetched_at > self.ttl:
+                monitors = self._query() or [(0, 0, *pyautogui.size())]
+                self._monitors = monitors
+                self._bounds = (
+                    min(m[0] for m in monitors),
+                    min(m[1] for m in monitors),
+                    max(m[0] + m[2] for m in monitors),
+                    max(m[1] + m[3] for m in monitors),
+                )
+                self._fetched_at = now
+                self.queries += 1
+            return self._monitors, self._bounds
+
+    def _query(self):
+        try:
+            if sys.platform == "win32":
+                return _windows_monitors()
+            if sys.platform == "darwin":
+                return _macos_monitors()
+        except Exception:
+            pass  # fall back to the primary screen
+        return None
+
+
+class _Motion:
+    """One tween in flight: from (x0, y0) to (x1, y1) over duration seconds."""
+
+    def __init__(self, start, target, duration, future):
+        self.start = start
+        self.target = target
+        self.duration = duration
+        self.future = future
+        self.started_at = time.monotonic()
+        self.current = start
+
+    def advance(self, now):
+        """Position for this frame, plus whether the motion is finished."""
+        t = 1.0 if self.duration <= 0 else min(1.0, (now - self.started_at) / self.duration)
+        x0, y0 = self.start
+        x1, y1 = self.target
+        return round(x0 + (x1 - x0) * t), round(y0 + (y1 - y0) * t), t >= 1.0
+
+
+class _Glide:
+    """Open-ended motion along a unit vector at a speed that eases toward target_speed.
+
+    Speed changes ("faster"/"slower") ramp at `acceleration` px/s^2 instead of
+    jumping; the glide ends by itself when it reaches the edge of `bounds`.
+    """
+
+    def __init__(self, start, vector, target_speed, acceleration, bounds, future):
+        self.start = start
+        self.vector = vector
+        self.target_speed = target_speed
+        self.acceleration = acceleration
+        self.bounds = bounds
+        self.future = future
+        self.speed = 0.0
+        self.current = start
+        self._pos = [float(start[0]), float(start[1])]
+        self._last = time.monotonic()
+
+    def advance(self, now):
+        dt = max(0.0, now - self._last)
+        self._last = now
+        step = self.acceleration * dt
+        if self.speed < self.target_speed:
+            self.speed = min(self.target_speed, self.speed + step)
+        else:
+            self.speed = max(self.target_speed, self.speed - step)
+
+        left, top, right, bottom = self.bounds
+        self._pos[0] = min(max(self._pos[0] + self.vector[0] * self.speed * dt, left), right)
+        self._pos[1] = min(max(self._pos[1] + self.vector[1] * self.speed * dt, top), bottom)
+        x, y = round(self._pos[0]), round(self._pos[1])
+        at_edge = (
+            (self.vector[0] < 0 and x <= left) or (self.vector[0] > 0 and x >= right)
+            or (self.vector[1] < 0 and y <= top) or (self.vector[1] > 0 and y >= bottom)
+        )
+        return x, y, at_edge
+
+
+class MotionEngine:
+    """Runs cursor tweens on its own timer thread.
+
+    move_to() returns a Future immediately; the tween is stepped every
+    frame_s seconds with pyautogui.moveTo(..., _pause=False), so neither the
+    caller nor the tween pays pyautogui.PAUSE. A newer move_to() retargets the
+    in-flight tween from wherever the cursor currently is (the superseded
+    future is cancelled), and cancel() halts it on the spot.
+
+    glide() starts open-ended motion that runs until cancelled or until it
+    reaches the desktop edge; set_glide_speed() changes its speed in flight.
+    Frames are scheduled against a fixed-rate clock, so the step rate does not
+    drift with the time spent inside moveTo().
+    """
+
+    def __init__(self, frame_s=1 / 60):
+        self.frame_s = frame_s
+        self._cond = threading.Condition()
+        self._motion = None
+        self._thread = None
+        self._closed = False
+        self.frames = 0
+
+    def move_to(self, x, y, duration=0.0, start=None):
+        """Tween to (x, y); start is where the cursor is now if no tween is running."""
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("motion engine is shut down")
+            previous = self._motion
+            if previous is not None:
+                start = previous.current  # retarget mid-flight: continue from here
+                previous.future.cancel()
+            elif start is None:
+                start = tuple(pyautogui.position())
+            self._motion = _Motion(start, (x, y), duration, future)
+            self._ensure_thread()
+            self._cond.notify_all()
+        return future
+
+    def glide(self, vector, speed, acceleration, bounds, start=None):
+        """Start gliding along unit vector (dx, dy); replaces any motion in flight."""
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("motion engine is shut down")
+            previous = self._motion
+            if previous is not None:
+                start = previous.current
+                previous.future.cancel()
+            elif start is None:
+                start = tuple(pyautogui.position())
+            self._motion = _Glide(start, vector, speed, acceleration, bounds, future)
+            self._ensure_thread()
+            self._cond.notify_all()
+        return future
+
+    def set_glide_speed(self, speed):
+        """Change the target speed of the glide in flight. Returns False if not gliding."""
+        with self._cond:
+            if not isinstance(self._motion, _Glide):
+                return False
+            self._motion.target_speed = speed
+            return True
+
+    def glide_speed(self):
+        """Target speed of the glide in flight, or None."""
+        with self._cond:
+            return self._motion.target_speed if isinstance(self._motion, _Glide) else None
+
+    def cancel(self):
+        """Halt the in-flight tween where it is. Returns the position it stopped at, or None."""
+        with self._cond:
+            motion = self._motion
+            if motion is None:
+                return None
+            self._motion = None
+            motion.future.cancel()
+            self._cond.notify_all()
+            return motion.current
+
+    def is_moving(self):
+        with self._cond:
+            return self._motion is not None
+
+    def shutdown(self):
+        self.cancel()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="motion-engine", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        next_frame = time.monotonic()
+        while True:
+            with self._cond:
+                if self._motion is None:
+                    self._cond.wait_for(lambda: self._motion is not None or self._closed)
+                    next_frame = time.monotonic()
+                if self._closed:
+                    return
+                motion = self._motion
+                x, y, done = motion.advance(time.monotonic())
+
+            try:
+                pyautogui.moveTo(x, y, _pause=False)
+            except Exception as e:  # FailSafeException included: stop and report it
+                with self._cond:
+                    if self._motion is motion:
+                        self._motion = None
+                try:
+                    motion.future.set_exception(e)
+                except InvalidStateError:
+                    pass  # the caller cancelled it meanwhile
+                continue
+
+            with self._cond:
+                self.frames += 1
+                motion.current = (x, y)
+                if self._motion is not motion:
+                    continue  # retargeted or cancelled while we were moving
+                if done:
+                    self._motion = None
+                    try:
+                        motion.future.set_result((x, y))
+                    except InvalidStateError:
+                        pass  # the caller cancelled it meanwhile
+                    continue
+                # sleep until the next frame tick, but wake at once on retarget/cancel/shutdown
+                next_frame += self.frame_s
+                delay = next_frame - time.monotonic()
+                if delay < 0:
+                    next_frame = time.monotonic()  # fell behind: don't try to catch up in a burst
+                    delay = 0
+                self._cond.wait_for(lambda: self._motion is not motion or self._closed, delay)
+
+
+@lru_cache(maxsize=64)
+def grid_cells(region, size=3):
+    """Split (left, top, width, height) into size*size cells, numbered row by row from 1."""
+    left, top, width, height = region
+    xs = [left + width * i // size for i in range(size + 1)]
+    ys = [top + height * i // size for i in range(size + 1)]
+    return tuple(
+        (xs[c], ys[r], xs[c + 1] - xs[c], ys[r + 1] - ys[r])
+        for r in range(size) for c in range(size)
+    )
+
+
+class MouseGrid:
+    """Numbered 3x3 grid over the screen that zooms into one cell per utterance.
+
+    Each select(n) narrows the region to cell n and parks the cursor at its
+    centre, so a handful of spoken digits reaches any pixel; the parser only
+    has to recognise cell numbers. back() undoes one zoom, close() hides it.
+    """
+
+    size = 3
+    min_cell = 3  # px; below this a cell cannot be split any further
+
+    def __init__(self, controller):
+        self.controller = controller
+        self.overlay = None  # GridOverlay, attached with the GUI
+        self._stack = []  # regions, outermost first; empty when the grid is closed
+
+    @property
+    def active(self):
+        return bool(self._stack)
+
+    @property
+    def region(self):
+        return self._stack[-1] if self._stack else None
+
+    @property
+    def depth(self):
+        return len(self._stack)
+
+    def cells(self):
+        return grid_cells(self.region, self.size) if self._stack else ()
+
+    def start(self):
+        """Cover the monitor the cursor is on (re-starting resets any zoom)."""
+        x, y = self.controller.get_position()
+        screen = self.controller.screen
+        region = next(
+            (m for m in screen.monitors if m[0] <= x < m[0] + m[2] and m[1] <= y < m[1] + m[3]),
+            screen.monitors[0],
+        )
+        self._stack = [region]
+        self._show()
+        logger.debug("Mouse grid shown")
+        return region
+
+    def select(self, number):
+        """Zoom into cell `number` (1-9) and centre the cursor in it."""
+        if not self._stack:
+            logger.info("Mouse grid is not active")
+            return None
+        if not 1 <= number <= self.size * self.size:
+            logger.info("No grid cell %s", number)
+            return None
+        cell = self.cells()[number - 1]
+        cx, cy = cell[0] + cell[2] // 2, cell[1] + cell[3] // 2
+        self.controller._move_to(cx, cy, 0.0, self.controller._current_position())
+        if min(cell[2], cell[3]) >= self.min_cell * self.size:
+            self._stack.append(cell)
+        self._show()
+        logger.debug("Grid cell %s", number)
+        return cell
+
+    def back(self):
+        """Undo the last zoom."""
+        if len(self._stack) > 1:
+            self._stack.pop()
+            self._show()
+        return self.region
+
+    def close(self, wait=False):
+        """Hide the grid; wait=True blocks (briefly) until it is off screen."""
+        if not self._stack:
+            return
+        self._stack = []
+        if self.overlay is not None:
+            self.overlay.request(None)
+            if wait:
+                self.overlay.wait_hidden()
+        logger.debug("Mouse grid closed")
+
+    def _show(self):
+        if self.overlay is not None:
+            self.overlay.request(self.region)
+
 
 class MouseController:
     def __init__(self, config):
         self.config = config
         pyautogui.FAILSAFE = True  # Enable failsafe
         pyautogui.PAUSE = self.config.mouse_pause  # Pause between actions
+        self.overlay = None  # HighlightOverlay, attached once the GUI exists
+        self.screen = ScreenGeometry(ttl=self.config.screen_cache_ttl)
+        self._tracked = None  # (x, y, monotonic time) of the last position we set
+        self.motion = MotionEngine(frame_s=self.config.motion_frame_ms / 1000.0)
+        self.grid = MouseGrid(self)
 
     def move_cursor(self, direction, distance=None):
-        """Move cursor in specified direction"""
+        """Move cursor in specified direction.
+
+        Returns a Future resolved with the final (x, y) once the tween lands
+        (or None for an unknown direction); the call itself never blocks.
+        """
         if distance is None:
             distance = self.config.default_move_distance
 
-        current_x, current_y = pyautogui.position()
+        current_x, current_y = self._current_position()
+        left, top, right, bottom = self.screen.bounds
+        future = None
 
         if direction == "up":
-            new_y = max(0, current_y - distance)
-            pyautogui.moveTo(current_x, new_y, duration=self.config.move_duration)
+            new_y = max(top, current_y - distance)
+            future = self._move_to(current_x, new_y, self.config.move_duration, (current_x, current_y))
         elif direction == "down":
-            screen_height = pyautogui.size()[1]
-            new_y = min(screen_height, current_y + distance)
-            pyautogui.moveTo(current_x, new_y, duration=self.config.move_duration)
+            new_y = min(bottom, current_y + distance)
+            future = self._move_to(current_x, new_y, self.config.move_duration, (current_x, current_y))
         elif direction == "left":
-            new_x = max(0, current_x - distance)
-            pyautogui.moveTo(new_x, current_y, duration=self.config.move_duration)
+            new_x = max(left, current_x - distance)
+            future = self._move_to(new_x, current_y, self.config.move_duration, (current_x, current_y))
         elif direction == "right":
-            screen_width = pyautogui.size()[0]
-            new_x = min(screen_width, current_x + distance)
-            pyautogui.moveTo(new_x, current_y, duration=self.config.move_duration)
+            new_x = min(right, current_x + distance)
+            future = self._move_to(new_x, current_y, self.config.move_duration, (current_x, current_y))
+
+        logger.debug("Moved %s by %s pixels", direction, distance)
+        return future
 
-        print(f"Moved {direction} by {distance} pixels")
+    def _current_position(self):
+        """Where the cursor is, without asking the OS if we moved it ourselves just now."""
+        ttl = self.config.position_cache_ttl
+        if ttl > 0 and self._tracked is not None:
+            x, y, at = self._tracked
+            if time.monotonic() - at <= ttl:
+                return x, y
+        return self.get_position()
+
+    def _move_to(self, x, y, duration=0.0, start=None):
+        # the target is where follow-up relative moves should start from,
+        # even while the tween is still on its way there
+        future = self.motion.move_to(x, y, duration, start=start)
+        self._tracked = (x, y, time.monotonic())
+        return future
+
+    GLIDE_VECTORS = {"up": (0, -1), "down": (0, 1), "left": (-1, 0), "right": (1, 0)}
+
+    def glide(self, direction):
+        """Start continuous motion in a direction at config.glide_speed. Returns a Future."""
+        vector = self.GLIDE_VECTORS.get(direction)
+        if vector is None:
+            return None
+        start = self._current_position()
+        future = self.motion.glide(
+            vector, self.config.glide_speed, self.config.glide_acceleration, self.screen.bounds, start=start
+        )
+        self._tracked = None  # position is in flux until the glide stops
+        logger.debug("Gliding %s", direction)
+        return future
+
+    def change_glide_speed(self, factor):
+        """Scale the current glide speed (e.g. "faster"/"slower"), keeping its direction."""
+        speed = self.motion.glide_speed()
+        if speed is None:
+            logger.info("Not gliding")
+            return None
+        speed = min(max(speed * factor, self.config.glide_min_speed), self.config.glide_max_speed)
+        self.motion.set_glide_speed(speed)
+        logger.debug("Glide speed %.0f px/s", speed)
+        return speed
+
+    def is_gliding(self):
+        return self.motion.glide_speed() is not None
+
+    def is_moving(self):
+        """True while a tween or glide is in flight."""
+        return self.motion.is_moving()
+
+    def stop_motion(self):
+        """Halt any in-flight tween where the cursor is now."""
+        stopped_at = self.motion.cancel()
+        if stopped_at is not None:
+            self._tracked = (*stopped_at, time.monotonic())
+            logger.debug("Cursor motion stopped")
+        return stopped_at
+
+    def invalidate_geometry(self):
+        """Forget cached screen layout and cursor position (display or user input changed)."""
+        self.screen.invalidate()
+        self._tracked = None
 
     def click(self, button="left"):
         """Perform mouse click"""
+        self.grid.close(wait=True)  # a click ends grid targeting; don't click the grid window
         if button == "left":
             pyautogui.click()
-            print("Left click performed")
+            logger.debug("Left click performed")
         elif button == "right":
             pyautogui.rightClick()
-            print("Right click performed")
+            logger.debug("Right click performed")
         elif button == "double":
             pyautogui.doubleClick()
-            print("Double click performed")
+            logger.debug("Double click performed")
 
     def scroll(self, direction, clicks=3):
         """Scroll mouse wheel"""
         if direction == "up":
             pyautogui.scroll(clicks)
-            print(f"Scrolled up {clicks} clicks")
+            logger.debug("Scrolled up %s clicks", clicks)
         elif direction == "down":
             pyautogui.scroll(-clicks)
-            print(f"Scrolled down {clicks} clicks")
+            logger.debug("Scrolled down %s clicks", clicks)
 
     def get_position(self):
         """Get current mouse position"""
-        return pyautogui.position()
+        x, y = pyautogui.position()
+        self._tracked = None
+        if not self.screen.contains(x, y):
+            self.screen.invalidate()  # cursor is off the known desktop: layout changed
+        return x, y
 
     def show_cursor_position(self):
         """Display current cursor position"""
         x, y = self.get_position()
-        print(f"Cursor position: ({x}, {y})")
+        logger.info("Cursor position: (%s, %s)", x, y)
+
+    def attach_overlay(self, root):
+        """Create the reusable highlight and grid windows. Must be called on the GUI thread."""
+        self.overlay = HighlightOverlay(root, self.config)
+        self.grid.overlay = GridOverlay(root, self.config)
+        return self.overlay
 
-    def highlight_cursor(self):  
+    def highlight_cursor(self):
         """Highlight or locate the cursor.
 
-        On macOS, avoid creating Tk windows from a background thread
-        (which crashes with 'NSWindow should only be instantiated on the main thread').
-        Use a simple mouse wiggle as a fallback. On other platforms,
-        show a Tk ring around the cursor.
-        """  
-        # --- macOS fallback: no Tk, just a quick wiggle ---
-        if sys.platform == "darwin":
+        With a GUI attached, a highlight request is queued to the persistent
+        overlay (safe from any thread, macOS included, since the window lives
+        on the GUI thread). Without one, fall back to a quick mouse wiggle.
+        """
+        if self.overlay is not None:
+            x, y = pyautogui.position()
+            self.overlay.request(x, y)
+            logger.debug("Cursor highlighted (find)")
+            return
+
+        try:
+            x, y = pyautogui.position()
+            # small wiggle to draw attention
+            pyautogui.moveTo(x + 10, y, duration=0.05)
+            pyautogui.moveTo(x - 10, y, duration=0.05)
+            pyautogui.moveTo(x, y, duration=0.05)
+        except Exception:
+            pass
+        logger.debug("Cursor highlighted (fallback wiggle)")
+
+    def highlight_stats(self):
+        """Time-to-visible figures for the overlay, or None when no GUI is attached."""
+        return self.overlay.stats() if self.overlay is not None else None
+
+
+class HighlightOverlay:
+    """Ring window built once on the GUI thread and kept withdrawn.
+
+    Other threads call request(x, y), which puts coordinates on a queue and
+    wakes the GUI thread; it drains the queue and moves + reveals the existing
+    window, so no widget is touched off the GUI thread and no new Tk root is made.
+    """
+
+    def __init__(self, root, config):
+        self.root = root
+        self.config = config
+        self._requests = queue.Queue()
+        self._hide_job = None
+        self.time_to_visible_ms = deque(maxlen=50)  # recent request -> visible latencies
+
+        size = config.highlight_size
+        border = config.highlight_border
+        self._radius = size // 2
+
+        self.window = tk.Toplevel(root)
+        self.window.withdraw()
+        self.window.overrideredirect(True)
+        self.window.attributes("-topmost", True)
+        self.window.geometry(f"{size}x{size}+0+0")
+
+        try:
+            self.window.attributes("-transparentcolor", "white")
+            transparent_supported = True
+        except Exception:
+            transparent_supported = False
+
+        canvas = tk.Canvas(
+            self.window, width=size, height=size, highlightthickness=0, bd=0,
+            bg="white" if transparent_supported else ""
+        )
+        canvas.pack()
+        if not transparent_supported:
+            canvas.create_oval(
+                border + 2, border + 2, size - (border + 2), size - (border + 2),
+                outline="", fill="#E6F6FF"
+            )
+        canvas.create_oval(
+            border, border, size - border, size - border,
+            outline=config.highlight_color, width=border
+        )
+        self.canvas = canvas
+
+    def request(self, x, y):
+        """Thread-safe: ask the GUI thread to show the ring centred on (x, y)."""
+        self._requests.put((x, y, time.perf_counter()))
+        try:
+            # tkinter hands after() calls from other threads to the running mainloop,
+            # so the GUI thread is woken per request instead of polling the queue
+            self.root.after(0, self.process_requests)
+        except (RuntimeError, tk.TclError):
+            pass  # GUI not running (yet); the request is shown on the next drain
+
+    def process_requests(self):
+        """GUI thread: show the newest pending request."""
+        latest = None
+        while True:
             try:
-                x, y = pyautogui.position()
-                # small wiggle to draw attention
-                pyautogui.moveTo(x + 10, y, duration=0.05)
-                pyautogui.moveTo(x - 10, y, duration=0.05)
-                pyautogui.moveTo(x, y, duration=0.05)
-            except Exception:
-                pass
-            print("Cursor highlighted (macOS fallback wiggle)")
-            return  
-
-        # --- original Tk highlight for non-macOS ---
-        def _show():  
-            try:  
-                x, y = pyautogui.position()  
-                size = self.config.highlight_size  
-                radius = size // 2  
-                border = self.config.highlight_border  
-                duration = self.config.highlight_duration_ms / 1000.0  
-
-                root = tk.Tk()  
-                root.overrideredirect(True)  
-                root.attributes("-topmost", True)  
-
-                try:  
-                    root.attributes("-transparentcolor", "white")  
-                    transparent_supported = True  
-                except Exception:  
-                    transparent_supported = False  
-
-                root.geometry(f"{size}x{size}+{x - radius}+{y - radius}")  
-
-                canvas = tk.Canvas(  
-                    root, width=size, height=size, highlightthickness=0, bd=0,  
-                    bg="white" if transparent_supported else ""  
-                )  
-                canvas.pack()  
-
-                canvas.create_oval(  
-                    border, border, size - border, size - border,  
-                    outline=self.config.highlight_color, width=border  
-                )  
-
-                if not transparent_supported:  
-                    canvas.create_oval(  
-                        border + 2, border + 2, size - (border + 2),  
-                        outline="", fill="#E6F6FF"  
-                    )  
-
-                root.after(int(self.config.highlight_duration_ms), root.destroy)  
-                root.mainloop()  
-            except Exception:  
-                pass  
-
-        threading.Thread(target=_show, daemon=True).start()  
-        print("Cursor highlighted (find)")
+                latest = self._requests.get_nowait()  # only the newest position matters
+            except queue.Empty:
+                break
+        if latest is None:
+            return
+
+        x, y, requested_at = latest
+        self.window.geometry(f"+{x - self._radius}+{y - self._radius}")
+        self.window.deiconify()
+        self.window.lift()
+        self.window.update_idletasks()
+        self.time_to_visible_ms.append((time.perf_counter() - requested_at) * 1000.0)
+
+        if self._hide_job is not None:
+            self.window.after_cancel(self._hide_job)
+        self._hide_job = self.window.after(int(self.config.highlight_duration_ms), self._hide)
+
+    def _hide(self):
+        self._hide_job = None
+        self.window.withdraw()
+
+    def stats(self):
+        samples = list(self.time_to_visible_ms)
+        return {
+            "count": len(samples),
+            "last_ms": samples[-1] if samples else None,
+            "avg_ms": sum(samples) / len(samples) if samples else None,
+            "max_ms": max(samples) if samples else None,
+        }
+
+
+class GridOverlay:
+    """Mouse grid window: one canvas whose lines and labels are moved, never rebuilt.
+
+    Like HighlightOverlay, request() may be called from any thread; drawing
+    happens on the GUI thread. request(None) hides the grid.
+    """
+
+    def __init__(self, root, config):
+        self.root = root
+        self.config = config
+        self._pending = queue.Queue()
+        self._hidden = threading.Event()
+        self._hidden.set()
+
+        self.window = tk.Toplevel(root)
+        self.window.withdraw()
+        self.window.overrideredirect(True)
+        self.window.attributes("-topmost", True)
+        try:
+            self.window.attributes("-transparentcolor", "white")
+            bg = "white"
+        except Exception:
+            self.window.attributes("-alpha", config.grid_alpha)
+            bg = "black"
+        self.canvas = tk.Canvas(self.window, highlightthickness=0, bd=0, bg=bg)
+        self.canvas.pack(fill="both", expand=True)
+
+        color = config.grid_color
+        count = MouseGrid.size
+        self._lines = [self.canvas.create_line(0, 0, 0, 0, fill=color, width=2) for _ in range(2 * (count + 1))]
+        self._labels = [
+            self.canvas.create_text(0, 0, text=str(n + 1), fill=color, font=("Helvetica", 24, "bold"))
+            for n in range(count * count)
+        ]
+
+    def request(self, region):
+        if region is not None:
+            self._hidden.clear()
+        self._pending.put(region)
+        try:
+            self.root.after(0, self.process_requests)
+        except (RuntimeError, tk.TclError):
+            pass  # GUI not running; drawn on the next drain
+
+    def wait_hidden(self, timeout=0.25):
+        """Block until the GUI thread has withdrawn the window (so a click lands underneath)."""
+        return self._hidden.wait(timeout)
+
+    def process_requests(self):
+        """GUI thread: draw (or hide) the newest requested region."""
+        region = missing = object()
+        while True:
+            try:
+                region = self._pending.get_nowait()
+            except queue.Empty:
+                break
+        if region is missing:
+            return
+        if region is None:
+            self.window.withdraw()
+            self.window.update_idletasks()
+            self._hidden.set()
+            return
+
+        left, top, width, height = region
+        self.window.geometry(f"{width}x{height}+{left}+{top}")
+        count = MouseGrid.size
+        for i in range(count + 1):  # verticals, then horizontals, in local coordinates
+            x = min(width * i // count, width - 1)
+            y = min(height * i // count, height - 1)
+            self.canvas.coords(self._lines[i], x, 0, x, height)
+            self.canvas.coords(self._lines[count + 1 + i], 0, y, width, y)
+        for label, cell in zip(self._labels, grid_cells(region, count)):
+            # numbers sit in the cell's corner, leaving the centre (where the cursor parks) clear
+            font_px = max(8, min(24, min(cell[2], cell[3]) // 3))
+            self.canvas.itemconfigure(label, font=("Helvetica", font_px, "bold"))
+            self.canvas.coords(label, cell[0] - left + font_px, cell[1] - top + font_px)
+        self.window.deiconify()
+        self.window.lift()
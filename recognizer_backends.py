@@ -0,0 +1,415 @@
+"""
+Recognizer Backends Module
+Pluggable speech-to-text engines used by SpeechHandler
+"""
+
+import json
+import threading
+from cloud_client import CloudRecognizer
+from lazy_import import lazy_import
+from app_logging import get_logger
+
+sr = lazy_import("speech_recognition")
+logger = get_logger(__name__)
+
+
+class BackendUnavailable(Exception):
+    """Raised when a backend cannot be loaded (missing package, model or data)."""
+
+
+class StreamSession:
+    """Incremental decode of one phrase: feed() raw PCM chunks, then finish().
+
+    feed() returns the current partial hypothesis (possibly empty); finish()
+    returns the final transcript or raises sr.UnknownValueError.
+    """
+
+    def feed(self, chunk):
+        raise NotImplementedError
+
+    def finish(self):
+        raise NotImplementedError
+
+
+class RecognizerBackend:
+    """Base class for speech-to-text engines.
+
+    load() is called once at startup and should do all the expensive work
+    (model loading, decoder setup); recognize() is then called per phrase,
+    possibly from several recognizer workers at once.
+
+    recognize() returns the transcript, raises sr.UnknownValueError when the
+    audio held no usable speech and sr.RequestError when the engine itself failed
+    (the latter is what makes a BackendChain try the next backend).
+
+    Engines that can decode against a closed vocabulary read it from the
+    grammar provider (normally CommandParser.grammar) on every phrase, so
+    alias/keyword edits are picked up without a restart.
+    """
+
+    name = "base"
+    supports_streaming = False  # True if start_stream() is implemented
+
+    def __init__(self, config, recognizer=None):
+        self.config = config
+        self.recognizer = recognizer
+        self.grammar_provider = None
+        self.loaded = False
+
+    def load(self):
+        self.loaded = True
+
+    def set_grammar_provider(self, provider):
+        """provider() -> CommandGrammar; used by engines that support constrained decoding."""
+        self.grammar_provider = provider
+
+    def _current_grammar(self):
+        if self.grammar_provider is None or not self.config.grammar_constrained:
+            return None
+        return self.grammar_provider()
+
+    def recognize(self, audio):
+        raise NotImplementedError
+
+    def recognize_alternatives(self, audio, limit):
+        """Up to `limit` candidate transcripts, most likely first (engines without an N-best list give one)."""
+        return [self.recognize(audio)]
+
+    def start_stream(self, sample_rate, sample_width=2):
+        """Begin decoding a phrase chunk by chunk; returns a StreamSession."""
+        raise NotImplementedError
+
+    def stats(self):
+        """Request statistics for pipeline_stats(), or None if the engine keeps none."""
+        return None
+
+    def close(self):
+        self.loaded = False
+
+
+class GoogleBackend(RecognizerBackend):
+    """Google Web Speech API (needs network).
+
+    Requests go through cloud_client.CloudRecognizer, which trims and
+    downsamples the upload and keeps connections alive, or with
+    config.cloud_client off through speech_recognition's recognize_google.
+    load() opens the connections on a background thread and returns at
+    once, so a slow or unreachable network does not hold up listening.
+    """
+
+    name = "google"
+
+    def __init__(self, config, recognizer=None):
+        super().__init__(config, recognizer)
+        self.client = CloudRecognizer(config) if config.cloud_client else None
+        self.warm_up_thread = None
+
+    def load(self):
+        if self.client is not None:
+            self.warm_up_thread = threading.Thread(target=self.client.warm_up, name="cloud-warm-up", daemon=True)
+            self.warm_up_thread.start()
+        super().load()
+
+    def recognize(self, audio):
+        if self.client is None:
+            return self.recognizer.recognize_google(audio)
+        return self.recognize_alternatives(audio, 1)[0]
+
+    def recognize_alternatives(self, audio, limit):
+        # the raw response: {"alternative": [{"transcript", "confidence"?}, ...]} or []
+        if self.client is not None:
+            result = self.client.recognize(audio)
+        else:
+            result = self.recognizer.recognize_google(audio, show_all=True)
+        alternatives = result.get("alternative") if isinstance(result, dict) else None
+        transcripts = [alt["transcript"] for alt in alternatives or () if alt.get("transcript")]
+        if not transcripts:
+            raise sr.UnknownValueError()
+        return transcripts[:limit]
+
+    def stats(self):
+        return self.client.stats() if self.client is not None else None
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+        super().close()
+
+
+class VoskBackend(RecognizerBackend):
+    """Offline Kaldi recognizer; the model is loaded once and kept resident."""
+
+    name = "vosk"
+    sample_rate = 16000
+    supports_streaming = True
+
+    def load(self):
+        try:
+            import vosk
+        except ImportError as e:
+            raise BackendUnavailable("vosk is not installed (pip install vosk)") from e
+        if not self.config.vosk_model_path:
+            raise BackendUnavailable("config.vosk_model_path is not set")
+        vosk.SetLogLevel(-1)
+        self._vosk = vosk
+        try:
+            self.model = vosk.Model(self.config.vosk_model_path)  # the slow part: done once
+        except Exception as e:
+            raise BackendUnavailable(f"could not load Vosk model: {e}") from e
+        self.loaded = True
+
+    def recognize(self, audio):
+        # the C API wants bytes; phrases cut from the capture ring arrive as memoryviews
+        raw = bytes(audio.get_raw_data(convert_rate=self.sample_rate, convert_width=2))
+        grammar = self._current_grammar()
+        text = self._decode(raw, grammar.to_vosk() if grammar else None)
+        if grammar and grammar.needs_open_vocabulary(text):
+            text = self._decode(raw)  # free-form payload ("type ..."): decode again unconstrained
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+    def start_stream(self, sample_rate, sample_width=2):
+        # Kaldi resamples internally, so the mic's native rate can be fed directly
+        return VoskStream(self, sample_rate, self._current_grammar())
+
+    def _decode(self, raw, grammar_json=None):
+        # KaldiRecognizer is cheap and per-utterance; the Model is shared between workers
+        if grammar_json:
+            rec = self._vosk.KaldiRecognizer(self.model, self.sample_rate, grammar_json)
+        else:
+            rec = self._vosk.KaldiRecognizer(self.model, self.sample_rate)
+        rec.AcceptWaveform(raw)
+        return json.loads(rec.FinalResult()).get("text", "")
+
+
+class VoskStream(StreamSession):
+    def __init__(self, backend, sample_rate, grammar):
+        self.backend = backend
+        self.sample_rate = sample_rate
+        self.grammar = grammar
+        self._raw = bytearray()  # kept for an open-vocabulary re-decode of the payload
+        self._final_parts = []
+        vosk = backend._vosk
+        if grammar is not None:
+            self._rec = vosk.KaldiRecognizer(backend.model, sample_rate, grammar.to_vosk())
+        else:
+            self._rec = vosk.KaldiRecognizer(backend.model, sample_rate)
+
+    def feed(self, chunk):
+        self._raw += chunk
+        if self._rec.AcceptWaveform(bytes(chunk)):
+            # Kaldi found an internal endpoint; keep that segment and carry on
+            self._final_parts.append(json.loads(self._rec.Result()).get("text", ""))
+            return " ".join(p for p in self._final_parts if p)
+        partial = json.loads(self._rec.PartialResult()).get("partial", "")
+        return " ".join(p for p in self._final_parts + [partial] if p)
+
+    def finish(self):
+        self._final_parts.append(json.loads(self._rec.FinalResult()).get("text", ""))
+        text = " ".join(p for p in self._final_parts if p)
+        if self.grammar is not None and self.grammar.needs_open_vocabulary(text):
+            rec = self.backend._vosk.KaldiRecognizer(self.backend.model, self.sample_rate)
+            rec.AcceptWaveform(bytes(self._raw))
+            text = json.loads(rec.FinalResult()).get("text", "")
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+
+class SphinxBackend(RecognizerBackend):
+    """Offline CMU PocketSphinx with a single long-lived decoder."""
+
+    name = "sphinx"
+    sample_rate = 16000
+    grammar_search = "commands"
+
+    def load(self):
+        try:
+            from pocketsphinx import Decoder
+        except ImportError as e:
+            raise BackendUnavailable("pocketsphinx is not installed (pip install pocketsphinx)") from e
+        try:
+            self.decoder = Decoder(samprate=self.sample_rate)  # bundled en-us model
+        except Exception as e:
+            raise BackendUnavailable(f"could not start PocketSphinx decoder: {e}") from e
+        self._lock = threading.Lock()  # one decoder handles one utterance at a time
+        self._default_search = self.decoder.current_search()
+        self._grammar_fingerprint = None
+        self.loaded = True
+
+    def recognize(self, audio):
+        # the C API wants bytes; phrases cut from the capture ring arrive as memoryviews
+        raw = bytes(audio.get_raw_data(convert_rate=self.sample_rate, convert_width=2))
+        grammar = self._current_grammar()
+        with self._lock:
+            if grammar is not None:
+                self._use_grammar(grammar)
+                text = self._decode(raw, self.grammar_search)
+                if grammar.needs_open_vocabulary(text):
+                    text = self._decode(raw, self._default_search)
+            else:
+                text = self._decode(raw, self._default_search)
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+    def _use_grammar(self, grammar):
+        """(Re)compile the JSGF search when the command vocabulary changed."""
+        if grammar.fingerprint == self._grammar_fingerprint:
+            return
+        words = [w for w in grammar.words if self.decoder.lookup_word(w) is not None]
+        self.decoder.add_jsgf_string(self.grammar_search, grammar.to_jsgf(words))
+        self._grammar_fingerprint = grammar.fingerprint
+
+    def _decode(self, raw, search):
+        self.decoder.activate_search(search)
+        self.decoder.start_utt()
+        self.decoder.process_raw(raw, full_utt=True)
+        self.decoder.end_utt()
+        hyp = self.decoder.hyp()
+        return hyp.hypstr if hyp is not None else ""
+
+
+class ReplayStream(StreamSession):
+    """Reveals the next replay transcript one word per fed chunk."""
+
+    def __init__(self, text):
+        self.words = text.split() if text else []
+        self.fed = 0
+
+    def feed(self, chunk):
+        self.fed += 1
+        return " ".join(self.words[:self.fed])
+
+    def finish(self):
+        if not self.words:
+            raise sr.UnknownValueError()
+        return " ".join(self.words)
+
+
+class ReplayBackend(RecognizerBackend):
+    """Returns config.replay_transcripts one per phrase; no mic or network needed.
+
+    Used to benchmark and test the pipeline deterministically. With
+    config.replay_loop the list starts over, otherwise an exhausted list
+    behaves like unintelligible audio. An entry may be a list of
+    alternatives (an N-best list); recognize() then returns the first.
+    """
+
+    name = "replay"
+    supports_streaming = True
+
+    def load(self):
+        self._lock = threading.Lock()
+        self._index = 0
+        self.loaded = True
+
+    def recognize(self, audio):
+        return self.recognize_alternatives(audio, 1)[0]
+
+    def recognize_alternatives(self, audio, limit):
+        transcripts = self.config.replay_transcripts
+        with self._lock:
+            if not transcripts or (self._index >= len(transcripts) and not self.config.replay_loop):
+                raise sr.UnknownValueError()
+            entry = transcripts[self._index % len(transcripts)]
+            self._index += 1
+        alternatives = [entry] if isinstance(entry, str) else list(entry)
+        return alternatives[:limit]
+
+    def start_stream(self, sample_rate, sample_width=2):
+        try:
+            text = self.recognize(None)
+        except sr.UnknownValueError:
+            text = ""
+        return ReplayStream(text)
+
+
+BACKENDS = {
+    GoogleBackend.name: GoogleBackend,
+    VoskBackend.name: VoskBackend,
+    SphinxBackend.name: SphinxBackend,
+    ReplayBackend.name: ReplayBackend,
+}
+
+
+def create_backend(name, config, recognizer=None):
+    """Instantiate a backend by its config name."""
+    try:
+        return BACKENDS[name](config, recognizer)
+    except KeyError:
+        raise ValueError(f"Unknown recognizer backend: {name}") from None
+
+
+class BackendChain:
+    """Primary backend plus ordered fallbacks.
+
+    Backends that fail to load are skipped at startup. At recognition time a
+    RequestError (engine/network failure) moves on to the next backend, while
+    UnknownValueError is returned straight away: the engine worked, the audio didn't.
+    """
+
+    def __init__(self, backends):
+        self.backends = list(backends)
+        self.last_backend = None
+
+    @classmethod
+    def from_config(cls, config, recognizer=None):
+        names = [config.recognizer_backend]
+        names += [n for n in config.recognizer_fallbacks if n not in names]
+        return cls(create_backend(n, config, recognizer) for n in names)
+
+    @property
+    def names(self):
+        return [b.name for b in self.backends]
+
+    def streaming_backend(self):
+        """First loaded backend that can decode incrementally, or None."""
+        return next((b for b in self.backends if b.supports_streaming), None)
+
+    def set_grammar_provider(self, provider):
+        for backend in self.backends:
+            backend.set_grammar_provider(provider)
+
+    def load(self):
+        """Load every backend once; drop the ones that are unavailable."""
+        usable = []
+        for backend in self.backends:
+            try:
+                backend.load()
+                usable.append(backend)
+            except BackendUnavailable as e:
+                logger.warning("Recognizer backend '%s' unavailable: %s", backend.name, e)
+        self.backends = usable
+        return self
+
+    def recognize(self, audio):
+        return self._first_working("recognize", audio)
+
+    def recognize_alternatives(self, audio, limit):
+        return self._first_working("recognize_alternatives", audio, limit)
+
+    def _first_working(self, method, *args):
+        errors = []
+        for backend in self.backends:
+            try:
+                result = getattr(backend, method)(*args)
+                self.last_backend = backend.name
+                return result
+            except sr.RequestError as e:
+                errors.append(f"{backend.name}: {e}")
+        raise sr.RequestError("; ".join(errors) or "no recognizer backend available")
+
+    def stats(self):
+        """Request statistics of the backends that keep any, by backend name."""
+        stats = {}
+        for backend in self.backends:
+            backend_stats = backend.stats()
+            if backend_stats is not None:
+                stats[backend.name] = backend_stats
+        return stats
+
+    def close(self):
+        for backend in self.backends:
+            backend.close()
@@ -0,0 +1,305 @@
+"""
+Replay Harness Module
+Runs transcript scripts or recorded WAV files through the speech pipeline without a mic,
+with recording stand-ins for the mouse, keyboard and window controllers and a local
+stand-in for the cloud recognition service
+"""
+
+import contextlib
+import copy
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from command_parser import CommandParser
+from config import Config
+from lazy_import import lazy_import
+from speech_handler import EndOfInput, SpeechHandler
+
+sr = lazy_import("speech_recognition")
+
+
+class ActionLog:
+    """Timestamped controller calls, in the order they were made (thread-safe)."""
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._origin = clock()
+        self._entries = []
+
+    def reset(self):
+        """Forget earlier calls and measure times from now."""
+        with self._lock:
+            self._origin = self.clock()
+            self._entries = []
+
+    def record(self, target, method, args):
+        with self._lock:
+            self._entries.append((round((self.clock() - self._origin) * 1000.0, 3), target, method, args))
+
+    def entries(self):
+        """[(milliseconds since reset, target, method, args)]"""
+        with self._lock:
+            return list(self._entries)
+
+    def calls(self):
+        """The calls alone, as "mouse.click('left')" strings (handy in assertions)."""
+        return [f"{target}.{method}({', '.join(repr(a) for a in args)})" for _, target, method, args in self.entries()]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class RecordingController:
+    """Accepts any method call (dotted ones too, e.g. grid.select) and logs it instead of acting.
+
+    `queries` are read-only methods the app polls (is_moving); they return
+    the given value and are not logged, so the log only holds actions.
+    """
+
+    target = None
+    queries = {}
+
+    def __init__(self, log, path=""):
+        self._log = log
+        self._path = path
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return type(self)(self._log, f"{self._path}.{name}" if self._path else name)
+
+    def __call__(self, *args):
+        if self._path in self.queries:
+            return self.queries[self._path]
+        self._log.record(self.target, self._path, args)
+        return None
+
+    def __repr__(self):
+        return f"<recording {self.target}.{self._path}>" if self._path else f"<recording {self.target}>"
+
+
+class RecordingMouse(RecordingController):
+    target = "mouse"
+    queries = {"is_moving": False, "is_gliding": False, "get_position": (0, 0)}
+
+
+class RecordingKeyboard(RecordingController):
+    target = "keyboard"
+
+
+class RecordingWindowManager(RecordingController):
+    target = "window"
+
+
+class ReplayHarness:
+    """Feeds phrases through a real SpeechHandler and CommandParser wired to recording controllers.
+
+    Each run builds a fresh SpeechHandler whose microphone is replaced by the
+    phrase list: listen() hands out one phrase per call and raises EndOfInput
+    when they run out, so every phrase is recognized and executed before the
+    run returns. Transcript scripts use the "replay" backend; WAV files go to
+    the configured backend unless transcripts are given for them too.
+    """
+
+    def __init__(self, config=None):
+        if config is None:
+            config = Config()
+            # recorded macros must not end up in the user's own macro file
+            config.macro_path = os.path.join(tempfile.mkdtemp(prefix="click_to_talk_replay_"), "macros.jsonl")
+        self.config = config
+        self.log = ActionLog()
+        self.mouse = RecordingMouse(self.log)
+        self.keyboard = RecordingKeyboard(self.log)
+        self.window = RecordingWindowManager(self.log)
+        self.parser = CommandParser(config)
+        self.parser.set_mouse_controller(self.mouse)
+        self.parser.set_keyboard_controller(self.keyboard)
+        self.parser.set_window_manager(self.window)
+        self.handler = None  # the SpeechHandler of the latest run
+
+    def run_transcripts(self, transcripts):
+        """Run one phrase per transcript (no audio processing). Returns the run's report."""
+        silence = sr.AudioData(b"\0\0" * 160, 16000, 2)
+        return self._run(
+            [silence] * len(transcripts),
+            recognizer_backend="replay",
+            recognizer_fallbacks=[],
+            replay_transcripts=list(transcripts),
+            replay_loop=False,
+            vad_enabled=False,
+            noise_tracking=False,
+        )
+
+    def run_wav(self, paths, transcripts=None):
+        """Run recorded WAV files, one phrase each, through VAD and recognition.
+
+        With `transcripts` the replay backend stands in for recognition, which
+        measures everything but the engine itself.
+        """
+        recognizer = sr.Recognizer()
+        phrases = []
+        for path in paths:
+            with sr.AudioFile(path) as source:
+                phrases.append(recognizer.record(source))
+        overrides = {}
+        if transcripts is not None:
+            overrides = dict(
+                recognizer_backend="replay",
+                recognizer_fallbacks=[],
+                replay_transcripts=list(transcripts),
+                replay_loop=False,
+            )
+        return self._run(phrases, **overrides)
+
+    def _run(self, phrases, **overrides):
+        config = copy.copy(self.config)
+        config.__dict__.update(overrides)
+        config.noise_calibration_s = 0  # there is no room to measure
+        config.streaming_enabled = False
+        config.capture_ring_s = 0  # phrases come from listen() below, not from a mic stream
+        config.capture_overflow_policy = "block"  # a benchmark must not lose phrases
+        config.latency_history = max(config.latency_history, len(phrases))
+
+        handler = self.handler = SpeechHandler(config, self.parser, self.mouse)
+        handler.microphone = contextlib.nullcontext()
+        remaining = iter(phrases)
+
+        def listen(source, timeout=None, phrase_time_limit=None):
+            try:
+                return next(remaining)
+            except StopIteration:
+                raise EndOfInput() from None
+
+        handler.recognizer.listen = listen
+        self.log.reset()
+        started = time.perf_counter()
+        handler.start_listening()
+        elapsed = time.perf_counter() - started
+
+        executed = handler.latency.completed
+        return {
+            "phrases": len(phrases),
+            "executed": executed,
+            "actions": len(self.log),
+            "elapsed_s": round(elapsed, 6),
+            "commands_per_s": round(executed / elapsed, 1) if elapsed > 0 else None,
+            "latency": handler.latency.summary(),
+            "parse_cache": self.parser.cache_stats(),
+        }
+
+
+class LocalRecognitionServer:
+    """Stand-in for the cloud speech service on 127.0.0.1, for tests and benchmarks.
+
+    Answers the Google web speech API requests that cloud_client.CloudRecognizer
+    makes with `transcripts` in turn: a string, a list of alternatives, or ""
+    for unintelligible audio. `upload_bytes_per_s` reads request bodies no
+    faster than that, like a slow uplink, and `delay_s` is the service's own
+    processing time, reported in a Server-Timing header; a list gives each
+    request its own, the last one repeating. The first `fail_first` requests
+    are answered 503. Connections are kept alive. `requests` keeps the path,
+    content type, size and client port of every request. Use it as a context
+    manager.
+    """
+
+    def __init__(self, transcripts=("click",), upload_bytes_per_s=None, delay_s=0.0, fail_first=0):
+        self.transcripts = list(transcripts)
+        self.upload_bytes_per_s = upload_bytes_per_s
+        self.delay_s = delay_s
+        self.fail_first = fail_first
+        self.requests = []
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/speech-api/v2/recognize"
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        self._server = _StandInHTTPServer(("127.0.0.1", 0), self._handler_class())
+        if self.upload_bytes_per_s:
+            self._server.throttle()
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _admit(self, path, content_type, body_bytes, port):
+        """Record a received request; returns (status, processing delay, response body)."""
+        with self._lock:
+            index = len(self.requests)
+            self.requests.append({"path": path, "content_type": content_type, "bytes": body_bytes, "port": port})
+            entry = self.transcripts[index % len(self.transcripts)] if self.transcripts else ""
+        delays = self.delay_s if isinstance(self.delay_s, (list, tuple)) else [self.delay_s]
+        delay = delays[min(index, len(delays) - 1)]
+        if index < self.fail_first:
+            return 503, delay, b'{"error":"unavailable"}\n'
+        alternatives = [entry] if isinstance(entry, str) else list(entry)
+        lines = ['{"result":[]}']
+        if any(alternatives):
+            result = {"alternative": [{"transcript": text} for text in alternatives], "final": True}
+            lines.append(json.dumps({"result": [result], "result_index": 0}))
+        return 200, delay, ("\n".join(lines) + "\n").encode("utf-8")
+
+    def _handler_class(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real service
+            disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+            def do_POST(self):
+                remaining = int(self.headers.get("Content-Length", 0))
+                size = remaining
+                started = time.perf_counter()
+                while remaining:
+                    piece = self.rfile.read(min(4096, remaining))
+                    if not piece:
+                        return
+                    remaining -= len(piece)
+                    if stand_in.upload_bytes_per_s:
+                        pause = started + (size - remaining) / stand_in.upload_bytes_per_s - time.perf_counter()
+                        if pause > 0:
+                            time.sleep(pause)
+                received = time.perf_counter()
+                status, delay, reply = stand_in._admit(
+                    self.path, self.headers.get("Content-Type"), size, self.client_address[1]
+                )
+                if delay:
+                    time.sleep(delay)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Server-Timing", f"recognize;dur={(time.perf_counter() - received) * 1000:.3f}")
+                self.send_header("Content-Length", str(len(reply)))
+                self.end_headers()
+                self.wfile.write(reply)
+
+            def log_message(self, format, *args):
+                pass  # no per-request lines on stderr
+
+        return Handler
+
+
+class _StandInHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def throttle(self):
+        # a small receive window makes the client's send block like it would on a slow uplink
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8192)
@@ -3,92 +3,699 @@ Speech Handler Module
 Handles microphone input and speech-to-text conversion
 """
 
-import speech_recognition as sr
 from config import Config
-import threading  
+from recognizer_backends import BackendChain
+from action_plan import ActionPlan
+from audio_processing import AudioRingBuffer, NoiseFloorEstimator, VoiceActivityDetector
+from hypothesis_rescorer import HypothesisRescorer
+from lazy_import import deferred, lazy_import
+from telemetry import LatencyTracker, startup_timer
+from app_logging import get_logger
+import threading
+import time
+from collections import deque
+
+sr = lazy_import("speech_recognition")
+np = lazy_import("numpy")
+logger = get_logger(__name__)
+
+
+class StageClosed(Exception):
+    """Raised by StageQueue.get() once the queue is closed and drained."""
+
+
+class EndOfInput(Exception):
+    """Raised by a replayed audio source when it has no phrases left.
+
+    Unlike a stop, the phrases already captured are still recognized and
+    executed before start_listening() returns.
+    """
+
+
+class StageQueue:
+    """Bounded FIFO between two pipeline stages.
+
+    policy="block" makes put() wait for room (backpressure on the producer);
+    policy="drop_oldest" evicts the oldest queued item and hands it to on_drop.
+    Depth counters are kept so the GUI/tests can see where work piles up.
+    """
+
+    def __init__(self, name, maxsize=0, policy="block", on_drop=None):
+        self.name = name
+        self.maxsize = maxsize
+        self.policy = policy
+        self.on_drop = on_drop
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.enqueued = 0
+        self.dropped = 0
+        self.high_water = 0
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+    def put(self, item, timeout=None):
+        """Enqueue item. Returns False if a blocking put timed out or the queue is closed."""
+        dropped = None
+        with self._cond:
+            if self._closed:
+                return False
+            if self.maxsize and len(self._items) >= self.maxsize:
+                if self.policy == "drop_oldest":
+                    dropped = self._items.popleft()
+                    self.dropped += 1
+                elif not self._cond.wait_for(
+                    lambda: self._closed or len(self._items) < self.maxsize, timeout
+                ) or self._closed:
+                    return False
+            self._items.append(item)
+            self.enqueued += 1
+            self.high_water = max(self.high_water, len(self._items))
+            self._cond.notify_all()
+        if dropped is not None and self.on_drop:
+            self.on_drop(dropped)
+        return True
+
+    def get(self, timeout=None):
+        """Dequeue the oldest item; raises StageClosed once closed and empty."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self._closed, timeout):
+                raise TimeoutError(f"{self.name} queue empty")
+            if not self._items:
+                raise StageClosed(self.name)
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def close(self):
+        """Stop accepting items; consumers drain what is left and then see StageClosed."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "depth": len(self._items),
+                "high_water": self.high_water,
+                "enqueued": self.enqueued,
+                "dropped": self.dropped,
+            }
+
+
+class _StreamJob:
+    """A transcript queued for execution in streaming mode; the guard may revoke it."""
+
+    __slots__ = ("text", "revoked")
+
+    def __init__(self, text):
+        self.text = text
+        self.revoked = False
+
 
 class SpeechHandler:
     def __init__(self, config, command_parser, mouse_controller):
         self.config = config
         self.command_parser = command_parser
         self.mouse_controller = mouse_controller
-        self.recognizer = sr.Recognizer()
-        self.microphone = sr.Microphone()
+        # recognizer, microphone and backend are built on first use (see _warm_up),
+        # so constructing the handler never waits on PortAudio or a model load
+        # Noise-only phrases are dropped before they cost a recognition round-trip
+        self.vad = VoiceActivityDetector(config) if config.vad_enabled else None
         self.listening = False
         self.stop_callback = None
+        self.status_callback = None
+        self.noise_callback = None
         self._active_lock = threading.Lock()
 
-        # Adjust for ambient noise
-        print("Adjusting for ambient noise... Please wait.")
-        with self.microphone as source:
-            self.recognizer.adjust_for_ambient_noise(source, duration=1)
-        print("Ready to listen.")
+        # Pipeline bookkeeping (replaced on every start_listening run)
+        self._stats_lock = threading.Lock()
+        self._captured = StageQueue("capture")
+        self._results = StageQueue("execute")
+        self._recognizing = 0
+        self._reorder_depth = 0
+        self._running_job = None  # streaming mode: _StreamJob being executed
+        self._ring = None  # capture ring buffer of the current run (config.capture_ring_s)
+        self._ring_cuts = {}  # seq -> ring position its audio starts at, until a worker picks it up
+        self.latency = LatencyTracker(config.latency_history)  # spans per command, across runs
+        self._stream_stats = {"phrases": 0, "early_commits": 0, "confirmed": 0, "extended": 0, "cancelled": 0}
+        # N-best lists are rescored against the command vocabulary
+        self.rescorer = HypothesisRescorer(command_parser)
+        self._nbest_stats = {"phrases": 0, "reranked": 0}
+
+        # Ambient noise: sampled in the background, then tracked for the whole session
+        self.noise = NoiseFloorEstimator(config)
+        self._reported_threshold = None
+        self.calibrated = threading.Event()
+        threading.Thread(target=self._warm_up, daemon=True).start()
+
+    @deferred
+    def recognizer(self):
+        recognizer = sr.Recognizer()
+        recognizer.energy_threshold = self.noise.threshold  # config.energy_threshold until calibrated
+        return recognizer
+
+    @deferred
+    def microphone(self):
+        return sr.Microphone()  # starts PortAudio
+
+    @deferred
+    def backend(self):
+        # Engines are loaded once and stay warm for the whole session
+        backend = BackendChain.from_config(self.config, self.recognizer).load()
+        backend.set_grammar_provider(self.command_parser.grammar)
+        return backend
+
+    def _warm_up(self):
+        """Load the recognition engines and calibrate the mic in the background.
+
+        Anything that needs them first (start_listening) simply waits for the
+        deferred attribute, so an early "Start Listening" is still safe.
+        """
+        try:
+            self.backend
+        except Exception as e:
+            logger.error("Error loading speech recognition backends: %s", e)
+        if self.config.noise_calibration_s > 0:
+            self._calibrate()
+        else:
+            self.calibrated.set()
+        startup_timer.mark("audio_ready")
+        logger.info("Ready to listen.")
 
     def set_stop_callback(self, callback):
         """Set callback function for stop commands"""
         self.stop_callback = callback
 
+    def set_status_callback(self, callback):
+        """Set callback(listening: bool), called whenever listening starts or stops."""
+        self.status_callback = callback
+
+    def set_noise_callback(self, callback):
+        """Set callback(threshold, noise_floor), called when the energy threshold moves noticeably."""
+        self.noise_callback = callback
+
+    def _notify_status(self):
+        if self.status_callback:
+            self.status_callback(self.listening)
+
+    # --- Ambient noise ------------------------------------------------------
+
+    def _calibrate(self):
+        """Measure the room once without holding up startup (the mic lock defers listening)."""
+        try:
+            with self._active_lock, self.microphone as source:
+                chunks = max(1, int(self.config.noise_calibration_s * source.SAMPLE_RATE / source.CHUNK))
+                raw = b"".join(source.stream.read(source.CHUNK) for _ in range(chunks))
+            self.noise.observe(raw, source.SAMPLE_RATE)
+            self.noise.calibrated = True
+            self._apply_threshold()
+            logger.info("Ambient noise calibrated: energy threshold %.0f", self.recognizer.energy_threshold)
+        except Exception as e:
+            logger.warning(
+                "Ambient noise calibration failed: %s; energy threshold stays %s", e, self.recognizer.energy_threshold
+            )
+        finally:
+            self.calibrated.set()
+
+    def _track_noise(self, raw, sample_rate, quantile=1.0):
+        """Feed idle (or mostly idle) audio to the noise-floor estimate and re-derive the threshold."""
+        if not self.config.noise_tracking:
+            return
+        try:
+            self.noise.observe(raw, sample_rate, quantile)
+        except Exception as e:
+            logger.warning("Noise tracking failed: %s", e)
+            return
+        self._apply_threshold()
+
+    def _apply_threshold(self):
+        threshold = self.noise.threshold
+        self.recognizer.energy_threshold = threshold
+        reported = self._reported_threshold
+        if reported is None or abs(threshold - reported) >= 0.05 * reported:
+            self._reported_threshold = threshold
+            if self.noise_callback:
+                self.noise_callback(threshold, self.noise.floor)
+
+    @staticmethod
+    def _mark_first_listen():
+        if startup_timer.mark("first_listen"):
+            logger.info(startup_timer.summary())
+
+    def noise_status(self):
+        """Current energy threshold and noise-floor estimate, for the GUI."""
+        status = self.noise.stats()
+        status["threshold"] = self.recognizer.energy_threshold  # includes the recognizer's own idle drift
+        return status
+
     def start_listening(self):
         """
         Start continuous speech recognition.
 
+        The work is split into three stages so the mic never waits on the network:
+        - capture (this thread): keeps pulling phrases into a bounded queue
+        - recognize (worker pool): transcribes phrases concurrently
+        - execute (one thread): applies commands strictly in utterance order
+
         IMPORTANT:
         - If already listening, do nothing (prevents second thread from re-entering).
         - Only one thread can use the microphone at a time (guarded by _active_lock).
         """
-        if self.listening:  
-            print("Already listening; start request ignored.")  
-            return  
+        if self.listening:
+            logger.info("Already listening; start request ignored.")
+            return
 
         self.listening = True  # flip the flag here so GUI 'Start' can't spin up another thread immediately
-        print("Speech recognition started. Say commands...")
+        logger.info("Speech recognition started. Say commands...")
+        self._notify_status()
+
+        streaming = self.backend.streaming_backend() if self.config.streaming_enabled else None
+        if self.config.streaming_enabled and streaming is None:
+            logger.warning("Streaming needs a backend with partial results (vosk or replay); using phrase mode.")
 
         # One listen loop owns the mic at a time
         with self._active_lock:  # prevent overlapping mic contexts across threads
+            if streaming is not None:
+                try:
+                    self._run_streaming(streaming)
+                finally:
+                    self.listening = False
+                    self._notify_status()
+                return
+
+            results = StageQueue("execute")
+            captured = StageQueue(
+                "capture",
+                maxsize=self.config.capture_queue_size,
+                policy=self.config.capture_overflow_policy,
+                # a dropped phrase still owns a sequence number; tell the executor to skip it
+                on_drop=lambda item: results.put((item[0], None)),
+            )
+            self._captured, self._results = captured, results
+
+            workers = [
+                threading.Thread(target=self._recognize_worker, args=(captured, results), daemon=True)
+                for _ in range(max(1, self.config.recognizer_workers))
+            ]
+            executor = threading.Thread(target=self._execute_worker, args=(results,), daemon=True)
+            for worker in workers:
+                worker.start()
+            executor.start()
+
+            drain = False
             try:
-                # Open the mic ONCE for the whole run (prevents nested context manager errors)
-                with self.microphone as source: 
-                    while self.listening:
+                drain = self._capture_loop(captured)
+            finally:
+                # ensure we flip the flag off if we exit due to any reason
+                if not drain:
+                    self.listening = False  # make state consistent when loop exits
+                captured.close()
+                for worker in workers:
+                    worker.join()
+                results.close()
+                executor.join()
+                self.listening = False
+                if self.vad is not None:
+                    vad = self.vad.stats()
+                    logger.info(
+                        "VAD: dropped %d/%d phrases, trimmed %d, saved %.1f KB",
+                        vad["dropped"], vad["segments"], vad["trimmed"], vad["bytes_saved"] / 1024,
+                    )
+                self._notify_status()
+
+    def _capture_loop(self, captured):
+        """Stage 1: pull phrases off the mic and hand them to the recognizers.
+
+        Returns True if the source ran out (EndOfInput), so the phrases in
+        flight should be finished rather than dropped.
+        """
+        seq = 0
+        # Open the mic ONCE for the whole run (prevents nested context manager errors)
+        with self.microphone as source:
+            ring = self._ring = self._make_ring(source)
+            self._ring_cuts = {}
+            while self.listening:
+                try:
+                    self._mark_first_listen()
+                    logger.debug("Listening...")
+                    started = time.perf_counter()
+                    if ring is None:
+                        audio = self.recognizer.listen(
+                            source,
+                            timeout=self.config.listen_timeout,
+                            phrase_time_limit=self.config.phrase_time_limit,
+                        )
+                    else:
+                        cut = self._cut_phrase(source, ring)
+                        if cut is None:
+                            continue  # listening stopped before anyone spoke
+                        self._ring_cuts[seq], audio = cut
+                    self.latency.begin(seq).add("listen", time.perf_counter() - started)
+                except sr.WaitTimeoutError:
+                    # Timeout, continue listening
+                    continue
+                except EndOfInput:
+                    return True
+                except Exception as e:
+                    logger.error("Error capturing audio: %s", e)
+                    continue
+
+                # the pre-roll and trailing pause around a phrase are the idle gaps we get to see
+                # (the ring sees every idle chunk itself)
+                if self.config.noise_tracking and ring is None:
+                    try:
+                        self._track_noise(audio.get_raw_data(convert_width=2), audio.sample_rate, self.config.noise_quantile)
+                    except AttributeError:
+                        pass  # not raw audio (nothing to measure)
+
+                if self.vad is not None:
+                    with self.latency.span(seq, "vad"):
                         try:
-                            print("Listening...")
-                            audio = self.recognizer.listen(
-                                source,
-                                timeout=5,  # you already expose this in config.listen_timeout if you want to swap
-                                phrase_time_limit=5
-                            )
-
-                            # Recognize speech using Google Speech Recognition
-                            text = self.recognizer.recognize_google(audio).lower()
-                            print(f"Recognized: {text}")
-
-                            # Check for stop commands first
-                            if text in self.config.stop_commands:
-                                print("Stop command received. Shutting down...")
-                                if self.stop_callback:
-                                    self.stop_callback()
-                                break
-
-                            # Parse and execute command
-                            self.command_parser.parse_command(text)
-
-                        except sr.WaitTimeoutError:
-                            # Timeout, continue listening
-                            continue
-                        except sr.UnknownValueError:
-                            print("Could not understand audio")
-                            continue
-                        except sr.RequestError as e:
-                            print(f"Could not request results from Google Speech Recognition service; {e}")
-                            continue
+                            audio = self.vad.process(audio)
                         except Exception as e:
-                            print(f"Error in speech recognition: {e}")
-                            continue
+                            logger.warning("Voice activity detection failed: %s", e)  # let the recognizer decide
+                    if audio is None:
+                        logger.debug("Skipped non-speech audio")
+                        self.latency.discard(seq)
+                        continue
+
+                # "block" policy: wait for room, but keep honouring stop requests
+                while self.listening and not captured.put((seq, audio), timeout=0.1):
+                    pass
+                seq += 1
+        return False
+
+    def _make_ring(self, source):
+        """A capture ring buffer in the mic's format, or None to let Recognizer.listen() capture."""
+        if self.config.capture_ring_s <= 0:
+            return None
+        return AudioRingBuffer.for_audio(self.config.capture_ring_s, source.SAMPLE_RATE, source.SAMPLE_WIDTH)
+
+    def _cut_phrase(self, source, ring):
+        """Read the mic into the ring until a phrase has ended, then cut it out without copying.
+
+        Endpointing matches Recognizer.listen() (energy threshold, pause_threshold,
+        phrase_time_limit), but the mic is read all the time, so the cut starts
+        capture_preroll_s before the chunk that tripped the threshold and ends
+        capture_postroll_s after the last loud one. Returns (ring position,
+        AudioData over a memoryview of the ring), or None if listening stopped first.
+        """
+        cfg = self.config
+        rate = source.SAMPLE_RATE
+        waited = 0  # samples, so that whole-chunk timings add up exactly
+        while self.listening:
+            chunk = source.stream.read(source.CHUNK)
+            ring.write(chunk)
+            if self._chunk_rms(chunk) > self.recognizer.energy_threshold:
+                break
+            self._track_noise(chunk, rate)
+            waited += source.CHUNK
+            if cfg.listen_timeout and waited >= cfg.listen_timeout * rate:
+                raise sr.WaitTimeoutError("listening timed out while waiting for phrase to start")
+        else:
+            return None
+        preroll = int(cfg.capture_preroll_s * rate) * source.SAMPLE_WIDTH
+        start = ring.written - len(chunk) - preroll
+
+        threshold = self.recognizer.energy_threshold  # fixed for the rest of the phrase
+        last_loud = ring.written
+        silence = elapsed = 0
+        while self.listening:
+            chunk = source.stream.read(source.CHUNK)
+            ring.write(chunk)
+            elapsed += source.CHUNK
+            if self._chunk_rms(chunk) > threshold:
+                silence = 0
+                last_loud = ring.written
+            else:
+                silence += source.CHUNK
+            if silence >= cfg.pause_threshold * rate or elapsed >= cfg.phrase_time_limit * rate:
+                break
+        postroll = int(cfg.capture_postroll_s * rate) * source.SAMPLE_WIDTH
+        start = max(start, ring.oldest)  # a phrase longer than the ring loses its beginning
+        end = min(ring.written, last_loud + postroll)
+        return start, sr.AudioData(ring.segment(start, end), rate, source.SAMPLE_WIDTH)
+
+    def _recognize_worker(self, captured, results):
+        """Stage 2: transcribe captured phrases (several of these run in parallel)."""
+        while True:
+            try:
+                seq, audio = captured.get()
+            except StageClosed:
+                return
+
+            text = None
+            start = self._ring_cuts.pop(seq, None)
+            if start is not None and not self._ring.holds(start):
+                # waited in the queue longer than the ring is long (capture_ring_s)
+                logger.warning("Phrase audio was overwritten in the capture ring before recognition; skipped")
+            elif self.listening:  # phrases still queued after a stop are not worth a round-trip
+                with self._stats_lock:
+                    self._recognizing += 1
+                try:
+                    # Recognize speech with the configured backend (and its fallbacks)
+                    text = self._transcribe(seq, audio).lower()
+                    logger.info("Recognized: %s", text)
+                    # "stop" cancels a running command sequence right away instead of
+                    # queueing behind it; it is then consumed rather than executed
+                    if text in self.config.stop_commands and self.command_parser.cancel_plan():
+                        text = None
+                except sr.UnknownValueError:
+                    logger.info("Could not understand audio")
+                except sr.RequestError as e:
+                    logger.error("Could not request results from speech recognition service; %s", e)
+                except Exception as e:
+                    logger.error("Error in speech recognition: %s", e)
+                finally:
+                    with self._stats_lock:
+                        self._recognizing -= 1
+
+            # Always report back, even on failure, so the executor's ordering never stalls
+            results.put((seq, text))
+
+    def _transcribe(self, seq, audio):
+        """Top transcript, or with config.nbest_alternatives > 1 the alternative that best fits the grammar."""
+        limit = self.config.nbest_alternatives
+        if limit <= 1:
+            with self.latency.span(seq, "recognize"):
+                return self.backend.recognize(audio)
+        with self.latency.span(seq, "recognize"):
+            alternatives = self.backend.recognize_alternatives(audio, limit)
+        with self.latency.span(seq, "rescore"):
+            index, text = self.rescorer.best([alt.lower() for alt in alternatives])
+        with self._stats_lock:
+            self._nbest_stats["phrases"] += 1
+            self._nbest_stats["reranked"] += bool(index)
+        if index:
+            logger.info("Chose alternative %d '%s' over '%s'", index + 1, text, alternatives[0])
+        return text
+
+    def _execute_worker(self, results):
+        """Stage 3: apply recognized commands in the order they were spoken."""
+        pending = {}
+        next_seq = 0
+        while True:
+            try:
+                seq, text = results.get()
+            except StageClosed:
+                return
+
+            pending[seq] = text
+            while next_seq in pending:
+                seq, text = next_seq, pending.pop(next_seq)
+                next_seq += 1
+                if text is not None and self.listening:
+                    self._execute(text, self.latency.trace(seq))
+                    self.latency.finish(seq, text)
+                else:
+                    self.latency.discard(seq)
+            self._reorder_depth = len(pending)
+
+    def _execute(self, text, trace=None):
+        """Run a single recognized phrase, adding its parse and action spans to `trace`."""
+        # Check for stop commands first; mid-movement, "stop" halts the cursor instead of quitting
+        if text in self.config.stop_commands and self.mouse_controller.is_moving():
+            self.mouse_controller.stop_motion()
+            return
+        if text in self.config.stop_commands:
+            logger.info("Stop command received. Shutting down...")
+            self.listening = False
+            if self.stop_callback:
+                self.stop_callback()
+            return
+
+        # Parse and execute command
+        started = time.perf_counter()
+        try:
+            plan = self.command_parser.parse_command(text)
+        except Exception as e:
+            logger.error("Error executing command: %s", e)
+            plan = None
+        if trace is not None:
+            if isinstance(plan, ActionPlan):
+                trace.add_plan(plan)
+            else:
+                trace.add("parse", time.perf_counter() - started)  # nothing ran
+
+    # --- Streaming mode -------------------------------------------------
+
+    def _run_streaming(self, backend):
+        """Feed mic chunks to `backend` as they arrive and act on partial hypotheses.
+
+        A partial that already settles a command (CommandParser.early_command)
+        is executed straight away instead of waiting for the end-of-phrase
+        silence. When the final transcript arrives the guard checks it: equal
+        means confirmed, "<committed> then ..." runs only the rest, anything
+        else cancels the early action (if it is still queued or running) and
+        runs the final transcript instead.
+        """
+        jobs = StageQueue("execute")
+        self._results = jobs
+        executor = threading.Thread(target=self._stream_executor, args=(jobs,), daemon=True)
+        executor.start()
+        try:
+            with self.microphone as source:
+                self._mark_first_listen()
+                while self.listening:
+                    try:
+                        self._stream_phrase(source, backend, jobs)
+                    except Exception as e:
+                        logger.error("Error in streaming recognition: %s", e)
+        finally:
+            jobs.close()
+            executor.join()
+
+    def _stream_phrase(self, source, backend, jobs):
+        session = None
+        committed = None
+        for chunk in self._phrase_chunks(source):
+            if session is None:
+                session = backend.start_stream(source.SAMPLE_RATE, source.SAMPLE_WIDTH)
+            partial = session.feed(chunk).lower()
+            if committed is None and self.command_parser.early_command(partial):
+                committed = self._queue_job(jobs, partial)
+                self._stream_stats["early_commits"] += 1
+                logger.debug("Early commit: %s", partial)
+        if session is None:
+            return  # listening stopped before anyone spoke
+
+        self._stream_stats["phrases"] += 1
+        try:
+            final = session.finish().lower()
+            logger.info("Recognized: %s", final)
+        except sr.UnknownValueError:
+            final = ""
+        self._guard(jobs, committed, final)
+
+    def _guard(self, jobs, committed, final):
+        """Reconcile an early commit with the final transcript."""
+        if final in self.config.stop_commands and self.command_parser.cancel_plan():
+            return  # interrupted a running sequence; not a request to quit
+        if committed is None:
+            if final:
+                self._queue_job(jobs, final)
+            return
+        if final == committed.text:
+            self._stream_stats["confirmed"] += 1
+            return
+        rest = self.command_parser.continuation(committed.text, final)
+        if rest is not None:
+            self._stream_stats["extended"] += 1
+            self._queue_job(jobs, rest)
+            return
+
+        self._stream_stats["cancelled"] += 1
+        with self._stats_lock:
+            committed.revoked = True
+            running = self._running_job is committed
+        if running:
+            self.command_parser.cancel_plan()
+        logger.info("Final transcript '%s' disagrees with early commit '%s'; cancelled", final, committed.text)
+        if final:
+            self._queue_job(jobs, final)
+
+    def _queue_job(self, jobs, text):
+        job = _StreamJob(text)
+        self.latency.begin(job)  # response time counts from the moment the transcript is known
+        jobs.put(job)
+        return job
+
+    def _stream_executor(self, jobs):
+        """Runs streaming-mode transcripts one at a time, skipping revoked ones."""
+        while True:
+            try:
+                job = jobs.get()
+            except StageClosed:
+                return
+            with self._stats_lock:
+                if job.revoked:
+                    self.latency.discard(job)
+                    continue
+                self._running_job = job
+            try:
+                if self.listening:
+                    self._execute(job.text, self.latency.trace(job))
+                    self.latency.finish(job, job.text)
+                else:
+                    self.latency.discard(job)
             finally:
-                # ensure we flip the flag off if we exit due to any reason
-                self.listening = False  # make state consistent when loop exits
+                with self._stats_lock:
+                    self._running_job = None
+
+    def _phrase_chunks(self, source):
+        """Yield raw mic chunks of one phrase, energy-endpointed like Recognizer.listen()."""
+        chunk_s = source.CHUNK / source.SAMPLE_RATE
+        preroll = deque(maxlen=max(1, round(self.config.capture_preroll_s / chunk_s)))  # keep the start of the first word
+        while self.listening:
+            chunk = source.stream.read(source.CHUNK)
+            if self._chunk_rms(chunk) > self.recognizer.energy_threshold:
+                break
+            preroll.append(chunk)
+            self._track_noise(chunk, source.SAMPLE_RATE)
+        else:
+            return
+        yield from preroll
+        yield chunk
+
+        threshold = self.recognizer.energy_threshold  # fixed for the rest of the phrase
+        silence = elapsed = 0.0
+        while self.listening:
+            chunk = source.stream.read(source.CHUNK)
+            yield chunk
+            elapsed += chunk_s
+            silence = silence + chunk_s if self._chunk_rms(chunk) <= threshold else 0.0
+            if silence >= self.config.pause_threshold or elapsed >= self.config.phrase_time_limit:
+                return
+
+    @staticmethod
+    def _chunk_rms(chunk):
+        samples = np.frombuffer(chunk, dtype=np.int16).astype(np.float64)
+        return float(np.sqrt(np.mean(samples * samples))) if len(samples) else 0.0
+
+    def pipeline_stats(self):
+        """Per-stage queue depths and counters for the current (or last) run."""
+        with self._stats_lock:
+            recognizing = self._recognizing
+        return {
+            "capture": self._captured.stats(),
+            "recognizing": recognizing,
+            "execute": self._results.stats(),
+            "reorder": self._reorder_depth,
+            "vad": self.vad.stats() if self.vad is not None else None,
+            "streaming": dict(self._stream_stats),
+            "nbest": dict(self._nbest_stats),
+            # only once the engines are loaded; asking must not load them
+            "backends": vars(self)["backend"].stats() if "backend" in vars(self) else {},
+            "noise": self.noise_status(),
+            "latency": self.latency.summary(),
+            "parse_cache": self.command_parser.cache_stats(),
+        }
 
     def stop_listening(self):
         """Stop speech recognition"""
         # Just flip the flag; the loop will exit and close the mic context cleanly
         self.listening = False  # ensure the loop stops and releases mic
-        print("Speech recognition stopped.")
+        logger.info("Speech recognition stopped.")
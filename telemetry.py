@@ -0,0 +1,210 @@
+"""
+Telemetry Module
+Startup milestones and per-command latency spans
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class StartupTimer:
+    """Records the first time each startup milestone is reached.
+
+    Milestones used by the app: "imports" (modules loaded), "app_init"
+    (controllers built), "gui_ready" (panel drawn), "audio_ready" (recognizer
+    backends loaded and the mic calibrated) and "first_listen" (capturing).
+    """
+
+    def __init__(self, origin=None, clock=time.perf_counter):
+        self.clock = clock
+        self.origin = clock() if origin is None else origin
+        self.marks = {}  # milestone -> seconds since origin, in the order reached
+
+    def mark(self, name):
+        """Record `name` now. Returns True the first time, False if it was already reached."""
+        if name in self.marks:
+            return False
+        self.marks[name] = self.clock() - self.origin
+        return True
+
+    def elapsed_ms(self, name):
+        seconds = self.marks.get(name)
+        return None if seconds is None else seconds * 1000.0
+
+    def summary(self):
+        return "Startup: " + " | ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in self.marks.items())
+
+
+# Started when this module is first imported, which main.py does before anything heavy
+startup_timer = StartupTimer()
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile (q in 0-100) of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * q // 100))  # ceil without floats
+    return sorted_values[int(rank) - 1]
+
+
+class CommandTrace:
+    """Timing spans for one spoken command, in the order they happened.
+
+    Span names: "listen" (recognizer.listen, including the wait for speech to
+    start), "vad", "recognize", "parse" (compiling the utterance) and one per
+    controller action, named "<target>.<method>". `response_ms` runs from the
+    end of listen() to the last action finishing, so it includes queueing.
+    """
+
+    __slots__ = ("key", "text", "started_at", "spans", "_captured", "response_ms")
+
+    def __init__(self, key):
+        self.key = key
+        self.text = None
+        self.started_at = time.time()
+        self.spans = []  # [name, milliseconds]
+        self._captured = time.perf_counter()
+        self.response_ms = None
+
+    def add(self, name, seconds):
+        self.spans.append([name, round(seconds * 1000.0, 3)])
+        if name == "listen":
+            self._captured = time.perf_counter()
+
+    @contextmanager
+    def span(self, name):
+        started = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def add_plan(self, plan):
+        """Record an ActionPlan's compile time and each step it ran."""
+        self.add("parse", plan.compile_s)
+        for step, seconds in plan.timings:
+            self.add(f"{step.target}.{step.method}", seconds)
+
+    def close(self, text=None):
+        if text is not None:
+            self.text = text
+        self.response_ms = round((time.perf_counter() - self._captured) * 1000.0, 3)
+
+    def to_dict(self):
+        return {
+            "t": round(self.started_at, 3),
+            "text": self.text,
+            "spans": self.spans,
+            "response_ms": self.response_ms,
+        }
+
+
+class LatencyTracker:
+    """Ring buffer of the most recent CommandTraces with percentile summaries.
+
+    Traces are opened by key (the phrase's pipeline sequence number) so every
+    stage can add its span without the trace travelling through the queues.
+    All methods are thread-safe; trace(key) returns None for unknown keys so
+    callers never have to check whether tracking is on.
+    """
+
+    def __init__(self, capacity=200):
+        self._lock = threading.Lock()
+        self._open = {}
+        self._recent = deque(maxlen=capacity)
+        self.completed = 0
+        self.on_complete = None  # callback(trace), e.g. to refresh the panel
+        self._exported = {}  # path -> `completed` when last exported there
+
+    def begin(self, key):
+        trace = CommandTrace(key)
+        with self._lock:
+            self._open[key] = trace
+        return trace
+
+    def trace(self, key):
+        with self._lock:
+            return self._open.get(key)
+
+    @contextmanager
+    def span(self, key, name):
+        trace = self.trace(key)
+        if trace is None:
+            yield None
+            return
+        with trace.span(name):
+            yield trace
+
+    def discard(self, key):
+        with self._lock:
+            self._open.pop(key, None)
+
+    def finish(self, key, text=None):
+        """Close the trace for `key` and keep it in the ring buffer."""
+        with self._lock:
+            trace = self._open.pop(key, None)
+            if trace is None:
+                return None
+            trace.close(text)
+            self._recent.append(trace)
+            self.completed += 1
+        if self.on_complete:
+            self.on_complete(trace)
+        return trace
+
+    def recent(self):
+        with self._lock:
+            return [trace.to_dict() for trace in self._recent]
+
+    def summary(self):
+        """{span name: {"count", "p50", "p95", "p99"}} in ms, plus "response" for the whole command."""
+        values = {}
+        with self._lock:
+            for trace in self._recent:
+                for name, ms in trace.spans:
+                    values.setdefault(name, []).append(ms)
+                values.setdefault("response", []).append(trace.response_ms)
+        summary = {}
+        for name, samples in values.items():
+            samples.sort()
+            summary[name] = {
+                "count": len(samples),
+                "p50": percentile(samples, 50),
+                "p95": percentile(samples, 95),
+                "p99": percentile(samples, 99),
+            }
+        return summary
+
+    def format_summary(self, names=("response", "recognize", "parse")):
+        """Short multi-line text for the GUI panel."""
+        summary = self.summary()
+        lines = []
+        for name in names:
+            stats = summary.get(name)
+            if stats:
+                lines.append(
+                    f"{name}: p50 {stats['p50']:.0f} | p95 {stats['p95']:.0f} | p99 {stats['p99']:.0f} ms"
+                    f" (n={stats['count']})"
+                )
+        return "\n".join(lines) or "No commands timed yet"
+
+    def export_jsonl(self, path):
+        """Append the buffered traces not yet exported to `path`, one JSON object per line. Returns how many."""
+        key = os.path.abspath(path)
+        with self._lock:
+            completed = self.completed
+            new = min(completed - self._exported.get(key, 0), len(self._recent))
+            traces = [trace.to_dict() for trace in list(self._recent)[len(self._recent) - new:]]
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            for trace in traces:
+                f.write(json.dumps(trace, separators=(",", ":")) + "\n")
+        with self._lock:
+            self._exported[key] = completed
+        return len(traces)
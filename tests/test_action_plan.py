@@ -0,0 +1,96 @@
+"""
+Tests for action_plan.py
+"""
+
+import threading
+from concurrent.futures import Future
+from unittest.mock import MagicMock, patch
+import pyautogui
+from action_plan import Action, ActionPlan
+
+
+class TestAction:
+    def test_resolves_dotted_methods(self):
+        mouse = MagicMock()
+        Action("mouse", "grid.select", (5,)).run({"mouse": mouse})
+        mouse.grid.select.assert_called_once_with(5)
+
+    def test_missing_controller_is_skipped(self):
+        assert Action("keyboard", "type_text", ("hi",)).run({"keyboard": None}) is None
+
+    def test_repr_and_equality(self):
+        action = Action("mouse", "move_cursor", ("up", 200))
+        assert repr(action) == "mouse.move_cursor('up', 200)"
+        assert action == Action("mouse", "move_cursor", ["up", 200])
+        assert action != Action("mouse", "move_cursor", ("up", 200), wait=False)
+        assert action.error == "running mouse.move_cursor"
+
+
+class TestActionPlan:
+    def setup_method(self):
+        self.mouse = MagicMock()
+        self.targets = {"mouse": self.mouse}
+
+    def test_runs_steps_in_order_without_pyautogui_pause(self):
+        pyautogui.PAUSE = 0.1
+        seen = []
+        self.mouse.click.side_effect = lambda *a: seen.append(pyautogui.PAUSE)
+        plan = ActionPlan([Action("mouse", "click", ("left",)), Action("mouse", "scroll", ("down",))])
+        assert plan.state == ActionPlan.PENDING
+        plan.run(self.targets)
+        assert [c[0] for c in self.mouse.method_calls] == ["click", "scroll"]
+        assert seen == [0]  # suspended while the plan runs...
+        assert pyautogui.PAUSE == 0.1  # ...and restored afterwards
+        assert plan.state == ActionPlan.DONE
+        assert plan.index == len(plan) == 2
+        assert plan.describe() == ["mouse.click('left')", "mouse.scroll('down')"]
+
+    def test_single_pause_between_steps(self):
+        plan = ActionPlan([Action("mouse", "click"), Action("mouse", "click")], step_pause=0.25)
+        with patch.object(plan._cancel, "wait", return_value=False) as mock_wait:
+            plan.run(self.targets)
+        mock_wait.assert_called_once_with(0.25)  # between the steps, not after the last one
+
+    def test_waits_for_cursor_tween(self):
+        future = Future()
+        order = []
+        self.mouse.move_cursor.side_effect = lambda *a: future
+        self.mouse.click.side_effect = lambda *a: order.append(("click", future.done()))
+        threading.Timer(0.05, future.set_result, ((10, 10),)).start()
+        ActionPlan([Action("mouse", "move_cursor", ("up", 10)), Action("mouse", "click")]).run(self.targets)
+        assert order == [("click", True)]
+
+    def test_does_not_wait_for_glide(self):
+        self.mouse.glide.return_value = Future()  # never resolves
+        plan = ActionPlan([Action("mouse", "glide", ("right",), wait=False), Action("mouse", "click")])
+        plan.run(self.targets)
+        self.mouse.click.assert_called_once()
+
+    def test_cancel_from_another_thread(self):
+        future = Future()
+        self.mouse.move_cursor.return_value = future
+        plan = ActionPlan([Action("mouse", "move_cursor", ("up", 10)), Action("mouse", "click")])
+        threading.Timer(0.05, plan.cancel).start()
+        plan.run(self.targets)
+        self.mouse.click.assert_not_called()
+        assert plan.state == ActionPlan.CANCELLED
+        assert plan.index == 1  # the move was interrupted, the click never started
+        assert not plan.cancel()  # already finished
+
+    def test_errors_reported_and_plan_continues(self, caplog):
+        self.mouse.click.side_effect = Exception("boom")
+        plan = ActionPlan([Action("mouse", "click", error="performing click"), Action("mouse", "scroll")])
+        plan.run(self.targets)
+        assert "Error performing click: boom" in caplog.text
+        self.mouse.scroll.assert_called_once()
+        assert len(plan.errors) == 1
+
+    def test_records_step_timings(self):
+        future = Future()
+        threading.Timer(0.05, future.set_result, args=((0, 0),)).start()
+        self.mouse.move_cursor.return_value = future
+        steps = [Action("mouse", "move_cursor", ("up",)), Action("mouse", "click")]
+        plan = ActionPlan(steps, step_pause=0.05).run(self.targets)
+        assert [step for step, _ in plan.timings] == steps
+        assert plan.timings[0][1] >= 0.04  # waited for the tween
+        assert plan.timings[1][1] < 0.04  # the pause before a step is not part of it
@@ -0,0 +1,85 @@
+"""
+Tests for app_logging.py
+"""
+
+import json
+import logging
+import sys
+import threading
+from app_logging import APP_LOGGER, JsonLinesFormatter, get_logger, setup_logging, shutdown_logging
+from config import Config
+
+
+class TestAppLogging:
+    def setup_method(self):
+        self.config = Config()
+        self.config.log_console = False
+
+    def teardown_method(self):
+        shutdown_logging()
+        logging.getLogger(APP_LOGGER).setLevel(logging.INFO)
+        get_logger("noisy").setLevel(logging.NOTSET)
+
+    def read(self, path):
+        return [json.loads(line) for line in path.read_text().splitlines()]
+
+    def test_records_written_as_json_lines_by_listener_thread(self, tmp_path):
+        self.config.log_path = str(tmp_path / "logs" / "app.jsonl")
+        listener = setup_logging(self.config)
+        caller = threading.current_thread().name
+
+        get_logger("speech_handler").info("Recognized: %s", "click")
+        get_logger("speech_handler").debug("Listening...")  # below the INFO default
+        shutdown_logging()
+
+        assert listener._thread is None  # stopped and drained
+        entries = self.read(tmp_path / "logs" / "app.jsonl")
+        assert len(entries) == 1
+        assert entries[0]["msg"] == "Recognized: click"
+        assert entries[0]["logger"] == "speech_handler"
+        assert entries[0]["level"] == "INFO"
+        assert entries[0]["thread"] == caller
+
+    def test_per_module_levels(self, tmp_path):
+        self.config.log_path = str(tmp_path / "app.jsonl")
+        self.config.log_level = "WARNING"
+        self.config.log_levels = {"noisy": "DEBUG"}
+        setup_logging(self.config)
+        get_logger("noisy").debug("every keypress")
+        get_logger("quiet").info("dropped")
+        get_logger("quiet").error("kept")
+        shutdown_logging()
+        assert [e["msg"] for e in self.read(tmp_path / "app.jsonl")] == ["every keypress", "kept"]
+
+    def test_file_rotates(self, tmp_path):
+        self.config.log_path = str(tmp_path / "app.jsonl")
+        self.config.log_max_bytes = 500
+        self.config.log_backups = 2
+        setup_logging(self.config)
+        for i in range(50):
+            get_logger("mouse_controller").info("Moved up by %d pixels", i)
+        shutdown_logging()
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["app.jsonl", "app.jsonl.1", "app.jsonl.2"]
+        assert all(p.stat().st_size <= 500 for p in tmp_path.iterdir())
+
+    def test_console_sink_and_restore(self, tmp_path, capsys):
+        self.config.log_console = True
+        self.config.log_path = None
+        setup_logging(self.config)
+        assert not logging.getLogger(APP_LOGGER).propagate
+        get_logger("command_parser").info("Unrecognized command: %s", "blah")
+        get_logger("command_parser").warning("Minimize panel requested")
+        shutdown_logging()
+        err = capsys.readouterr().err
+        assert "Unrecognized command: blah\n" in err
+        assert "WARNING: Minimize panel requested" in err
+        assert logging.getLogger(APP_LOGGER).propagate
+        assert logging.getLogger(APP_LOGGER).handlers == []
+
+    def test_formatter_includes_exception(self):
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            record = logging.LogRecord("click_to_talk.x", logging.ERROR, __file__, 1, "failed", (), sys.exc_info())
+        entry = json.loads(JsonLinesFormatter().format(record))
+        assert entry["logger"] == "x" and "ValueError: boom" in entry["exc"]
@@ -0,0 +1,154 @@
+"""
+Tests for audio_processing.py
+"""
+
+import numpy as np
+import speech_recognition as sr
+import pytest
+from audio_processing import (
+    AudioRingBuffer,
+    NoiseFloorEstimator,
+    VoiceActivityDetector,
+    frame_features,
+    longest_run,
+)
+from config import Config
+
+RATE = 16000
+rng = np.random.default_rng(0)
+
+
+def voiced(seconds, f0=140):
+    """Harmonic tone with a syllable-like envelope: a crude stand-in for speech."""
+    t = np.arange(int(RATE * seconds)) / RATE
+    tone = sum(np.sin(2 * np.pi * f0 * k * t) / k for k in range(1, 12))
+    return tone * 0.5 * (1 - np.cos(2 * np.pi * 3 * t)) * 3000
+
+
+def noise(seconds, level):
+    return rng.normal(0, level, int(RATE * seconds))
+
+
+def to_audio(samples):
+    return sr.AudioData(np.clip(samples, -32768, 32767).astype(np.int16).tobytes(), RATE, 2)
+
+
+class TestFeatures:
+    def test_speech_vs_noise_features(self):
+        _, zcr_v, flat_v = frame_features(voiced(0.5), 480, RATE)
+        _, zcr_n, flat_n = frame_features(noise(0.5, 800), 480, RATE)
+        assert np.median(flat_v) < 0.05 < 0.3 < np.median(flat_n)
+        assert np.median(zcr_v) < 0.1 < 0.4 < np.median(zcr_n)
+
+    def test_short_input(self):
+        rms, zcr, flat = frame_features(np.zeros(100), 480)
+        assert len(rms) == len(zcr) == len(flat) == 0
+
+    def test_longest_run(self):
+        assert longest_run(np.array([0, 1, 1, 0, 1, 1, 1, 0], dtype=bool)) == 3
+        assert longest_run(np.zeros(4, dtype=bool)) == 0
+
+
+class TestVoiceActivityDetector:
+    def setup_method(self):
+        self.vad = VoiceActivityDetector(Config())
+
+    def test_trims_silence_around_speech(self):
+        audio = to_audio(np.concatenate([noise(0.5, 30), voiced(1.0), noise(0.8, 30)]))
+        out = self.vad.process(audio)
+        assert out is not None
+        assert 0.4 < len(out.frame_data) / len(audio.frame_data) < 0.75
+        assert out.sample_rate == RATE and out.sample_width == 2
+        stats = self.vad.stats()
+        assert stats["trimmed"] == 1 and stats["dropped"] == 0
+        assert stats["bytes_saved"] == len(audio.frame_data) - len(out.frame_data)
+
+    def test_keeps_speech_in_noise_and_untrimmed_phrases(self):
+        noisy = np.concatenate([noise(0.5, 400), voiced(1.0) + noise(1.0, 400), noise(0.75, 400)])
+        assert self.vad.process(to_audio(noisy)) is not None
+        wall_to_wall = to_audio(voiced(2.0))
+        assert self.vad.process(wall_to_wall) is wall_to_wall
+
+    def test_drops_fan_noise_hum_and_clicks(self):
+        hum = np.convolve(noise(2.0, 800), np.ones(16) / 4, "same")  # steady low-frequency fan
+        clicks = np.concatenate([np.concatenate([noise(0.2, 30), noise(0.005, 8000)]) for _ in range(8)])
+        for samples in (noise(2.0, 800), hum, clicks, np.zeros(RATE)):
+            assert self.vad.process(to_audio(samples)) is None
+        stats = self.vad.stats()
+        assert stats["dropped"] == stats["segments"] == 4
+        assert stats["bytes_saved"] == stats["bytes_in"]
+
+
+class TestNoiseFloorEstimator:
+    def setup_method(self):
+        self.config = Config()
+        self.noise = NoiseFloorEstimator(self.config)
+
+    def raw(self, samples):
+        return to_audio(samples).frame_data
+
+    def test_starts_from_configured_threshold(self):
+        assert self.noise.threshold == self.config.energy_threshold
+        assert self.noise.floor is None
+
+    def test_threshold_follows_room_up_and_down(self):
+        quiet = self.noise.observe(self.raw(noise(1.0, 100)), RATE)
+        assert abs(self.noise.floor - 100) < 10
+        assert quiet == self.noise.threshold == self.noise.floor * self.config.noise_threshold_ratio
+
+        for _ in range(10):  # fan switched on: the rolling window forgets the quiet room
+            loud = self.noise.observe(self.raw(noise(1.0, 800)), RATE)
+        assert loud > 5 * quiet
+        for _ in range(10):
+            self.noise.observe(self.raw(noise(1.0, 100)), RATE)
+        assert abs(self.noise.threshold - quiet) < 0.1 * quiet
+
+    def test_phrase_counts_only_its_quietest_frames(self):
+        phrase = np.concatenate([noise(0.5, 100), voiced(1.5)])
+        threshold = self.noise.observe(self.raw(phrase), RATE, quantile=self.config.noise_quantile)
+        assert threshold < 2 * 100 * self.config.noise_threshold_ratio
+
+    def test_threshold_clamped(self):
+        assert self.noise.observe(self.raw(np.zeros(RATE)), RATE) == self.config.noise_min_threshold
+        assert self.noise.observe_levels([30000] * 500) == self.config.noise_max_threshold
+
+
+class TestAudioRingBuffer:
+    def test_segment_spans_the_wrap_without_copying(self):
+        ring = AudioRingBuffer(10)
+        ring.write(b"abcdefgh")
+        ring.write(b"ijkl")  # wraps: "kl" lands at the front
+        assert ring.written == 12 and ring.oldest == 2
+        view = ring.segment(4, 12)
+        assert isinstance(view, memoryview)
+        assert bytes(view) == b"efghijkl"
+        assert bytes(ring.segment(2, 12)) == b"cdefghijkl"
+        ring.write(b"mn")
+        assert bytes(view) == b"efghijkl"  # data a live view points at is not moved
+
+    def test_overwritten_spans_rejected(self):
+        ring = AudioRingBuffer(10)
+        ring.write(bytes(range(25)))  # longer than the ring: only the newest 10 bytes kept
+        assert ring.written == 25 and not ring.holds(14) and ring.holds(15)
+        assert bytes(ring.segment(15, 25)) == bytes(range(15, 25))
+        with pytest.raises(ValueError):
+            ring.segment(14, 20)
+        with pytest.raises(ValueError):
+            ring.segment(20, 26)
+
+    def test_sized_in_whole_samples(self):
+        ring = AudioRingBuffer.for_audio(0.5, RATE, 2)
+        assert ring.capacity == RATE  # 0.5 s of 16-bit samples
+        assert AudioRingBuffer(11, sample_width=2).capacity == 10
+        with pytest.raises(ValueError):
+            AudioRingBuffer(1, sample_width=2)
+
+    def test_segment_is_valid_audio(self):
+        samples = np.clip(voiced(0.3), -32768, 32767).astype(np.int16)
+        ring = AudioRingBuffer.for_audio(0.2, RATE, 2)
+        for chunk in np.array_split(samples, 7):
+            ring.write(chunk.tobytes())
+        audio = sr.AudioData(ring.segment(ring.oldest, ring.written), RATE, 2)
+        tail = samples[-ring.capacity // 2:]
+        assert np.array_equal(np.frombuffer(audio.get_raw_data(), dtype=np.int16), tail)
+        assert audio.get_wav_data()[:4] == b"RIFF"
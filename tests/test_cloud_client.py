@@ -0,0 +1,279 @@
+"""
+Tests for cloud_client.py
+"""
+
+import logging
+import socket
+import time
+import numpy as np
+import pytest
+import speech_recognition as sr
+from unittest.mock import patch
+from cloud_client import CloudRecognizer, UploadPreprocessor, estimate_flac_bytes
+from config import Config
+from recognizer_backends import GoogleBackend
+from replay_harness import LocalRecognitionServer
+
+RATE = 48000
+
+
+def phrase(rate=RATE, lead=0.5, speech=0.6, tail=2.0):
+    """Quiet room, a burst of harmonic "speech", then a long pause, as 16-bit AudioData."""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(rate * speech)) / rate
+    tone = sum(np.sin(2 * np.pi * 140 * k * t) / k for k in range(1, 12)) * 0.5 * (1 - np.cos(2 * np.pi * 3 * t)) * 3000
+    samples = np.concatenate([rng.normal(0, 30, int(rate * lead)), tone, rng.normal(0, 30, int(rate * tail))])
+    return sr.AudioData(np.clip(samples, -32768, 32767).astype(np.int16).tobytes(), rate, 2)
+
+
+class TestUploadPreprocessor:
+    def setup_method(self):
+        self.config = Config()
+        self.config.vad_enabled = False  # so the upload is trimmed here
+
+    def test_trims_and_downsamples_to_flac(self):
+        audio = phrase()
+        upload = UploadPreprocessor(self.config).prepare(audio)
+        assert upload.body[:4] == b"fLaC"
+        assert upload.content_type == "audio/x-flac; rate=16000"
+        assert upload.sample_rate == 16000
+        assert len(upload.body) < len(audio.get_flac_data()) / 4
+
+    def test_unprepared_size_estimate(self):
+        preprocessor = UploadPreprocessor(self.config)
+        for rate in (48000, 16000):
+            audio = phrase(rate)
+            actual = len(audio.get_flac_data())
+            assert abs(preprocessor.unprepared_bytes(audio) - actual) < 0.15 * actual
+        preprocessor.encoding = "l16"
+        assert preprocessor.unprepared_bytes(phrase()) == 2 * int(RATE * 3.1)
+
+    def test_raw_pcm_encoding(self):
+        self.config.cloud_encoding = "l16"
+        self.config.cloud_trim_silence = False
+        upload = UploadPreprocessor(self.config).prepare(phrase())
+        assert upload.content_type == "audio/l16; rate=16000"
+        assert len(upload.body) == 2 * int(16000 * 3.1)  # 3.1 s resampled, nothing trimmed
+
+    def test_trimming_left_to_the_vad_stage(self):
+        self.config.vad_enabled = True
+        self.config.cloud_encoding = "l16"
+        upload = UploadPreprocessor(self.config).prepare(phrase(rate=16000))
+        assert len(upload.body) == 2 * int(16000 * 3.1)
+
+    def test_keeps_low_rates_and_unspoken_audio(self):
+        self.config.cloud_encoding = "l16"
+        silence = sr.AudioData(bytes(16000), 8000, 2)
+        upload = UploadPreprocessor(self.config).prepare(silence)
+        assert upload.sample_rate == 8000
+        assert len(upload.body) == 16000  # no speech found: sent whole rather than guessed at
+
+    def test_flac_estimate_short_input(self):
+        assert estimate_flac_bytes(np.zeros(100, np.int16), 16000) == 200
+
+    def test_falls_back_to_pcm_without_flac_encoder(self, caplog):
+        preprocessor = UploadPreprocessor(self.config)
+        with patch.object(sr.AudioData, "get_flac_data", side_effect=OSError("FLAC conversion utility not available")):
+            upload = preprocessor.prepare(phrase())
+        assert upload.content_type.startswith("audio/l16")
+        assert preprocessor.encoding == "l16"
+        assert "No FLAC encoder" in caplog.text
+
+
+class TestCloudRecognizer:
+    def setup_method(self):
+        self.config = Config()
+        self.config.vad_enabled = False
+        self.config.cloud_timeout = 5
+
+    def test_recognizes_against_local_server(self):
+        with LocalRecognitionServer([["scroll dawn", "scroll down"]]) as server:
+            self.config.cloud_url = server.url
+            result = CloudRecognizer(self.config).recognize(phrase())
+        assert [alt["transcript"] for alt in result["alternative"]] == ["scroll dawn", "scroll down"]
+        request = server.requests[0]
+        assert request["content_type"] == "audio/x-flac; rate=16000"
+        assert "lang=en-US" in request["path"] and "client=chromium" in request["path"]
+
+    def test_reports_bytes_and_transfer_time(self):
+        with LocalRecognitionServer(["click"], upload_bytes_per_s=200_000, delay_s=0.05) as server:
+            self.config.cloud_url = server.url
+            client = CloudRecognizer(self.config)
+            client.recognize(phrase())
+            client.recognize(phrase())
+        last = client.last
+        assert last["bytes_sent"] == server.requests[1]["bytes"]
+        assert last["bytes_saved"] > last["bytes_sent"]
+        # the stand-in's 50 ms of "recognition" is reported in Server-Timing and not counted as transfer
+        transfer_ms = last["bytes_sent"] / 200_000 * 1000
+        assert 0.8 * transfer_ms < last["transfer_ms"] < transfer_ms + 40
+        assert 45 < last["server_ms"] < 100
+        assert last["saved_ms"] > last["transfer_ms"]
+        stats = client.stats()
+        assert stats["requests"] == 2
+        assert stats["bytes_sent"] == 2 * last["bytes_sent"]
+        assert stats["encoding"] == "flac"
+
+    def test_unintelligible_audio(self):
+        with LocalRecognitionServer([""]) as server:
+            self.config.cloud_url = server.url
+            with pytest.raises(sr.UnknownValueError):
+                CloudRecognizer(self.config).recognize(phrase())
+
+    def test_connection_failure_is_request_error(self):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]  # nothing listens here once closed
+        self.config.cloud_url = f"http://127.0.0.1:{port}/speech-api/v2/recognize"
+        with pytest.raises(sr.RequestError):
+            CloudRecognizer(self.config).recognize(phrase())
+
+    def test_server_time_header(self):
+        assert CloudRecognizer.server_time("recognize;dur=212.5, db;dur=3;desc=\"cache\"") == 215.5
+        assert CloudRecognizer.server_time("cache;desc=hit") == 0.0
+        assert CloudRecognizer.server_time(None) == 0.0
+
+    def test_google_backend_uses_client(self, caplog):
+        with LocalRecognitionServer([["clique", "click"]]) as server:
+            self.config.cloud_url = server.url
+            backend = GoogleBackend(self.config)
+            with caplog.at_level(logging.DEBUG, logger="click_to_talk.cloud_client"):
+                assert backend.recognize_alternatives(phrase(), 5) == ["clique", "click"]
+        assert backend.stats()["requests"] == 1
+        assert "Cloud request" in caplog.text
+
+    def test_keeps_connection_alive(self):
+        with LocalRecognitionServer(["click"]) as server:
+            self.config.cloud_url = server.url
+            client = CloudRecognizer(self.config)
+            client.recognize(phrase())
+            first = client.last
+            client.recognize(phrase())
+        assert server.requests[0]["port"] == server.requests[1]["port"]
+        assert not first["reused_connection"] and client.last["reused_connection"]
+        assert client.last["connect_ms"] == 0
+        assert client.stats()["connections"] == {"opened": 1, "reused": 1, "idle": 1}
+
+    def test_idle_connection_not_reused(self):
+        self.config.cloud_idle_s = 0
+        with LocalRecognitionServer(["click"]) as server:
+            self.config.cloud_url = server.url
+            client = CloudRecognizer(self.config)
+            client.recognize(phrase())
+            client.recognize(phrase())
+        assert server.requests[0]["port"] != server.requests[1]["port"]
+        assert client.stats()["connections"]["opened"] == 2
+
+    def test_reconnects_when_server_dropped_connection(self):
+        with LocalRecognitionServer(["click"]) as server:
+            self.config.cloud_url = server.url
+            client = CloudRecognizer(self.config)
+            client.recognize(phrase())
+            connection, _ = client.pool._idle[0]
+            connection.sock.shutdown(socket.SHUT_RDWR)  # as if the server had timed it out
+            assert client.recognize(phrase())["alternative"][0]["transcript"] == "click"
+        stats = client.stats()
+        assert stats["connections"]["opened"] == 2
+        assert stats["attempts"] == 2 and stats["retried"] == 0  # replaced inside the one attempt
+
+    def test_warm_up_opens_connections(self):
+        self.config.cloud_warm_connections = 2
+        with LocalRecognitionServer(["click"]) as server:
+            self.config.cloud_url = server.url
+            client = CloudRecognizer(self.config)
+            client.warm_up()
+            assert len({request["port"] for request in server.requests}) == 2
+            client.recognize(phrase())
+        assert client.last["reused_connection"]
+        assert client.stats()["connections"]["opened"] == 2
+        assert client.stats()["requests"] == 1  # warm-up requests are not counted as phrases
+
+    def test_warm_up_failure_is_logged(self, caplog):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        self.config.cloud_url = f"http://127.0.0.1:{port}/speech-api/v2/recognize"
+        CloudRecognizer(self.config).warm_up()
+        assert "warm-up failed" in caplog.text
+
+    def test_hedged_request_wins(self):
+        self.config.cloud_hedge_after_s = 0.2
+        with LocalRecognitionServer([["slow"], ["fast"]], delay_s=[1.5, 0.0]) as server:
+            self.config.cloud_url = server.url
+            client = CloudRecognizer(self.config)
+            started = time.perf_counter()
+            result = client.recognize(phrase())
+            elapsed = time.perf_counter() - started
+        assert result["alternative"][0]["transcript"] == "fast"
+        assert elapsed < 1.0
+        assert server.requests[0]["port"] != server.requests[1]["port"]
+        stats = client.stats()
+        assert (stats["attempts"], stats["hedged"], stats["rescued"]) == (2, 1, 1)
+
+    def test_hedges_stay_within_attempts(self):
+        self.config.cloud_attempts = 2
+        self.config.cloud_hedge_after_s = 0.1
+        with LocalRecognitionServer(["click"], delay_s=0.6) as server:
+            self.config.cloud_url = server.url
+            client = CloudRecognizer(self.config)
+            client.recognize(phrase())
+        assert len(server.requests) == 2
+        stats = client.stats()
+        assert (stats["attempts"], stats["hedged"]) == (2, 1)
+
+    def test_no_hedge_when_answered_in_time(self):
+        self.config.cloud_hedge_after_s = 0.5
+        with LocalRecognitionServer(["click"], delay_s=0.05) as server:
+            self.config.cloud_url = server.url
+            client = CloudRecognizer(self.config)
+            client.recognize(phrase())
+        assert len(server.requests) == 1
+        assert client.stats()["hedged"] == 0
+
+    def test_failed_request_retried(self):
+        with LocalRecognitionServer(["click"], fail_first=1) as server:
+            self.config.cloud_url = server.url
+            client = CloudRecognizer(self.config)
+            assert client.recognize(phrase())["alternative"][0]["transcript"] == "click"
+        stats = client.stats()
+        assert (stats["attempts"], stats["retried"], stats["rescued"]) == (2, 1, 1)
+
+    def test_gives_up_after_attempts(self):
+        self.config.cloud_attempts = 1
+        with LocalRecognitionServer(["click"], fail_first=1) as server:
+            self.config.cloud_url = server.url
+            client = CloudRecognizer(self.config)
+            with pytest.raises(sr.RequestError, match="503"):
+                client.recognize(phrase())
+        assert client.stats()["failed"] == 1
+
+    def test_overall_timeout(self):
+        self.config.cloud_timeout = 0.3
+        self.config.cloud_hedge_after_s = 0
+        with LocalRecognitionServer(["click"], delay_s=1.0) as server:
+            self.config.cloud_url = server.url
+            started = time.perf_counter()
+            with pytest.raises(sr.RequestError):
+                CloudRecognizer(self.config).recognize(phrase())
+        assert time.perf_counter() - started < 1.0
+
+    def test_google_backend_warms_up_on_load(self):
+        self.config.cloud_warm_connections = 1
+        with LocalRecognitionServer(["click"]) as server:
+            self.config.cloud_url = server.url
+            backend = GoogleBackend(self.config)
+            backend.load()
+            backend.warm_up_thread.join(5)
+            assert len(server.requests) == 1
+            backend.close()
+        assert backend.client.stats()["connections"]["idle"] == 0
+
+    def test_google_backend_load_does_not_wait_for_warm_up(self):
+        self.config.cloud_warm_connections = 1
+        with LocalRecognitionServer(["click"], delay_s=2.0) as server:
+            self.config.cloud_url = server.url
+            backend = GoogleBackend(self.config)
+            started = time.perf_counter()
+            backend.load()
+            assert time.perf_counter() - started < 0.5
+            assert backend.loaded and backend.warm_up_thread.is_alive()
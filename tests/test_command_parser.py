@@ -4,7 +4,8 @@ Tests for command_parser.py
 
 import pytest
 from unittest.mock import MagicMock, patch
-from command_parser import CommandParser
+from action_plan import Action
+from command_parser import CommandParser, CommandGrammar, LRUCache, words_to_digits
 from config import Config
 
 
@@ -160,26 +161,17 @@ class TestCommandParser:
         self.parser.parse_command("maximize panel")
         mock_maximize.assert_called_once()
 
-    def test_command_recognition_helpers(self):
-        assert self.parser._is_movement_command("move up") == True
-        assert self.parser._is_movement_command("click") == False
-        
-        assert self.parser._is_click_command("click") == True
-        assert self.parser._is_click_command("tap") == True
-        assert self.parser._is_click_command("move") == False
-        
-        assert self.parser._is_scroll_command("scroll") == True
-        assert self.parser._is_scroll_command("wheel") == True
-        assert self.parser._is_scroll_command("click") == False
-        
-        assert self.parser._is_find_command("find cursor") == True
-        assert self.parser._is_find_command("find my mouse") == True
-        
-        assert self.parser._is_minimize_command("minimize panel") == True
-        assert self.parser._is_minimize_command("hide controls") == True
-        
-        assert self.parser._is_maximize_command("maximize panel") == True
-        assert self.parser._is_maximize_command("show controls") == True
+    def test_command_recognition_keywords(self):
+        expectations = {
+            "move up": "move", "move": "move", "down": "move", "wheel down": "move",
+            "click": "click", "tap": "click",
+            "scroll": "scroll", "wheel": "scroll", "scroll left": "scroll",
+            "find cursor": "find", "find my mouse": "find",
+            "minimize panel": "minimize", "hide controls": "minimize",
+            "maximize panel": "maximize", "show controls": "maximize",
+        }
+        for text, name in expectations.items():
+            assert self.parser.match_command(text).name == name, text
 
     @patch('sys.platform', 'darwin')
     def test_primary_mod_macos(self):
@@ -212,10 +204,9 @@ class TestCommandParser:
         self.mock_mouse.highlight_cursor.side_effect = Exception("Test error")
         self.parser.parse_command("find cursor")
 
-    def test_unrecognized_command(self, capsys):
+    def test_unrecognized_command(self, caplog):
         self.parser.parse_command("invalid command")
-        captured = capsys.readouterr()
-        assert "Unrecognized command: invalid command" in captured.out
+        assert "Unrecognized command: invalid command" in caplog.text
 
     def test_controller_setters(self):
         mock_kb = MagicMock()
@@ -233,14 +224,378 @@ class TestCommandParser:
         parser.parse_command("type hello")
         parser.parse_command("open gmail")
 
-    def test_panel_commands_without_callbacks(self, capsys):
+    def test_panel_commands_without_callbacks(self, caplog):
         parser = CommandParser(self.config)
         parser.set_mouse_controller(self.mock_mouse)
         
         parser.parse_command("minimize panel")
-        captured = capsys.readouterr()
-        assert "Minimize panel requested" in captured.out
+        assert "Minimize panel requested" in caplog.text
         
         parser.parse_command("maximize panel")
-        captured = capsys.readouterr()
-        assert "Maximize panel requested" in captured.out
+        assert "Maximize panel requested" in caplog.text
+
+    def test_grammar_covers_command_vocabulary(self):
+        grammar = self.parser.grammar()
+        for phrase in ("find my cursor", "hide panel", "open gmail", "press enter",
+                       "new tab", "right click", "scroll down", "move north", "stop"):
+            assert phrase in grammar.phrases
+        assert "hundred" in grammar.words
+        assert "[unk]" in grammar.to_vosk()
+        assert grammar.to_jsgf().startswith("#JSGF V1.0;")
+
+    def test_grammar_rebuilt_when_aliases_or_keywords_change(self):
+        first = self.parser.grammar()
+        assert self.parser.grammar() is first
+
+        self.config.site_aliases["github"] = "https://github.com"
+        second = self.parser.grammar()
+        assert second is not first
+        assert "open github" in second.phrases
+
+        self.config.movement_commands["up"].append("upward")
+        assert "move upward" in self.parser.grammar().phrases
+
+    def test_grammar_open_vocabulary_only_for_payloads(self):
+        grammar = self.parser.grammar()
+        assert grammar.needs_open_vocabulary("type [unk]")
+        assert grammar.needs_open_vocabulary("dictate hello")
+        assert grammar.needs_open_vocabulary("open [unk]")
+        assert not grammar.needs_open_vocabulary("scroll down")
+        assert not grammar.needs_open_vocabulary("")
+
+    def test_grammar_words_are_sanitized(self):
+        grammar = CommandGrammar(["open my.site", "click"])
+        assert grammar.words == ("click", "open")
+
+    def test_spoken_numbers(self):
+        assert words_to_digits("move up one hundred fifty") == "move up 150"
+        assert words_to_digits("move left two thousand") == "move left 2000"
+        assert words_to_digits("scroll down") == "scroll down"
+        self.parser.parse_command("move down seventy five")
+        self.mock_mouse.move_cursor.assert_called_with("down", 75)
+
+    def test_digit_by_digit_numbers_stay_apart(self):
+        assert words_to_digits("one two") == "1 2"
+        assert words_to_digits("grid one two") == "grid 1 2"
+        assert words_to_digits("twenty five") == "25"
+        assert words_to_digits("one hundred one") == "101"
+        self.parser.parse_command("grid one two")
+        self.mock_mouse.grid.select.assert_not_called()  # not read as cell 3
+
+    def test_dispatch_precedence(self):
+        expectations = {
+            "find my cursor": "find",
+            "where is my cursor, find cursor": "find",
+            "hide panel": "minimize",
+            "show controls": "maximize",
+            "open gmail": "navigate",
+            "type click here": "type",
+            "press enter": "press",
+            "new tab": "shortcut",
+            "right click": "click",
+            "move up": "move",
+            "google": "move",
+            "scroll up": "scroll",
+            "show position": "position",
+            "glide right": "glide",
+            "keep moving up": "glide",
+            "slow down": "glide_speed",
+            "faster": "glide_speed",
+            "mouse grid": "grid",
+            "five": "grid_cell",
+            "grid 7": "grid_cell",
+            "hide grid": "grid_close",
+            "back": "grid_back",
+            "go back": "move",
+            "new tab please": None,
+            "blah": None,
+        }
+        for text, name in expectations.items():
+            spec = self.parser.match_command(text)
+            assert (spec.name if spec else None) == name, text
+
+    def test_grid_words_need_an_open_grid(self):
+        grid = self.mock_mouse.grid
+        grid.active = False
+        assert self.parser.match_command("five") is None
+        assert self.parser.match_command("back") is None
+        assert self.parser.early_command("five") is None
+        assert self.parser.compile_plan("five") is None
+        grid.select.assert_not_called()
+        # opening the grid earlier in the same utterance counts
+        plan = self.parser.compile_plan("show grid then five")
+        assert plan.describe() == ["mouse.grid.start()", "mouse.grid.select(5)"]
+        grid.active = True
+        assert self.parser.compile_plan("five").describe() == ["mouse.grid.select(5)"]
+
+    def test_register_command_priority(self):
+        handler = MagicMock(return_value=None)
+        self.parser.register_command("zoom", r".*?zoom", 55, handler)
+        self.parser.parse_command("zoom click")
+        handler.assert_called_once_with("zoom click")
+        self.mock_mouse.click.assert_not_called()
+
+        low = MagicMock()
+        self.parser.register_command("zoom", r".*?zoom", 10, low)
+        self.parser.parse_command("zoom click")
+        low.assert_not_called()
+        self.mock_mouse.click.assert_called_once_with("left")
+
+    def test_shortcut_without_keyboard(self, caplog):
+        parser = CommandParser(self.config)
+        parser.set_mouse_controller(self.mock_mouse)
+        parser.parse_command("refresh")
+        assert "Unrecognized command: refresh" in caplog.text
+
+    def test_glide_commands(self, caplog):
+        self.parser.parse_command("glide right")
+        self.mock_mouse.glide.assert_called_once_with("right")
+        self.parser.parse_command("keep going down")
+        self.mock_mouse.glide.assert_called_with("down")
+
+        self.parser.parse_command("faster")
+        self.mock_mouse.change_glide_speed.assert_called_with(1.5)
+        self.parser.parse_command("slow down")
+        self.mock_mouse.change_glide_speed.assert_called_with(1 / 1.5)
+        self.mock_mouse.move_cursor.assert_not_called()
+
+        self.parser.parse_command("glide")
+        assert "No glide direction" in caplog.text
+        assert "glide" in self.parser.grammar().words
+        assert "faster" in self.parser.grammar().words
+
+    def test_grid_commands(self):
+        grid = self.mock_mouse.grid
+        self.parser.parse_command("show grid")
+        grid.start.assert_called_once()
+        self.parser.parse_command("five")
+        grid.select.assert_called_with(5)
+        self.parser.parse_command("cell 9")
+        grid.select.assert_called_with(9)
+        self.parser.parse_command("grid back")
+        grid.back.assert_called_once()
+        self.parser.parse_command("close grid")
+        grid.close.assert_called_once()
+        assert {"grid", "cell", "nine"} <= set(self.parser.grammar().words)
+
+    def test_batched_utterance(self):
+        plan = self.parser.parse_command("move up 200 then click and scroll down")
+        assert plan.describe() == ["mouse.move_cursor('up', 200)", "mouse.click('left')", "mouse.scroll('down')"]
+        assert [c[0] for c in self.mock_mouse.method_calls] == ["move_cursor", "click", "scroll"]
+        assert plan.state == "done"
+        assert self.parser.current_plan is None
+
+    def test_typing_payload_takes_rest_of_utterance(self, caplog):
+        plan = self.parser.compile_plan("move left, type milk and eggs then press enter")
+        assert plan.describe() == ["mouse.move_cursor('left', 50)", "keyboard.type_text('milk and eggs then press enter')"]
+        plan = self.parser.compile_plan("blah then click")
+        assert plan.describe() == ["mouse.click('left')"]
+        assert "Unrecognized command: blah" in caplog.text
+        assert self.parser.compile_plan("then") is None
+        assert "Unrecognized command: then" in caplog.text
+
+    def test_cancel_plan(self):
+        assert not self.parser.cancel_plan()
+        self.mock_mouse.is_moving.return_value = True
+        self.parser.current_plan = self.parser.compile_plan("click then click")
+        assert self.parser.cancel_plan()
+        self.mock_mouse.stop_motion.assert_called_once()
+        self.parser.current_plan.run(self.parser._targets())
+        self.mock_mouse.click.assert_not_called()
+
+    def test_plan_records_compile_time(self):
+        plan = self.parser.compile_plan("click then scroll down")
+        assert 0 < plan.compile_s < 1
+
+    def test_early_command_waits_for_ambiguous_partials(self):
+        assert self.parser.early_command("click").name == "click"
+        self.mock_mouse.grid.active = True
+        assert self.parser.early_command("five").name == "grid_cell"
+        assert self.parser.early_command("right") is None  # could still become "right click"
+        assert self.parser.early_command("move up") is None  # an amount may follow
+        assert self.parser.early_command("type hello") is None
+        assert self.parser.early_command("click then") is None
+        assert self.parser.early_command("") is None
+
+    def test_continuation(self):
+        assert CommandParser.continuation("click", "click then scroll down") == "scroll down"
+        assert CommandParser.continuation("click", "click and") is None
+        assert CommandParser.continuation("click", "double click") is None
+        assert CommandParser.continuation("click", "clicker") is None
+
+    def test_record_save_and_run_macro(self, tmp_path, caplog):
+        self.config.macro_path = str(tmp_path / "macros.jsonl")
+        parser = CommandParser(self.config)
+        parser.set_mouse_controller(self.mock_mouse)
+        parser.set_keyboard_controller(self.mock_keyboard)
+        parser.set_window_manager(self.mock_wm)
+
+        parser.parse_command("save as nothing")
+        assert "Not recording" in caplog.text
+        parser.parse_command("start recording")
+        parser.parse_command("open gmail then address bar")
+        parser.parse_command("type hello")
+        parser.parse_command("save as check mail")
+        assert parser.recording is None
+        assert "run check mail" in parser.grammar().phrases
+
+        fresh = CommandParser(self.config)  # new session: loads the file on demand
+        fresh.set_mouse_controller(self.mock_mouse)
+        fresh.set_keyboard_controller(self.mock_keyboard)
+        fresh.set_window_manager(self.mock_wm)
+        self.mock_wm.reset_mock()
+        self.mock_keyboard.reset_mock()
+        with patch.object(fresh, "match_command", wraps=fresh.match_command) as match:
+            plan = fresh.parse_command("run check mail")
+        match.assert_called_once()  # the stored steps are not parsed again
+        assert plan.describe() == ["window.open('gmail')", "keyboard.press_keys('ctrl l')", "keyboard.type_text('hello')"]
+        self.mock_wm.open.assert_called_once_with("gmail")
+        self.mock_keyboard.type_text.assert_called_once_with("hello")
+
+        fresh.parse_command("play macro nope")
+        assert "No macro named 'nope'" in caplog.text
+
+    def test_bare_run_only_matches_saved_macros(self, tmp_path, caplog):
+        self.config.macro_path = str(tmp_path / "macros.jsonl")
+        parser = CommandParser(self.config)
+        parser.set_mouse_controller(self.mock_mouse)
+        assert parser.match_command("run tidy") is None
+        assert parser.compile_plan("run up 200").describe() == ["mouse.move_cursor('up', 200)"]
+        assert parser.compile_plan("play nope") is None
+        assert "No macro named" not in caplog.text
+        parser.parse_command("start recording")
+        parser.parse_command("click")
+        parser.parse_command("save as two")
+        assert parser.match_command("run two").name == "macro_run_named"
+        assert parser.normalize("run two") == "run two"  # the name is left as spoken
+        assert parser.compile_plan("run two").describe() == ["mouse.click('left')"]
+        assert parser.match_command("run macro two").name == "macro_run"
+
+    def test_cancel_recording(self, tmp_path):
+        self.config.macro_path = str(tmp_path / "macros.jsonl")
+        self.parser = CommandParser(self.config)
+        self.parser.set_mouse_controller(self.mock_mouse)
+        self.parser.parse_command("start recording")
+        self.parser.parse_command("click")
+        assert self.parser.recording == [Action("mouse", "click", ("left",))]
+        self.parser.parse_command("cancel recording")
+        assert self.parser.recording is None
+        self.parser.parse_command("start recording")
+        self.parser.parse_command("save as empty")
+        assert self.parser.macros.names() == []
+
+    def test_normalize(self):
+        assert self.parser.normalize("  Move UP  one hundred ") == "move up 100"
+        assert self.parser.normalize("go north and left click") == "go up then click"
+        assert self.parser.normalize("wheel up, double") == "scroll up then double click"
+        # payloads are left as spoken, and only in their own command
+        assert self.parser.normalize("type one and two") == "type one and two"
+        assert self.parser.normalize("north two then type one and two") == "up 2 then type one and two"
+        assert self.parser.normalize("click then press one") == "click then press one"
+        assert self.parser.normalize("north 200 then press enter") == "up 200 then press enter"
+
+    def test_mixed_payload_utterance_compiles_like_keywords(self):
+        spoken = self.parser.compile_plan("north then press enter")
+        assert spoken.text == self.parser.compile_plan("up then press enter").text == "up then press enter"
+        assert spoken.describe() == ["mouse.move_cursor('up', 50)", "keyboard.press_keys('enter')"]
+
+    def test_bare_press_does_not_click(self):
+        assert self.parser.normalize("press") == "press"
+        plan = self.parser.compile_plan("press")
+        assert plan is None or "mouse.click" not in " ".join(plan.describe())
+        self.mock_mouse.click.assert_not_called()
+
+    def test_synonyms_compile_like_their_keyword(self):
+        assert self.parser.compile_plan("move north").describe() == ["mouse.move_cursor('up', 50)"]
+        assert self.parser.compile_plan("left click").describe() == ["mouse.click('left')"]
+
+    def test_compiled_commands_are_cached(self):
+        first = self.parser.compile_plan("scroll down")
+        with patch.object(self.parser, "match_command") as match:
+            second = self.parser.compile_plan("Scroll  down")
+            third = self.parser.compile_plan("wheel down")
+        match.assert_not_called()
+        assert second is not first  # every run gets its own plan
+        assert second.describe() == third.describe() == ["mouse.scroll('down')"]
+        stats = self.parser.cache_stats()
+        assert stats["hits"] == 2 and stats["misses"] == 1
+        assert stats["hit_rate"] == pytest.approx(2 / 3)
+
+    def test_unrecognized_results_still_logged_from_cache(self, caplog):
+        assert self.parser.compile_plan("blah blah") is None
+        caplog.clear()
+        assert self.parser.compile_plan("blah blah") is None
+        assert "Unrecognized command: blah blah" in caplog.text
+
+    def test_cache_invalidated_by_config_changes(self):
+        assert self.parser.compile_plan("move up").describe() == ["mouse.move_cursor('up', 50)"]
+        self.config.default_move_distance = 80  # the GUI slider
+        assert self.parser.compile_plan("move up").describe() == ["mouse.move_cursor('up', 80)"]
+
+        self.config.parse_cache_check_s = 0
+        self.config.movement_commands["up"].append("skyward")
+        assert self.parser.compile_plan("move skyward").describe() == ["mouse.move_cursor('up', 80)"]
+        assert self.parser.cache_stats()["size"] == 1  # "move up" was dropped with the old keywords
+        self.config.site_aliases["news"] = "https://news.example.com"
+        self.parser.compile_plan("click")
+        assert self.parser.cache_stats()["size"] == 1  # cleared again before "click" was added
+
+    def test_keyword_edits_wait_for_check_interval(self):
+        self.config.parse_cache_check_s = 60
+        self.parser.compile_plan("click")
+        self.config.click_commands["left"].append("poke")
+        assert self.parser.compile_plan("poke") is None
+        self.parser.invalidate_cache()
+        assert self.parser.compile_plan("poke").describe() == ["mouse.click('left')"]
+
+    def test_macro_runs_are_not_cached(self, tmp_path):
+        self.config.macro_path = str(tmp_path / "macros.jsonl")
+        parser = CommandParser(self.config)
+        parser.set_mouse_controller(self.mock_mouse)
+        parser.macros.save("tidy", [Action("mouse", "click", ("left",))])
+        assert parser.compile_plan("run tidy").describe() == ["mouse.click('left')"]
+        parser.macros.save("tidy", [Action("mouse", "scroll", ("up",))])
+        assert parser.compile_plan("run tidy").describe() == ["mouse.scroll('up')"]
+        assert parser.cache_stats()["size"] == 0
+
+
+    def test_misheard_commands_are_corrected(self, caplog):
+        assert self.parser.compile_plan("scroll dawn").describe() == ["mouse.scroll('down')"]
+        assert "Heard 'scroll dawn' as 'scroll down'" in caplog.text
+        # "right" alone would have made this a move; the out-of-vocabulary word sends it to the index
+        assert self.parser.compile_plan("right clique").describe() == ["mouse.click('right')"]
+        assert self.parser.compile_plan("moov left 100").describe() == ["mouse.move_cursor('left', 100)"]
+        assert self.parser.compile_plan("sell five").describe() == ["mouse.grid.select(5)"]
+
+    def test_fuzzy_leaves_payloads_and_noise_alone(self):
+        assert self.parser.compile_plan("type helo").describe() == ["keyboard.type_text('helo')"]
+        assert self.parser.compile_plan("what time is it") is None
+        assert self.parser.compile_plan("move up please").describe() == ["mouse.move_cursor('up', 50)"]
+
+    def test_fuzzy_site_alias(self):
+        assert self.parser.compile_plan("open g mail").describe() == ["window.open('gmail')"]
+        assert self.parser.compile_plan("open example.com").describe() == ["window.open('example.com')"]
+
+    def test_fuzzy_matching_can_be_disabled(self):
+        self.config.fuzzy_matching = False
+        assert self.parser.compile_plan("right clique").describe() == ["mouse.move_cursor('right', 50)"]
+        assert self.parser.compile_plan("dubble klik") is None
+
+class TestLRUCache:
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        assert cache.get("a") == 1  # "b" is now the oldest
+        cache.put("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1 and cache.get("c") == 3
+        assert cache.stats()["evictions"] == 1
+
+    def test_zero_size_disables(self):
+        cache = LRUCache(0)
+        cache.put("a", 1)
+        assert cache.get("a") is None
+        assert len(cache) == 0
+        assert LRUCache(1).stats()["hit_rate"] is None
+
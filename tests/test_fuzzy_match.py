@@ -0,0 +1,64 @@
+"""
+Tests for fuzzy_match.py
+"""
+
+import pytest
+from fuzzy_match import FuzzyIndex, deletions, edit_distance, metaphone, phonetic_key
+
+
+class TestPhonetics:
+    def test_metaphone_groups_soundalikes(self):
+        assert metaphone("click") == metaphone("clique") == "KLK"
+        assert metaphone("down") == metaphone("dawn")
+        assert metaphone("move") == metaphone("moov")
+        assert metaphone("right") == metaphone("rite") == "RT"
+        assert metaphone("scroll") == "SKRL"
+
+    def test_phonetic_key_keeps_digits(self):
+        assert phonetic_key("cell 5") == phonetic_key("sell 5") == "SL 5"
+        assert phonetic_key("") == ""
+
+
+class TestEditDistance:
+    @pytest.mark.parametrize("a, b, expected", [
+        ("", "", 0), ("abc", "", 3), ("kitten", "sitting", 3),
+        ("scroll down", "scroll dawn", 1), ("flaw", "lawn", 2),
+    ])
+    def test_distance(self, a, b, expected):
+        assert edit_distance(a, b) == expected
+        assert edit_distance(b, a) == expected
+
+    def test_limit_cuts_off(self):
+        assert edit_distance("kitten", "sitting", limit=1) == 2
+        assert edit_distance("kitten", "sitting", limit=3) == 3
+        assert edit_distance("a", "abcdef", limit=2) == 3
+
+    def test_deletions(self):
+        assert deletions("abc", 1) == {"abc", "bc", "ac", "ab"}
+        assert "a" in deletions("abc", 2)
+
+
+class TestFuzzyIndex:
+    def setup_method(self):
+        self.index = FuzzyIndex(["scroll down", "scroll up", "right click", "double click", "move left", "new tab"])
+
+    def test_near_misses_resolve(self):
+        assert self.index.match("scroll dawn").phrase == "scroll down"
+        assert self.index.match("right clique").phrase == "right click"
+        assert self.index.match("new tap").phrase == "new tab"  # one phonetic edit away
+
+    def test_confidence(self):
+        match = self.index.match("scroll dawn")
+        assert match.distance == 1
+        assert match.confidence == pytest.approx(1 - 1 / 11)
+        assert self.index.match("Scroll  Down").confidence == 1.0
+
+    def test_unrelated_text_is_rejected(self):
+        assert self.index.match("what time is it") is None
+        assert self.index.match("blah") is None
+        assert self.index.match("") is None
+
+    def test_confidence_bound(self):
+        strict = FuzzyIndex(["right click"], min_confidence=0.9)
+        assert strict.match("right clique") is None
+        assert len(strict) == 1
@@ -0,0 +1,46 @@
+"""
+Tests for hypothesis_rescorer.py
+"""
+
+from unittest.mock import MagicMock
+from command_parser import CommandParser
+from config import Config
+from hypothesis_rescorer import HypothesisRescorer
+
+
+class TestHypothesisRescorer:
+    def setup_method(self):
+        self.config = Config()
+        self.parser = CommandParser(self.config)
+        self.rescorer = HypothesisRescorer(self.parser)
+
+    def test_valid_alternative_beats_invalid_top(self):
+        assert self.rescorer.best(["scroll dawn", "scroll down"]) == (1, "scroll down")
+        assert self.rescorer.best(["moo flat", "move left", "move lift"]) == (1, "move left")
+
+    def test_top_kept_when_it_is_a_command(self):
+        assert self.rescorer.best(["click", "clique", "click it"]) == (0, "click")
+        assert self.rescorer.best(["move left", "move lift"]) == (0, "move left")
+
+    def test_top_kept_when_nothing_fits(self):
+        assert self.rescorer.best(["what time is it", "what thyme is it"]) == (0, "what time is it")
+
+    def test_payload_commands_count_as_covered(self):
+        # free text after "type" is not held against the alternative
+        assert self.rescorer.best(["tie pizza quattro", "type pizza quattro"]) == (1, "type pizza quattro")
+
+    def test_numbers_are_in_vocabulary(self):
+        scores = self.rescorer.score(["move up 250", "move up to fifty"])
+        assert scores[0] > scores[1]
+
+    def test_single_alternative_not_scored(self):
+        parser = MagicMock()
+        rescorer = HypothesisRescorer(parser)
+        assert rescorer.best(["anything"]) == (0, "anything")
+        parser.normalize.assert_not_called()
+
+    def test_vocabulary_follows_new_keywords(self):
+        assert self.rescorer.best(["move upward", "move up"]) == (1, "move up")
+        self.config.movement_commands["up"].append("upward")
+        self.parser.invalidate_cache()
+        assert self.rescorer.best(["move upward", "move up"]) == (0, "move upward")
@@ -0,0 +1,86 @@
+"""
+Tests for lazy_import.py
+"""
+
+import sys
+import threading
+import time
+import types
+from unittest.mock import patch
+from lazy_import import LazyModule, deferred, lazy_import, load_all
+
+
+class TestLazyModule:
+    def setup_method(self):
+        self.fake = types.ModuleType("fake_heavy")
+        self.fake.value = 1
+        self.fake.PAUSE = 0.5
+
+    def test_import_deferred_until_attribute_use(self):
+        module = LazyModule("fake_heavy")
+        assert not module.loaded
+        with patch.dict(sys.modules, {"fake_heavy": self.fake}):
+            assert module.value == 1
+        assert module.loaded
+        assert "not loaded" not in repr(module)
+
+    def test_assignments_before_import_are_replayed(self):
+        module = LazyModule("fake_heavy")
+        module.PAUSE = 0.1
+        assert module.PAUSE == 0.1 and not module.loaded
+        with patch.dict(sys.modules, {"fake_heavy": self.fake}):
+            assert module.value == 1
+        assert self.fake.PAUSE == 0.1
+        module.PAUSE = 0.2
+        assert self.fake.PAUSE == 0.2
+
+    def test_patches_on_real_module_are_visible(self):
+        module = LazyModule("fake_heavy")
+        with patch.dict(sys.modules, {"fake_heavy": self.fake}):
+            with patch.object(self.fake, "value", 5):
+                assert module.value == 5
+            assert module.value == 1
+
+    def test_lazy_import_is_shared_per_name(self):
+        assert lazy_import("json") is lazy_import("json")
+        assert lazy_import("json").dumps([1]) == "[1]"
+
+    def test_load_all_reports_failures(self):
+        lazy_import("json")
+        missing = lazy_import("no_such_module_for_load_all")
+        failed = load_all()
+        assert lazy_import("json").loaded
+        assert list(failed) == ["no_such_module_for_load_all"] and not missing.loaded
+
+
+class TestDeferred:
+    def test_built_once_across_threads(self):
+        built = []
+
+        class Holder:
+            @deferred
+            def engine(self):
+                time.sleep(0.05)
+                built.append(1)
+                return object()
+
+        holder = Holder()
+        seen = []
+        threads = [threading.Thread(target=lambda: seen.append(holder.engine)) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert built == [1]
+        assert all(engine is seen[0] for engine in seen)
+
+    def test_assignment_replaces_value(self):
+        class Holder:
+            @deferred
+            def engine(self):
+                raise AssertionError("should not be built")
+
+        holder = Holder()
+        holder.engine = "mock"
+        assert holder.engine == "mock"
+        assert isinstance(Holder.engine, deferred)
@@ -0,0 +1,68 @@
+"""
+Tests for macros.py
+"""
+
+import json
+from action_plan import Action
+from macros import MacroStore
+
+
+STEPS = (
+    Action("window", "open", ("gmail",)),
+    Action("keyboard", "press_keys", ("ctrl l",)),
+    Action("mouse", "glide", ("right",), wait=False),
+)
+
+
+class TestMacroStore:
+    def test_round_trip_in_compact_json_lines(self, tmp_path):
+        path = tmp_path / "macros.jsonl"
+        MacroStore(str(path)).save("morning", STEPS)
+
+        line = path.read_text().strip()
+        assert json.loads(line) == {
+            "name": "morning",
+            "steps": [["window", "open", ["gmail"]], ["keyboard", "press_keys", ["ctrl l"]], ["mouse", "glide", ["right"], False]],
+        }
+        assert " " not in line.replace("ctrl l", "")  # no padding
+
+        store = MacroStore(str(path))
+        assert store.get("morning") == STEPS
+        assert store.names() == ["morning"]
+
+    def test_loaded_lazily_and_once(self, tmp_path, monkeypatch):
+        path = tmp_path / "macros.jsonl"
+        MacroStore(str(path)).save("a", STEPS[:1])
+        opened = []
+        real_open = open
+        monkeypatch.setattr("builtins.open", lambda *a, **k: opened.append(a[0]) or real_open(*a, **k))
+        store = MacroStore(str(path))
+        assert opened == []
+        store.get("a")
+        store.get("a")
+        store.names()
+        assert opened == [str(path)]
+
+    def test_missing_file_and_bad_lines(self, tmp_path, caplog):
+        assert MacroStore(str(tmp_path / "none.jsonl")).get("x") is None
+        path = tmp_path / "macros.jsonl"
+        path.write_text('not json\n{"name": "ok", "steps": [["mouse", "click", ["left"]]]}\n\n')
+        store = MacroStore(str(path))
+        assert store.get("ok") == (Action("mouse", "click", ("left",)),)
+        assert "Skipping bad macro entry" in caplog.text
+
+    def test_latest_save_wins_and_file_is_compacted(self, tmp_path):
+        path = tmp_path / "sub" / "macros.jsonl"
+        store = MacroStore(str(path))
+        for i in range(5):
+            store.save("x", STEPS[:1 + i % 3])
+        assert len(path.read_text().splitlines()) <= 2
+        assert MacroStore(str(path)).get("x") == store.get("x") == STEPS[:2]
+
+    def test_delete(self, tmp_path):
+        store = MacroStore(str(tmp_path / "m.jsonl"))
+        store.save("a", STEPS)
+        store.save("b", STEPS)
+        assert store.delete("a")
+        assert not store.delete("a")
+        assert MacroStore(store.path).names() == ["b"]
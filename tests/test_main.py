@@ -37,11 +37,18 @@ class TestClickToTalkApp:
         assert self.app.running == False
         self.app.speech_handler.stop_listening.assert_called()
 
-    def test_start_runs_minimal_loop(self, monkeypatch):
-        # Dummy root to avoid real Tk loop
+    def _run_gui(self, monkeypatch, pointer=(0, 0), on_start=None):
+        """Run start() against a fake Tk whose mainloop drains after() jobs on a fake clock.
+
+        on_start(app) runs when mainloop() is entered, before any job.
+        """
+        clock = {"now": 1000.0}
+
         class DummyRoot:
             def __init__(self):
                 self._geom = "320x420+0+0"
+                self.jobs = []
+                self.quit_called = False
             def overrideredirect(self, *_):
                 return None
             def attributes(self, *_):
@@ -53,15 +60,27 @@ class TestClickToTalkApp:
             def geometry(self, g=None):
                 if g:
                     self._geom = g
-                return self._geom
+                    return None
+                raise AssertionError("panel position must come from the cache, not geometry()")
             def winfo_pointerx(self):
-                return 0
+                return pointer[0]
             def winfo_pointery(self):
-                return 0
-            def update_idletasks(self):
-                return None
-            def update(self):
-                return None
+                return pointer[1]
+            def after(self, ms, fn):
+                self.jobs.append((clock["now"] + ms / 1000.0, len(self.jobs), fn))
+                return len(self.jobs)
+            def mainloop(self):
+                if on_start:
+                    on_start(app)
+                ran = 0
+                while self.jobs and not self.quit_called and ran < 100:
+                    ran += 1
+                    self.jobs.sort(key=lambda job: job[:2])
+                    due, _, fn = self.jobs.pop(0)
+                    clock["now"] = max(clock["now"], due)
+                    fn()
+            def quit(self):
+                self.quit_called = True
             def bind(self, *_, **__):
                 return None
             def destroy(self):
@@ -80,17 +99,21 @@ class TestClickToTalkApp:
                 return None
 
         dummy_root = DummyRoot()
+        status = {}
 
         # Patch tk/ttk pieces to avoid GUI
         monkeypatch.setattr('main.tk.Tk', lambda: dummy_root)
-        monkeypatch.setattr('main.tk.StringVar', lambda value=None: MagicMock(set=lambda v: None))
+        monkeypatch.setattr('main.tk.StringVar', lambda value=None: MagicMock(set=lambda v: status.update(text=v)))
         monkeypatch.setattr('main.ttk.Frame', lambda *a, **k: DummyWidget())
         monkeypatch.setattr('main.ttk.Label', lambda *a, **k: DummyWidget())
         monkeypatch.setattr('main.ttk.Button', lambda *a, **k: DummyWidget())
         monkeypatch.setattr('main.ttk.Scale', lambda *a, **k: DummyWidget())
         monkeypatch.setattr('main.ttk.Combobox', lambda *a, **k: DummyWidget())
+        monkeypatch.setattr('mouse_controller.HighlightOverlay', MagicMock())
+        monkeypatch.setattr('mouse_controller.GridOverlay', MagicMock())
+        monkeypatch.setattr('main.time.time', lambda: clock["now"])
 
-        # Prevent speech thread from starting and force loop exit via sleep
+        # Prevent speech thread from starting
         monkeypatch.setattr('main.threading.Thread', lambda *a, **k: MagicMock(start=lambda: None))
 
         # Mock SpeechHandler to avoid microphone
@@ -100,20 +123,78 @@ class TestClickToTalkApp:
             mock_speech.return_value = handler
 
             app = ClickToTalkApp()
+            app.start()
 
-            def sleep_stop(*_):
-                app.running = False
-                return None
+        return app, handler, dummy_root, status
 
-            monkeypatch.setattr('main.time.sleep', sleep_stop)
+    def test_start_runs_minimal_loop(self, monkeypatch):
+        app, handler, root, status = self._run_gui(monkeypatch)
 
-            app.start()
+        handler.set_stop_callback.assert_called_once()
+        handler.stop_listening.assert_called_once()
+        assert status["text"] == "Status: stopped"
+
+    def test_idle_panel_autohides_then_schedules_nothing(self, monkeypatch):
+        app, handler, root, status = self._run_gui(monkeypatch)
+
+        # 30 s of inactivity slid the panel to its hidden x (only the tab on screen)
+        assert root._geom == "500x700+1892+126"
+        # mainloop() only returned because no timers were left: an idle, hidden panel is free
+        assert root.jobs == [] or all(fn == root.quit for _, _, fn in root.jobs)
+
+    def test_autohide_waits_while_pointer_inside(self, monkeypatch):
+        app, handler, root, status = self._run_gui(monkeypatch, pointer=(1500, 300))
+        # Pointer stays over the panel, so the check keeps re-arming instead of hiding
+        assert root._geom == "500x700+1420+126"
+        assert len(root.jobs) == 2  # just the re-armed auto-hide check (+ quit from stop())
+
+    def test_voice_panel_callbacks_are_posted_to_gui_thread(self, monkeypatch):
+        def minimize_by_voice(app):
+            app.command_parser.ui_minimize_callback()
 
-            handler.set_stop_callback.assert_called_once()
-            handler.stop_listening.assert_called_once()
+        app, handler, root, status = self._run_gui(monkeypatch, on_start=minimize_by_voice)
+        assert root._geom == "500x700+1892+126"
+
+    def test_status_callback_updates_label(self, monkeypatch):
+        def start_listening(app):
+            handler = app.speech_handler
+            handler.listening = True
+            callback = handler.set_status_callback.call_args.args[0]
+            callback(True)
+
+        app, handler, root, status = self._run_gui(monkeypatch, on_start=start_listening)
+        assert status["text"] == "Status: listening"
+
+    def test_noise_callback_updates_label(self, monkeypatch):
+        def calibrated(app):
+            callback = app.speech_handler.set_noise_callback.call_args.args[0]
+            callback(312.4, 208.3)
+
+        app, handler, root, status = self._run_gui(monkeypatch, on_start=calibrated)
+        assert status["text"] == "Mic threshold: 312 (noise floor 208)"
+
+    def test_export_latency(self, caplog):
+        self.app.speech_handler.latency.export_jsonl.return_value = 4
+        self.app.export_latency()
+        self.app.speech_handler.latency.export_jsonl.assert_called_once_with(self.app.config.latency_log_path)
+        assert "Exported 4 command timings" in caplog.text
+
+    def test_post_to_gui_ignores_dead_root(self):
+        self.app.root = MagicMock()
+        self.app.root.after.side_effect = RuntimeError("main thread is not in main loop")
+        self.app._post_to_gui(lambda: None)
+        self.app.root = None
+        self.app._post_to_gui(lambda: None)
 
 
 class TestMainFunction:
+    def setup_method(self):
+        self.logging_patch = patch('main.setup_logging')  # no handlers or log file from the test run
+        self.mock_setup_logging = self.logging_patch.start()
+
+    def teardown_method(self):
+        self.logging_patch.stop()
+
     @patch('main.ClickToTalkApp')
     def test_main_success(self, mock_app_class):
         mock_app = MagicMock()
@@ -121,6 +202,7 @@ class TestMainFunction:
         main()
         mock_app_class.assert_called_once()
         mock_app.start.assert_called_once()
+        self.mock_setup_logging.assert_called_once_with(mock_app_class.call_args.args[0])
 
     @patch('main.ClickToTalkApp')
     @patch('sys.exit')
@@ -129,6 +211,18 @@ class TestMainFunction:
         main()
         mock_exit.assert_called_once_with(1)
 
+    @patch('main.ClickToTalkApp')
+    @patch('main.load_all', return_value={})
+    def test_self_test(self, mock_load_all, mock_app_class):
+        with patch('sys.argv', ['main', '--self-test']), pytest.raises(SystemExit) as exit_info:
+            main()
+        assert exit_info.value.code == 0
+        mock_app_class.assert_not_called()
+        mock_load_all.return_value = {"tkinter": ImportError("No module named 'tkinter'")}
+        with patch('sys.argv', ['main', '--self-test']), pytest.raises(SystemExit) as exit_info:
+            main()
+        assert exit_info.value.code == 1
+
     @patch('main.ClickToTalkApp')
     def test_main_keyboard_interrupt(self, mock_app_class):
         mock_app = MagicMock()
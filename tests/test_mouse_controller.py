@@ -4,59 +4,111 @@ Tests for mouse_controller.py
 
 import pytest
 from unittest.mock import patch, MagicMock
-from mouse_controller import MouseController
+import sys
+import types
+import threading
+import time
+from concurrent.futures import Future
+from mouse_controller import (
+    GridOverlay, HighlightOverlay, MotionEngine, MouseController, ScreenGeometry, _Glide, grid_cells,
+)
 from config import Config
 
 
 class TestMouseController:
     def setup_method(self):
         self.config = Config()
+        self.config.move_duration = 0.02  # keep tweens short; they run on the engine thread
         self.controller = MouseController(self.config)
 
+    def teardown_method(self):
+        self.controller.motion.shutdown()
+
+    def moved(self, future):
+        """Wait for the tween and return where it landed."""
+        return future.result(timeout=2)
+
     @patch('pyautogui.moveTo')
     @patch('pyautogui.position')
     def test_move_cursor_directions(self, mock_position, mock_move):
+        self.config.position_cache_ttl = 0  # re-read the (mocked) OS position every move
         mock_position.return_value = (100, 100)
-        
-        self.controller.move_cursor("up", 50)
-        mock_move.assert_called_with(100, 50, duration=0.2)
-        
-        mock_move.reset_mock()
-        self.controller.move_cursor("down", 50)
-        mock_move.assert_called_with(100, 150, duration=0.2)
-        
-        mock_move.reset_mock()
-        self.controller.move_cursor("left", 50)
-        mock_move.assert_called_with(50, 100, duration=0.2)
-        
-        mock_move.reset_mock()
-        self.controller.move_cursor("right", 50)
-        mock_move.assert_called_with(150, 100, duration=0.2)
+
+        assert self.moved(self.controller.move_cursor("up", 50)) == (100, 50)
+        assert self.moved(self.controller.move_cursor("down", 50)) == (100, 150)
+        assert self.moved(self.controller.move_cursor("left", 50)) == (50, 100)
+        assert self.moved(self.controller.move_cursor("right", 50)) == (150, 100)
+        mock_move.assert_called_with(150, 100, _pause=False)
 
     @patch('pyautogui.size')
     @patch('pyautogui.moveTo')
     @patch('pyautogui.position')
     def test_move_cursor_boundaries(self, mock_position, mock_move, mock_size):
+        self.config.position_cache_ttl = 0
         mock_size.return_value = (1920, 1080)
-        
+
         mock_position.return_value = (10, 10)
-        self.controller.move_cursor("left", 50)
-        mock_move.assert_called_with(0, 10, duration=0.2)
-        
-        mock_move.reset_mock()
+        assert self.moved(self.controller.move_cursor("left", 50)) == (0, 10)
+
         mock_position.return_value = (100, 10)
-        self.controller.move_cursor("up", 50)
-        mock_move.assert_called_with(100, 0, duration=0.2)
-        
-        mock_move.reset_mock()
+        assert self.moved(self.controller.move_cursor("up", 50)) == (100, 0)
+
         mock_position.return_value = (1910, 100)
-        self.controller.move_cursor("right", 50)
-        mock_move.assert_called_with(1920, 100, duration=0.2)
-        
-        mock_move.reset_mock()
+        assert self.moved(self.controller.move_cursor("right", 50)) == (1920, 100)
+
         mock_position.return_value = (100, 1070)
-        self.controller.move_cursor("down", 50)
-        mock_move.assert_called_with(100, 1080, duration=0.2)
+        assert self.moved(self.controller.move_cursor("down", 50)) == (100, 1080)
+
+    @patch('pyautogui.size', return_value=(1920, 1080))
+    @patch('pyautogui.moveTo')
+    @patch('pyautogui.position', return_value=(100, 100))
+    def test_burst_of_moves_uses_tracked_position(self, mock_position, mock_move, mock_size):
+        self.controller.move_cursor("right", 50)
+        self.controller.move_cursor("right", 50)
+        assert self.moved(self.controller.move_cursor("down", 50)) == (200, 150)
+        mock_position.assert_called_once()
+        mock_size.assert_called_once()  # geometry cached across the burst
+
+        self.controller.invalidate_geometry()
+        assert self.moved(self.controller.move_cursor("up", 10)) == (100, 90)
+        assert mock_position.call_count == 2
+        assert mock_size.call_count == 2
+
+    @patch('pyautogui.moveTo')
+    @patch('pyautogui.position', return_value=(-1500, 100))
+    def test_clamps_to_virtual_desktop(self, mock_position, mock_move):
+        monitors = [(0, 0, 1920, 1080), (-1920, 0, 1920, 1200)]
+        with patch.object(ScreenGeometry, '_query', return_value=monitors):
+            assert self.moved(self.controller.move_cursor("left", 1000)) == (-1920, 100)
+            assert self.moved(self.controller.move_cursor("down", 5000)) == (-1920, 1200)
+
+    @patch('pyautogui.moveTo')
+    @patch('pyautogui.position', return_value=(0, 0))
+    def test_move_cursor_does_not_block(self, mock_position, mock_move):
+        self.config.move_duration = 5
+        future = self.controller.move_cursor("right", 500)
+        assert not future.done()
+        assert self.controller.is_moving()
+        stopped = self.controller.stop_motion()
+        assert future.cancelled()
+        assert not self.controller.is_moving()
+        assert self.controller._current_position() == stopped
+        assert self.controller.stop_motion() is None
+
+    @patch('pyautogui.size', return_value=(1920, 1080))
+    @patch('pyautogui.moveTo')
+    @patch('pyautogui.position', return_value=(100, 100))
+    def test_glide_faster_slower_stop(self, mock_position, mock_move, mock_size, caplog):
+        assert self.controller.change_glide_speed(2) is None
+        assert self.controller.glide("diagonal") is None
+        future = self.controller.glide("left")
+        assert self.controller.is_gliding()
+        assert self.controller.change_glide_speed(100) == self.config.glide_max_speed
+        assert self.controller.change_glide_speed(0.0001) == self.config.glide_min_speed
+        self.controller.stop_motion()
+        assert future.cancelled()
+        assert not self.controller.is_gliding()
+        assert "Not gliding" in caplog.text
 
     @patch('pyautogui.click')
     @patch('pyautogui.rightClick')
@@ -81,15 +133,14 @@ class TestMouseController:
         mock_scroll.assert_called_with(-5)
 
     @patch('pyautogui.position')
-    def test_get_and_show_position(self, mock_position, capsys):
+    def test_get_and_show_position(self, mock_position, caplog):
         mock_position.return_value = (100, 200)
         
         pos = self.controller.get_position()
         assert pos == (100, 200)
         
         self.controller.show_cursor_position()
-        captured = capsys.readouterr()
-        assert "Cursor position: (100, 200)" in captured.out
+        assert "Cursor position: (100, 200)" in caplog.text
 
     @patch('sys.platform', 'darwin')
     @patch('pyautogui.moveTo')
@@ -99,18 +150,10 @@ class TestMouseController:
         self.controller.highlight_cursor()
         assert mock_move.call_count == 3
 
-    @patch('sys.platform', 'linux')
-    @patch('threading.Thread')
-    @patch('pyautogui.position')
-    def test_highlight_cursor_linux(self, mock_position, mock_thread):
-        mock_position.return_value = (100, 100)
-        self.controller.highlight_cursor()
-        mock_thread.assert_called_once()
-
     @patch('pyautogui.position', return_value=(0, 0))
     @patch('pyautogui.moveTo')
     def test_move_cursor_unknown_direction(self, mock_move, mock_pos):
-        self.controller.move_cursor("diagonal", 25)
+        assert self.controller.move_cursor("diagonal", 25) is None
         mock_move.assert_not_called()
 
     @patch('sys.platform', 'darwin')
@@ -119,26 +162,302 @@ class TestMouseController:
         # Should swallow exceptions and not raise
         self.controller.highlight_cursor()
 
-    @patch('sys.platform', 'linux')
+    @patch('pyautogui.moveTo')
     @patch('pyautogui.position', return_value=(200, 200))
+    def test_highlight_cursor_uses_overlay(self, mock_position, mock_move):
+        overlay = MagicMock()
+        self.controller.overlay = overlay
+        self.controller.highlight_cursor()
+        overlay.request.assert_called_once_with(200, 200)
+        mock_move.assert_not_called()
+        assert self.controller.highlight_stats() is overlay.stats.return_value
+
+    def test_highlight_stats_without_overlay(self):
+        assert self.controller.highlight_stats() is None
+
     @patch('tkinter.Canvas')
-    @patch('tkinter.Tk')
-    def test_highlight_cursor_linux_draws(self, mock_tk, mock_canvas, mock_position):
-        fake_root = MagicMock()
-        mock_tk.return_value = fake_root
-
-        fake_canvas = MagicMock()
-        mock_canvas.return_value = fake_canvas
-
-        class FakeThread:
-            def __init__(self, target=None, daemon=None):
-                self.target = target
-            def start(self):
-                if self.target:
-                    self.target()
-
-        with patch('threading.Thread', FakeThread):
-            self.controller.highlight_cursor()
-
-        mock_canvas.assert_called()
-        fake_canvas.create_oval.assert_called()
+    @patch('tkinter.Toplevel')
+    def test_attach_overlay_builds_window_once(self, mock_toplevel, mock_canvas):
+        root = MagicMock()
+        overlay = self.controller.attach_overlay(root)
+        assert self.controller.overlay is overlay
+        assert mock_toplevel.call_count == 2  # highlight ring + mouse grid, both built once
+        mock_toplevel.assert_called_with(root)
+        assert self.controller.grid.overlay is not None
+        mock_toplevel.return_value.withdraw.assert_called()
+        mock_canvas.return_value.create_oval.assert_called()
+        root.after.assert_not_called()  # nothing is scheduled until a highlight is requested
+
+
+class TestMotionEngine:
+    def setup_method(self):
+        self.engine = MotionEngine(frame_s=0.005)
+
+    def teardown_method(self):
+        self.engine.shutdown()
+
+    @patch('pyautogui.moveTo')
+    def test_tween_steps_to_target(self, mock_move):
+        future = self.engine.move_to(100, 0, duration=0.05, start=(0, 0))
+        assert future.result(timeout=2) == (100, 0)
+        xs = [c.args[0] for c in mock_move.call_args_list]
+        assert xs == sorted(xs) and xs[-1] == 100
+        assert len(xs) > 1  # stepped, not a single jump
+        assert all(c.kwargs == {"_pause": False} for c in mock_move.call_args_list)
+
+    @patch('pyautogui.moveTo')
+    def test_retarget_continues_from_current_point(self, mock_move):
+        first = self.engine.move_to(1000, 0, duration=10, start=(0, 0))
+        while not mock_move.called:
+            threading.Event().wait(0.001)
+        second = self.engine.move_to(0, 500, duration=0)
+        assert first.cancelled()
+        assert second.result(timeout=2) == (0, 500)
+
+    @patch('pyautogui.moveTo')
+    def test_failsafe_error_reported_on_future(self, mock_move):
+        mock_move.side_effect = RuntimeError("fail-safe")
+        future = self.engine.move_to(5, 5, start=(0, 0))
+        with pytest.raises(RuntimeError):
+            future.result(timeout=2)
+        assert not self.engine.is_moving()
+
+    @patch('pyautogui.moveTo')
+    def test_future_cancelled_by_caller_mid_frame(self, mock_move):
+        def cancel_then(error=None):
+            def move(*_, **__):
+                self.engine._motion.future.cancel()  # the caller's cancel lands before the future is settled
+                if error:
+                    raise error
+            return move
+
+        for error in (None, RuntimeError("fail-safe")):
+            mock_move.side_effect = cancel_then(error)
+            future = self.engine.move_to(5, 5, start=(0, 0))
+            deadline = time.monotonic() + 2
+            while self.engine.is_moving() and time.monotonic() < deadline:
+                threading.Event().wait(0.001)
+            assert future.cancelled()
+        mock_move.side_effect = None
+        assert self.engine.move_to(7, 7, start=(0, 0)).result(timeout=2) == (7, 7)  # thread still alive
+
+    @patch('pyautogui.moveTo')
+    def test_glide_accelerates_and_stops_at_edge(self, mock_move):
+        future = self.engine.glide((1, 0), speed=2000, acceleration=20000, bounds=(0, 0, 100, 100), start=(0, 50))
+        assert future.result(timeout=2) == (100, 50)
+        assert all(c.args[1] == 50 for c in mock_move.call_args_list)
+
+    def test_glide_ramps_speed(self):
+        glide = _Glide((0, 0), (1, 0), 1000, 2000, (0, 0, 10000, 100), Future())
+        t0 = glide._last
+        xs = [glide.advance(t0 + 0.1 * i)[0] for i in range(1, 8)]
+        steps = [b - a for a, b in zip([0] + xs, xs)]
+        assert steps[:5] == sorted(steps[:5]) and steps[0] < steps[4]  # accelerating
+        assert steps[5] == steps[6] == 100  # at target speed: 1000 px/s * 0.1 s
+        glide.target_speed = 0
+        x = glide.advance(t0 + 0.8)[0]
+        assert x - xs[-1] < 100  # decelerates rather than stopping dead
+
+    @patch('pyautogui.moveTo')
+    def test_glide_speed_changes_in_flight(self, mock_move):
+        assert not self.engine.set_glide_speed(10)
+        future = self.engine.glide((0, 1), speed=100, acceleration=1000, bounds=(0, 0, 100, 10000), start=(0, 0))
+        assert self.engine.glide_speed() == 100
+        assert self.engine.set_glide_speed(300)
+        assert self.engine.glide_speed() == 300
+        self.engine.cancel()
+        assert future.cancelled()
+        assert self.engine.glide_speed() is None
+
+    def test_rejects_moves_after_shutdown(self):
+        self.engine.shutdown()
+        with pytest.raises(RuntimeError):
+            self.engine.move_to(1, 1, start=(0, 0))
+
+
+class TestMouseGrid:
+    def setup_method(self):
+        self.controller = MouseController(Config())
+        self.grid = self.controller.grid
+        self.grid.overlay = MagicMock()
+
+    def teardown_method(self):
+        self.controller.motion.shutdown()
+
+    def test_cells_numbered_row_by_row(self):
+        cells = grid_cells((0, 0, 900, 600))
+        assert cells[0] == (0, 0, 300, 200)
+        assert cells[4] == (300, 200, 300, 200)
+        assert cells[8] == (600, 400, 300, 200)
+        assert grid_cells((0, 0, 900, 600)) is cells  # geometry cached per region
+
+    @patch('pyautogui.moveTo')
+    @patch('pyautogui.position', return_value=(2500, 100))
+    def test_zooms_to_a_pixel_in_a_few_steps(self, mock_position, mock_move):
+        monitors = [(0, 0, 1920, 1080), (1920, 0, 2560, 1440)]
+        with patch.object(ScreenGeometry, '_query', return_value=monitors):
+            assert self.grid.start() == (1920, 0, 2560, 1440)  # the monitor under the cursor
+            self.grid.overlay.request.assert_called_with((1920, 0, 2560, 1440))
+            for n in (9, 1, 5, 5):
+                cell = self.grid.select(n)
+        assert self.grid.depth == 5
+        assert cell[2] <= 40 and cell[3] <= 20
+        self.controller.motion.move_to(0, 0, start=(0, 0)).result(timeout=2)  # drain the engine
+        x, y = cell[0] + cell[2] // 2, cell[1] + cell[3] // 2
+        assert self.controller._current_position() == (x, y)
+
+        assert self.grid.back() == self.grid.region
+        assert self.grid.depth == 4
+
+    @patch('pyautogui.click')
+    @patch('pyautogui.position', return_value=(10, 10))
+    def test_click_closes_grid_first(self, mock_position, mock_click):
+        self.grid.start()
+        self.controller.click()
+        assert not self.grid.active
+        self.grid.overlay.request.assert_called_with(None)
+        self.grid.overlay.wait_hidden.assert_called_once()
+        mock_click.assert_called_once()
+
+    def test_select_requires_active_grid(self, caplog):
+        assert self.grid.select(5) is None
+        assert "not active" in caplog.text
+        with patch('pyautogui.position', return_value=(0, 0)):
+            self.grid.start()
+        assert self.grid.select(0) is None
+        self.grid.close()
+        self.grid.close()  # already closed: no-op
+        assert self.grid.cells() == ()
+
+
+class TestGridOverlay:
+    def setup_method(self):
+        self.root = MagicMock()
+        with patch('tkinter.Toplevel') as mock_toplevel, patch('tkinter.Canvas') as mock_canvas:
+            self.window = mock_toplevel.return_value
+            self.canvas = mock_canvas.return_value
+            self.overlay = GridOverlay(self.root, Config())
+
+    def test_items_created_once_and_moved(self):
+        created = self.canvas.create_line.call_count + self.canvas.create_text.call_count
+        assert created == 8 + 9
+        self.overlay.request((0, 0, 900, 600))
+        self.overlay.request((300, 200, 300, 200))  # only the newest region is drawn
+        self.overlay.process_requests()
+        self.window.geometry.assert_called_once_with("300x200+300+200")
+        assert self.canvas.create_line.call_count + self.canvas.create_text.call_count == created
+        self.window.deiconify.assert_called_once()
+
+    def test_hide_releases_waiters(self):
+        self.overlay.request((0, 0, 90, 90))
+        self.overlay.process_requests()
+        assert not self.overlay.wait_hidden(timeout=0)
+        self.overlay.request(None)
+        self.overlay.process_requests()
+        self.window.withdraw.assert_called()
+        assert self.overlay.wait_hidden(timeout=0)
+        self.overlay.process_requests()  # nothing pending
+
+
+class TestScreenGeometry:
+    @patch('pyautogui.size', return_value=(1920, 1080))
+    def test_fallback_to_primary_and_ttl(self, mock_size):
+        screen = ScreenGeometry(ttl=60)
+        with patch.object(ScreenGeometry, '_query', return_value=None):
+            assert screen.bounds == (0, 0, 1920, 1080)
+            assert screen.monitors == [(0, 0, 1920, 1080)]
+            assert screen.queries == 1
+            screen.ttl = 0
+            with patch('mouse_controller.time.monotonic', return_value=1e9):
+                screen.bounds
+        assert screen.queries == 2
+
+    def test_clamp_and_contains(self):
+        screen = ScreenGeometry()
+        with patch.object(ScreenGeometry, '_query', return_value=[(0, 0, 100, 100), (100, -50, 100, 100)]):
+            assert screen.bounds == (0, -50, 200, 100)
+            assert screen.clamp(250, -80) == (200, -50)
+            assert screen.contains(150, -10)
+            assert not screen.contains(-1, 0)
+
+    @patch('pyautogui.position', return_value=(2500, 10))
+    @patch('pyautogui.size', return_value=(1920, 1080))
+    def test_cursor_off_desktop_invalidates(self, mock_size, mock_position):
+        controller = MouseController(Config())
+        controller.screen.bounds
+        controller.get_position()
+        controller.screen.bounds
+        assert controller.screen.queries == 2
+
+    def test_macos_query(self):
+        def rect(x, y, w, h):
+            return types.SimpleNamespace(
+                origin=types.SimpleNamespace(x=x, y=y), size=types.SimpleNamespace(width=w, height=h)
+            )
+        quartz = types.SimpleNamespace(
+            CGGetActiveDisplayList=MagicMock(return_value=(0, (1, 2), 2)),
+            CGDisplayBounds=MagicMock(side_effect=[rect(0, 0, 1440, 900), rect(1440, 0, 2560, 1440)]),
+        )
+        with patch('sys.platform', 'darwin'), patch.dict(sys.modules, {"Quartz": quartz}):
+            assert ScreenGeometry()._query() == [(0, 0, 1440, 900), (1440, 0, 2560, 1440)]
+
+    def test_query_errors_fall_back(self):
+        with patch('sys.platform', 'darwin'), patch.dict(sys.modules, {"Quartz": None}):
+            assert ScreenGeometry()._query() is None
+
+
+class TestHighlightOverlay:
+    def setup_method(self):
+        self.config = Config()
+        self.root = MagicMock()
+        with patch('tkinter.Toplevel') as mock_toplevel, patch('tkinter.Canvas'):
+            self.window = mock_toplevel.return_value
+            self.overlay = HighlightOverlay(self.root, self.config)
+
+    def test_request_queues_and_wakes_gui_thread(self):
+        self.overlay.request(10, 20)
+        self.window.deiconify.assert_not_called()
+        self.root.after.assert_called_once_with(0, self.overlay.process_requests)
+
+    def test_request_without_running_gui(self):
+        self.root.after.side_effect = RuntimeError("main thread is not in main loop")
+        self.overlay.request(10, 20)
+        self.root.after.side_effect = None
+        self.overlay.process_requests()
+        self.window.deiconify.assert_called_once()
+
+    def test_drain_moves_and_reveals_existing_window(self):
+        self.overlay.request(10, 20)
+        self.overlay.request(300, 400)  # only the newest request is shown
+        self.overlay.process_requests()
+
+        radius = self.config.highlight_size // 2
+        self.window.geometry.assert_called_with(f"+{300 - radius}+{400 - radius}")
+        self.window.deiconify.assert_called_once()
+        self.window.after.assert_called_once_with(self.config.highlight_duration_ms, self.overlay._hide)
+
+        stats = self.overlay.stats()
+        assert stats["count"] == 1
+        assert stats["last_ms"] >= 0
+        assert stats["avg_ms"] == stats["last_ms"] == stats["max_ms"]
+
+    def test_repeat_request_restarts_hide_timer(self):
+        self.overlay.request(1, 1)
+        self.overlay.process_requests()
+        self.overlay.request(2, 2)
+        self.overlay.process_requests()
+        self.window.after_cancel.assert_called_once()
+        self.overlay._hide()
+        self.window.withdraw.assert_called()
+        assert self.overlay._hide_job is None
+
+    def test_empty_drain_does_nothing(self):
+        self.overlay.process_requests()
+        self.window.deiconify.assert_not_called()
+        assert self.overlay.stats()["last_ms"] is None
+
+    def test_without_transparency_support(self):
+        with patch('tkinter.Toplevel') as mock_toplevel, patch('tkinter.Canvas') as mock_canvas:
+            mock_toplevel.return_value.attributes.side_effect = [None, Exception("unsupported")]
+            HighlightOverlay(self.root, self.config)
+        assert mock_canvas.return_value.create_oval.call_count == 2
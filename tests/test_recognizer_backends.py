@@ -0,0 +1,312 @@
+"""
+Tests for recognizer_backends.py
+"""
+
+import json
+import sys
+import types
+import pytest
+from unittest.mock import MagicMock, patch
+import speech_recognition as sr
+from recognizer_backends import (
+    BackendChain,
+    BackendUnavailable,
+    GoogleBackend,
+    ReplayBackend,
+    RecognizerBackend,
+    SphinxBackend,
+    VoskBackend,
+    create_backend,
+)
+from config import Config
+from command_parser import CommandParser
+
+
+def make_audio():
+    audio = MagicMock()
+    audio.get_raw_data.return_value = b"\x00\x00" * 160
+    return audio
+
+
+class TestBackends:
+    def setup_method(self):
+        self.config = Config()
+        self.config.cloud_client = False  # "google" goes through the mocked recognize_google
+
+    def test_base_backend(self):
+        backend = RecognizerBackend(self.config)
+        backend.load()
+        assert backend.loaded
+        with pytest.raises(NotImplementedError):
+            backend.recognize(make_audio())
+        backend.close()
+        assert not backend.loaded
+
+    def test_google_delegates_to_recognizer(self):
+        recognizer = MagicMock()
+        recognizer.recognize_google.return_value = "click"
+        backend = GoogleBackend(self.config, recognizer)
+        audio = make_audio()
+        assert backend.recognize(audio) == "click"
+        recognizer.recognize_google.assert_called_once_with(audio)
+
+    def test_google_alternatives_from_full_response(self):
+        recognizer = MagicMock()
+        recognizer.recognize_google.return_value = {
+            "alternative": [{"transcript": "scroll dawn", "confidence": 0.8}, {"transcript": "scroll down"}, {}],
+            "final": True,
+        }
+        backend = GoogleBackend(self.config, recognizer)
+        audio = make_audio()
+        assert backend.recognize_alternatives(audio, 5) == ["scroll dawn", "scroll down"]
+        assert backend.recognize_alternatives(audio, 1) == ["scroll dawn"]
+        recognizer.recognize_google.assert_called_with(audio, show_all=True)
+
+    def test_google_alternatives_empty_response(self):
+        recognizer = MagicMock()
+        recognizer.recognize_google.return_value = []  # what the API returns for silence
+        with pytest.raises(sr.UnknownValueError):
+            GoogleBackend(self.config, recognizer).recognize_alternatives(make_audio(), 5)
+
+    def test_base_backend_alternatives_wrap_recognize(self):
+        self.config.replay_transcripts = ["click"]
+        backend = RecognizerBackend(self.config)
+        backend.recognize = MagicMock(return_value="click")
+        assert backend.recognize_alternatives(make_audio(), 5) == ["click"]
+
+    def test_replay_alternatives(self):
+        self.config.replay_transcripts = [["scroll dawn", "scroll down", "scroll town"], "click"]
+        backend = ReplayBackend(self.config)
+        backend.load()
+        assert backend.recognize_alternatives(None, 2) == ["scroll dawn", "scroll down"]
+        assert backend.recognize_alternatives(None, 2) == ["click"]
+        assert backend.recognize(None) == "scroll dawn"
+
+    def test_replay_cycles_transcripts(self):
+        self.config.replay_transcripts = ["click", "scroll down"]
+        backend = ReplayBackend(self.config)
+        backend.load()
+        assert [backend.recognize(None) for _ in range(3)] == ["click", "scroll down", "click"]
+
+    def test_replay_exhausted_without_loop(self):
+        self.config.replay_transcripts = ["click"]
+        self.config.replay_loop = False
+        backend = ReplayBackend(self.config)
+        backend.load()
+        assert backend.recognize(None) == "click"
+        with pytest.raises(sr.UnknownValueError):
+            backend.recognize(None)
+
+    def test_create_backend_unknown(self):
+        assert isinstance(create_backend("replay", self.config), ReplayBackend)
+        with pytest.raises(ValueError):
+            create_backend("nope", self.config)
+
+    def test_vosk_unavailable_without_package(self):
+        with patch.dict(sys.modules, {"vosk": None}):
+            with pytest.raises(BackendUnavailable):
+                VoskBackend(self.config).load()
+
+    def test_vosk_loads_model_once(self):
+        fake_vosk = types.SimpleNamespace(
+            SetLogLevel=MagicMock(),
+            Model=MagicMock(return_value="model"),
+            KaldiRecognizer=MagicMock(),
+        )
+        fake_vosk.KaldiRecognizer.return_value.FinalResult.return_value = json.dumps({"text": "click"})
+        self.config.vosk_model_path = "/models/vosk"
+
+        with patch.dict(sys.modules, {"vosk": fake_vosk}):
+            backend = VoskBackend(self.config)
+            backend.load()
+            assert backend.recognize(make_audio()) == "click"
+            assert backend.recognize(make_audio()) == "click"
+
+        fake_vosk.Model.assert_called_once_with("/models/vosk")
+        assert fake_vosk.KaldiRecognizer.call_count == 2
+
+    def test_vosk_requires_model_path_and_text(self):
+        fake_vosk = types.SimpleNamespace(SetLogLevel=MagicMock(), Model=MagicMock(), KaldiRecognizer=MagicMock())
+        fake_vosk.KaldiRecognizer.return_value.FinalResult.return_value = json.dumps({"text": ""})
+        with patch.dict(sys.modules, {"vosk": fake_vosk}):
+            with pytest.raises(BackendUnavailable):
+                VoskBackend(self.config).load()
+            self.config.vosk_model_path = "/models/vosk"
+            backend = VoskBackend(self.config)
+            backend.load()
+            with pytest.raises(sr.UnknownValueError):
+                backend.recognize(make_audio())
+            fake_vosk.Model.side_effect = RuntimeError("corrupt")
+            with pytest.raises(BackendUnavailable):
+                VoskBackend(self.config).load()
+
+    def test_sphinx_keeps_one_decoder(self):
+        decoder = MagicMock()
+        decoder.hyp.return_value = types.SimpleNamespace(hypstr="scroll up")
+        fake_ps = types.SimpleNamespace(Decoder=MagicMock(return_value=decoder))
+        with patch.dict(sys.modules, {"pocketsphinx": fake_ps}):
+            backend = SphinxBackend(self.config)
+            backend.load()
+            assert backend.recognize(make_audio()) == "scroll up"
+            decoder.hyp.return_value = None
+            with pytest.raises(sr.UnknownValueError):
+                backend.recognize(make_audio())
+        fake_ps.Decoder.assert_called_once()
+
+    def test_vosk_decodes_against_grammar(self):
+        fake_vosk = types.SimpleNamespace(SetLogLevel=MagicMock(), Model=MagicMock(), KaldiRecognizer=MagicMock())
+        results = iter([{"text": "type [unk]"}, {"text": "type hello world"}, {"text": "scroll down"}])
+        fake_vosk.KaldiRecognizer.return_value.FinalResult.side_effect = lambda: json.dumps(next(results))
+        self.config.vosk_model_path = "/models/vosk"
+        parser = CommandParser(self.config)
+
+        with patch.dict(sys.modules, {"vosk": fake_vosk}):
+            backend = VoskBackend(self.config)
+            backend.load()
+            backend.set_grammar_provider(parser.grammar)
+            assert backend.recognize(make_audio()) == "type hello world"
+            assert backend.recognize(make_audio()) == "scroll down"
+
+        calls = fake_vosk.KaldiRecognizer.call_args_list
+        assert len(calls[0].args) == 3  # constrained pass
+        assert len(calls[1].args) == 2  # open-vocabulary re-decode for the payload
+        assert calls[2].args[2] == parser.grammar().to_vosk()
+
+    def test_vosk_stream_partials_and_final(self):
+        fake_vosk = types.SimpleNamespace(SetLogLevel=MagicMock(), Model=MagicMock(), KaldiRecognizer=MagicMock())
+        rec = fake_vosk.KaldiRecognizer.return_value
+        rec.AcceptWaveform.side_effect = [False, True, False]
+        rec.PartialResult.side_effect = [json.dumps({"partial": "scroll"}), json.dumps({"partial": "click"})]
+        rec.Result.return_value = json.dumps({"text": "scroll down"})
+        rec.FinalResult.return_value = json.dumps({"text": "click"})
+        self.config.vosk_model_path = "/models/vosk"
+
+        with patch.dict(sys.modules, {"vosk": fake_vosk}):
+            backend = VoskBackend(self.config)
+            backend.load()
+            backend.set_grammar_provider(CommandParser(self.config).grammar)
+            assert backend.supports_streaming
+            session = backend.start_stream(44100)
+            assert [session.feed(b"\x00\x00" * 10) for _ in range(3)] == ["scroll", "scroll down", "scroll down click"]
+            assert session.finish() == "scroll down click"
+
+        assert fake_vosk.KaldiRecognizer.call_args.args[1] == 44100  # fed at the mic's rate
+
+    def test_replay_stream_reveals_words(self):
+        self.config.replay_transcripts = ["scroll down", ""]
+        backend = ReplayBackend(self.config)
+        backend.load()
+        session = backend.start_stream(16000)
+        assert [session.feed(b"") for _ in range(3)] == ["scroll", "scroll down", "scroll down"]
+        assert session.finish() == "scroll down"
+        with pytest.raises(sr.UnknownValueError):
+            backend.start_stream(16000).finish()
+
+    def test_google_does_not_stream(self):
+        backend = GoogleBackend(self.config, MagicMock())
+        assert not backend.supports_streaming
+        with pytest.raises(NotImplementedError):
+            backend.start_stream(16000)
+
+    def test_grammar_ignored_when_disabled(self):
+        self.config.grammar_constrained = False
+        backend = RecognizerBackend(self.config)
+        backend.set_grammar_provider(MagicMock())
+        assert backend._current_grammar() is None
+
+    def test_sphinx_switches_searches(self):
+        decoder = MagicMock()
+        decoder.current_search.return_value = "_default"
+        hyps = iter(["dictate [unk]", "dictate notes", "click", "click"])
+        decoder.hyp.side_effect = lambda: types.SimpleNamespace(hypstr=next(hyps))
+        fake_ps = types.SimpleNamespace(Decoder=MagicMock(return_value=decoder))
+        parser = CommandParser(self.config)
+        with patch.dict(sys.modules, {"pocketsphinx": fake_ps}):
+            backend = SphinxBackend(self.config)
+            backend.load()
+            backend.set_grammar_provider(parser.grammar)
+            assert backend.recognize(make_audio()) == "dictate notes"
+            assert backend.recognize(make_audio()) == "click"
+        searches = [c.args[0] for c in decoder.activate_search.call_args_list]
+        assert searches == ["commands", "_default", "commands"]
+        decoder.add_jsgf_string.assert_called_once()  # grammar compiled once, reused
+
+        backend.set_grammar_provider(None)
+        assert backend.recognize(make_audio()) == "click"
+        assert decoder.activate_search.call_args.args[0] == "_default"
+
+    def test_sphinx_unavailable(self):
+        with patch.dict(sys.modules, {"pocketsphinx": None}):
+            with pytest.raises(BackendUnavailable):
+                SphinxBackend(self.config).load()
+        fake_ps = types.SimpleNamespace(Decoder=MagicMock(side_effect=RuntimeError("no model")))
+        with patch.dict(sys.modules, {"pocketsphinx": fake_ps}):
+            with pytest.raises(BackendUnavailable):
+                SphinxBackend(self.config).load()
+
+
+class TestBackendChain:
+    def setup_method(self):
+        self.config = Config()
+        self.config.cloud_client = False  # "google" goes through the mocked recognize_google
+
+    def test_grammar_provider_forwarded(self):
+        chain = BackendChain.from_config(self.config, MagicMock())
+        provider = MagicMock()
+        chain.set_grammar_provider(provider)
+        assert all(b.grammar_provider is provider for b in chain.backends)
+
+    def test_from_config_order(self):
+        self.config.recognizer_backend = "replay"
+        self.config.recognizer_fallbacks = ["google", "replay", "vosk"]
+        chain = BackendChain.from_config(self.config, MagicMock())
+        assert chain.names == ["replay", "google", "vosk"]
+
+    def test_unavailable_backends_dropped_on_load(self, caplog):
+        self.config.recognizer_backend = "vosk"
+        self.config.recognizer_fallbacks = ["replay"]
+        with patch.dict(sys.modules, {"vosk": None}):
+            chain = BackendChain.from_config(self.config).load()
+        assert chain.names == ["replay"]
+        assert "unavailable" in caplog.text
+
+    def test_streaming_backend(self):
+        self.config.recognizer_backend = "google"
+        self.config.recognizer_fallbacks = ["replay"]
+        chain = BackendChain.from_config(self.config, MagicMock()).load()
+        assert chain.streaming_backend().name == "replay"
+        self.config.recognizer_fallbacks = []
+        assert BackendChain.from_config(self.config, MagicMock()).load().streaming_backend() is None
+
+    def test_falls_back_on_request_error(self):
+        recognizer = MagicMock()
+        recognizer.recognize_google.side_effect = sr.RequestError("offline")
+        self.config.recognizer_fallbacks = ["replay"]
+        self.config.replay_transcripts = ["click"]
+        chain = BackendChain.from_config(self.config, recognizer).load()
+        assert chain.recognize(make_audio()) == "click"
+        assert chain.last_backend == "replay"
+
+    def test_alternatives_fall_back_on_request_error(self):
+        recognizer = MagicMock()
+        recognizer.recognize_google.side_effect = sr.RequestError("offline")
+        self.config.recognizer_fallbacks = ["replay"]
+        self.config.replay_transcripts = [["clique", "click"]]
+        chain = BackendChain.from_config(self.config, recognizer).load()
+        assert chain.recognize_alternatives(make_audio(), 5) == ["clique", "click"]
+        assert chain.last_backend == "replay"
+
+    def test_unknown_value_not_retried(self):
+        recognizer = MagicMock()
+        recognizer.recognize_google.side_effect = sr.UnknownValueError()
+        self.config.recognizer_fallbacks = ["replay"]
+        self.config.replay_transcripts = ["click"]
+        chain = BackendChain.from_config(self.config, recognizer).load()
+        with pytest.raises(sr.UnknownValueError):
+            chain.recognize(make_audio())
+
+    def test_all_backends_failed(self):
+        chain = BackendChain([])
+        with pytest.raises(sr.RequestError):
+            chain.recognize(make_audio())
+        chain.close()
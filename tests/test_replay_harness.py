@@ -0,0 +1,78 @@
+"""
+Tests for replay_harness.py
+"""
+
+import wave
+from replay_harness import ActionLog, RecordingMouse, ReplayHarness
+from config import Config
+
+
+class TestRecordingControllers:
+    def setup_method(self):
+        self.log = ActionLog()
+        self.mouse = RecordingMouse(self.log)
+
+    def test_calls_are_logged_with_timestamps(self):
+        self.mouse.click("left")
+        self.mouse.grid.select(5)
+        assert self.log.calls() == ["mouse.click('left')", "mouse.grid.select(5)"]
+        times = [entry[0] for entry in self.log.entries()]
+        assert times == sorted(times) and times[0] >= 0
+
+    def test_queries_answer_without_logging(self):
+        assert self.mouse.is_moving() is False
+        assert len(self.log) == 0
+
+    def test_reset_clears_log(self):
+        self.mouse.scroll("down")
+        self.log.reset()
+        assert self.log.entries() == []
+
+
+class TestReplayHarness:
+    def setup_method(self):
+        self.config = Config()
+        self.config.plan_step_pause = 0
+
+    def test_transcripts_run_through_pipeline(self, tmp_path):
+        self.config.macro_path = str(tmp_path / "macros.jsonl")
+        harness = ReplayHarness(self.config)
+        report = harness.run_transcripts(["move up", "click", "open gmail", "type hello", "blah blah"])
+
+        assert harness.log.calls() == [
+            "mouse.move_cursor('up', 50)",
+            "mouse.click('left')",
+            "window.open('gmail')",
+            "keyboard.type_text('hello')",
+        ]
+        assert report["phrases"] == 5 and report["executed"] == 5
+        assert report["actions"] == 4
+        assert report["latency"]["response"]["count"] == 5
+        assert report["commands_per_s"] > 0
+
+    def test_macro_replay(self, tmp_path):
+        self.config.macro_path = str(tmp_path / "macros.jsonl")
+        harness = ReplayHarness(self.config)
+        harness.run_transcripts(["start recording", "scroll down", "click", "save as two", "run two", "run two"])
+        assert harness.log.calls()[-4:] == ["mouse.scroll('down')", "mouse.click('left')"] * 2
+
+    def test_harness_config_is_not_modified(self, tmp_path):
+        self.config.macro_path = str(tmp_path / "macros.jsonl")
+        ReplayHarness(self.config).run_transcripts(["click"])
+        assert self.config.recognizer_backend == "google"
+        assert self.config.vad_enabled is True
+
+    def test_wav_files_with_transcripts(self, tmp_path):
+        self.config.macro_path = str(tmp_path / "macros.jsonl")
+        self.config.vad_enabled = False
+        path = str(tmp_path / "phrase.wav")
+        with wave.open(path, "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(16000)
+            f.writeframes(b"\0\0" * 1600)
+
+        harness = ReplayHarness(self.config)
+        report = harness.run_wav([path, path], transcripts=["scroll up", "right click"])
+        assert harness.log.calls() == ["mouse.scroll('up')", "mouse.click('right')"]
+        assert report["executed"] == 2
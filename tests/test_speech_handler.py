@@ -2,18 +2,26 @@
 Tests for speech_handler.py
 """
 
+import logging
 import pytest
 from unittest.mock import MagicMock, patch
 import speech_recognition as sr
-from speech_handler import SpeechHandler
+from speech_handler import SpeechHandler, StageQueue, StageClosed, EndOfInput, _StreamJob
 from config import Config
 
 
 class TestSpeechHandler:
     def setup_method(self):
            self.config = Config()
+           self.config.vad_enabled = False  # most tests feed placeholder strings as audio
+           self.config.noise_calibration_s = 0  # no background thread reading the mocked mic
+           self.config.nbest_alternatives = 1  # recognize_google is mocked in its single-transcript form
+           self.config.capture_ring_s = 0  # phrases come from a mocked recognizer.listen()
+           self.config.cloud_client = False  # "google" goes through the mocked recognize_google
            self.mock_parser = MagicMock()
            self.mock_mouse = MagicMock()
+           self.mock_mouse.is_moving.return_value = False
+           self.mock_parser.cancel_plan.return_value = False
            with patch('speech_recognition.Microphone'), \
                patch.object(sr.Recognizer, 'adjust_for_ambient_noise'):
               self.handler = SpeechHandler(self.config, self.mock_parser, self.mock_mouse)
@@ -25,16 +33,25 @@ class TestSpeechHandler:
         assert self.handler.listening == False
         assert self.handler.stop_callback is None
 
+    @patch('speech_recognition.Microphone')
+    def test_audio_initialized_off_the_startup_path(self, mock_mic):
+        self.config.recognizer_backend = "replay"
+        handler = SpeechHandler(self.config, self.mock_parser, self.mock_mouse)
+        assert handler.calibrated.wait(2)
+        assert "backend" in vars(handler)  # loaded by the warm-up thread
+        assert "microphone" not in vars(handler)  # only opened when listening (or calibrating) starts
+        mock_mic.assert_not_called()
+        assert handler.backend.backends[0].name == "replay"
+
     def test_set_stop_callback(self):
         mock_callback = MagicMock()
         self.handler.set_stop_callback(mock_callback)
         assert self.handler.stop_callback == mock_callback
 
-    def test_start_listening_already_listening(self, capsys):
+    def test_start_listening_already_listening(self, caplog):
         self.handler.listening = True
         self.handler.start_listening()
-        captured = capsys.readouterr()
-        assert "Already listening" in captured.out
+        assert "Already listening" in caplog.text
 
     def test_stop_listening(self):
         self.handler.listening = True
@@ -92,3 +109,390 @@ class TestSpeechHandler:
         handler.start_listening()
 
         assert handler.recognizer.listen.call_count >= 4
+
+    @patch('speech_recognition.Microphone')
+    @patch.object(sr.Recognizer, 'adjust_for_ambient_noise')
+    def test_commands_execute_in_utterance_order(self, mock_adjust, mock_mic):
+        import time
+        self.config.capture_overflow_policy = "block"
+        handler = SpeechHandler(self.config, self.mock_parser, self.mock_mouse)
+        handler.stop_callback = MagicMock()
+
+        phrases = iter(["slow", "fast", "medium"])
+        handler.recognizer.listen = MagicMock(side_effect=lambda *a, **k: next(phrases, "stop"))
+        delays = {"slow": 0.2, "fast": 0.0, "medium": 0.05, "stop": 0.0}
+
+        def recognize(audio):
+            time.sleep(delays[audio])
+            return audio.upper()
+
+        handler.recognizer.recognize_google = MagicMock(side_effect=recognize)
+
+        handler.start_listening()
+
+        executed = [c.args[0] for c in self.mock_parser.parse_command.call_args_list]
+        assert executed == ["slow", "fast", "medium"]
+        handler.stop_callback.assert_called_once()
+
+    @patch('speech_recognition.Microphone')
+    @patch.object(sr.Recognizer, 'adjust_for_ambient_noise')
+    def test_end_of_input_drains_queued_phrases(self, mock_adjust, mock_mic):
+        import time
+        self.config.capture_overflow_policy = "block"
+        handler = SpeechHandler(self.config, self.mock_parser, self.mock_mouse)
+        phrases = iter(["slow", "fast"])
+
+        def listen(*a, **k):
+            try:
+                return next(phrases)
+            except StopIteration:
+                raise EndOfInput()
+
+        def recognize(audio):
+            time.sleep(0.1 if audio == "slow" else 0.0)
+            return audio
+
+        handler.recognizer.listen = MagicMock(side_effect=listen)
+        handler.recognizer.recognize_google = MagicMock(side_effect=recognize)
+
+        handler.start_listening()
+
+        executed = [c.args[0] for c in self.mock_parser.parse_command.call_args_list]
+        assert executed == ["slow", "fast"]  # still in flight when the input ran out
+        assert handler.listening is False
+
+    @patch('speech_recognition.Microphone')
+    @patch.object(sr.Recognizer, 'adjust_for_ambient_noise')
+    def test_pipeline_stats_reported(self, mock_adjust, mock_mic):
+        handler = SpeechHandler(self.config, self.mock_parser, self.mock_mouse)
+        handler.recognizer.listen = MagicMock(return_value="audio")
+        handler.recognizer.recognize_google = MagicMock(return_value="stop")
+
+        handler.start_listening()
+
+        stats = handler.pipeline_stats()
+        assert stats["capture"]["enqueued"] >= 1
+        assert stats["capture"]["depth"] == 0
+        assert stats["execute"]["enqueued"] >= 1
+        assert stats["recognizing"] == 0
+        assert stats["reorder"] == 0
+
+    def test_parse_errors_do_not_stop_executor(self, caplog):
+        self.mock_parser.parse_command.side_effect = Exception("bad")
+        self.handler.listening = True
+        self.handler._execute("click")
+        assert "Error executing command: bad" in caplog.text
+
+    def test_stop_cancels_running_plan(self):
+        from speech_handler import StageQueue
+        captured, results = StageQueue("capture"), StageQueue("execute")
+        self.handler.listening = True
+        self.handler.backend = MagicMock()
+        self.handler.backend.recognize.return_value = "Stop"
+        self.mock_parser.cancel_plan.return_value = True
+        captured.put((0, "audio"))
+        captured.close()
+        self.handler._recognize_worker(captured, results)
+        assert results.get(timeout=1) == (0, None)  # consumed by the cancel, not executed
+
+    def test_stop_halts_motion_before_quitting(self):
+        self.handler.stop_callback = MagicMock()
+        self.handler.listening = True
+        self.mock_mouse.is_moving.return_value = True
+        self.handler._execute("stop")
+        self.mock_mouse.stop_motion.assert_called_once()
+        assert self.handler.listening is True
+        self.handler.stop_callback.assert_not_called()
+
+        self.mock_mouse.is_moving.return_value = False
+        self.handler._execute("stop")
+        self.handler.stop_callback.assert_called_once()
+
+    @patch('speech_recognition.Microphone')
+    @patch.object(sr.Recognizer, 'adjust_for_ambient_noise')
+    def test_replay_backend_drives_pipeline(self, mock_adjust, mock_mic):
+        self.config.recognizer_backend = "replay"
+        self.config.replay_transcripts = ["click", "scroll down", "stop"]
+        self.config.capture_overflow_policy = "block"
+        handler = SpeechHandler(self.config, self.mock_parser, self.mock_mouse)
+        handler.recognizer.listen = MagicMock(return_value="audio")
+
+        handler.start_listening()
+
+        executed = [c.args[0] for c in self.mock_parser.parse_command.call_args_list]
+        assert executed == ["click", "scroll down"]
+
+
+    @patch('speech_recognition.Microphone')
+    @patch.object(sr.Recognizer, 'adjust_for_ambient_noise')
+    def test_nbest_alternatives_rescored(self, mock_adjust, mock_mic, caplog):
+        from command_parser import CommandParser
+        self.config.recognizer_backend = "replay"
+        self.config.replay_transcripts = [["scroll dawn", "scroll down"], ["Click", "clique"], "stop"]
+        self.config.capture_overflow_policy = "block"
+        self.config.replay_loop = False
+        self.config.nbest_alternatives = 5
+        parser = CommandParser(self.config)
+        parser.parse_command = MagicMock(return_value=None)
+        handler = SpeechHandler(self.config, parser, self.mock_mouse)
+        handler.recognizer.listen = MagicMock(return_value="audio")
+
+        with caplog.at_level(logging.INFO, logger="click_to_talk.speech_handler"):
+            handler.start_listening()
+
+        assert [c.args[0] for c in parser.parse_command.call_args_list] == ["scroll down", "click"]
+        assert "Chose alternative 2 'scroll down' over 'scroll dawn'" in caplog.text
+        stats = handler.pipeline_stats()["nbest"]
+        assert stats["phrases"] >= 3 and stats["reranked"] == 1
+        assert "rescore" in handler.latency.summary()
+
+    @patch('speech_recognition.Microphone')
+    @patch.object(sr.Recognizer, 'adjust_for_ambient_noise')
+    def test_latency_spans_recorded_per_command(self, mock_adjust, mock_mic):
+        from action_plan import Action, ActionPlan
+        self.config.recognizer_backend = "replay"
+        self.config.replay_transcripts = ["click", "bogus", "stop"]
+        self.config.capture_overflow_policy = "block"
+        handler = SpeechHandler(self.config, self.mock_parser, self.mock_mouse)
+        handler.recognizer.listen = MagicMock(return_value="audio")
+        plan = ActionPlan([Action("mouse", "click", ("left",))])
+        plan.run({"mouse": MagicMock()})
+        self.mock_parser.parse_command.side_effect = lambda text: plan if text == "click" else None
+
+        handler.start_listening()
+
+        traces = handler.latency.recent()
+        assert [t["text"] for t in traces] == ["click", "bogus", "stop"]
+        assert [name for name, _ in traces[0]["spans"]] == ["listen", "recognize", "parse", "mouse.click"]
+        assert [name for name, _ in traces[1]["spans"]] == ["listen", "recognize", "parse"]
+        assert all(t["response_ms"] >= 0 for t in traces)
+        assert handler.pipeline_stats()["latency"]["listen"]["count"] == 3
+
+    @patch('speech_recognition.Microphone')
+    @patch.object(sr.Recognizer, 'adjust_for_ambient_noise')
+    def test_vad_drops_noise_before_recognition(self, mock_adjust, mock_mic, caplog):
+        import numpy as np
+        caplog.set_level(logging.DEBUG, logger="click_to_talk")  # "Skipped non-speech audio" is DEBUG
+        self.config.vad_enabled = True
+        self.config.capture_overflow_policy = "block"
+        handler = SpeechHandler(self.config, self.mock_parser, self.mock_mouse)
+        handler.stop_callback = MagicMock()
+
+        rng = np.random.default_rng(1)
+        t = np.arange(16000) / 16000
+        voiced = sum(np.sin(2 * np.pi * 140 * k * t) / k for k in range(1, 10)) * 3000 * np.sin(np.pi * t)
+        quiet = rng.normal(0, 30, 8000)
+        speech = sr.AudioData(np.concatenate([quiet, voiced, quiet]).astype(np.int16).tobytes(), 16000, 2)
+        noise = sr.AudioData(rng.normal(0, 800, 32000).astype(np.int16).tobytes(), 16000, 2)
+
+        phrases = iter([noise, speech, noise])
+        handler.recognizer.listen = MagicMock(side_effect=lambda *a, **k: next(phrases, speech))
+        heard = []
+        def recognize(audio):
+            heard.append(len(audio.frame_data))
+            return "click" if len(heard) == 1 else "stop"
+        handler.recognizer.recognize_google = MagicMock(side_effect=recognize)
+
+        handler.start_listening()
+
+        assert heard[0] < len(speech.frame_data)  # leading/trailing silence trimmed
+        self.mock_parser.parse_command.assert_called_once_with("click")
+        vad = handler.pipeline_stats()["vad"]
+        assert vad["dropped"] == 2
+        assert vad["bytes_saved"] >= 2 * len(noise.frame_data)
+        out = caplog.text
+        assert "Skipped non-speech audio" in out
+        assert "VAD: dropped 2/" in out
+
+    @patch('speech_recognition.Microphone')
+    def test_calibration_does_not_block_startup(self, mock_mic):
+        import threading
+        import numpy as np
+        release = threading.Event()
+        room = np.random.default_rng(0).normal(0, 200, 1600).astype(np.int16).tobytes()
+        source = MagicMock(SAMPLE_RATE=16000, CHUNK=1600)
+        source.stream.read.side_effect = lambda n: release.wait(5) and room
+        mock_mic.return_value.__enter__.return_value = source
+        self.config.noise_calibration_s = 0.5
+
+        handler = SpeechHandler(self.config, self.mock_parser, self.mock_mouse)
+        assert not handler.calibrated.is_set()  # constructed while the mic is still being sampled
+        assert handler.recognizer.energy_threshold == self.config.energy_threshold
+        release.set()
+        assert handler.calibrated.wait(5)
+
+        status = handler.noise_status()
+        assert status["calibrated"]
+        assert abs(status["noise_floor"] - 200) < 20
+        assert status["threshold"] == handler.recognizer.energy_threshold == status["noise_floor"] * 1.5
+        assert source.stream.read.call_count == 5
+
+    @patch('speech_recognition.Microphone')
+    @patch.object(sr.Recognizer, 'adjust_for_ambient_noise')
+    def test_noise_floor_tracked_between_phrases(self, mock_adjust, mock_mic):
+        import numpy as np
+        self.config.capture_overflow_policy = "block"
+        handler = SpeechHandler(self.config, self.mock_parser, self.mock_mouse)
+        handler.stop_callback = MagicMock()
+        levels = []
+        handler.set_noise_callback(lambda threshold, floor: levels.append(threshold))
+
+        rng = np.random.default_rng(2)
+        fan = sr.AudioData(rng.normal(0, 900, 32000).astype(np.int16).tobytes(), 16000, 2)
+        phrases = iter([fan, fan, "audio"])
+        handler.recognizer.listen = MagicMock(side_effect=lambda *a, **k: next(phrases))
+        handler.recognizer.recognize_google = MagicMock(side_effect=["click", "click", "stop"])
+
+        handler.start_listening()
+
+        assert handler.recognizer.energy_threshold > 1000  # a loud room raises the trigger level
+        assert levels == [handler.recognizer.energy_threshold]  # unchanged second reading not re-reported
+
+    def _fake_source(self, phrases):
+        """Mic source whose stream plays `phrases` loud chunks each, separated by silence."""
+        import numpy as np
+        loud = np.full(1600, 3000, np.int16).tobytes()
+        quiet = bytes(3200)
+        chunks = []
+        for words in phrases:
+            chunks += [loud] * words + [quiet] * 10
+        source = MagicMock(SAMPLE_RATE=16000, SAMPLE_WIDTH=2, CHUNK=1600)
+        stream = iter(chunks)
+        source.stream.read.side_effect = lambda n: next(stream, quiet)
+        return source
+
+    def test_ring_capture_keeps_phrase_onset(self):
+        import numpy as np
+        from audio_processing import AudioRingBuffer
+        soft = np.full(1600, 40, np.int16).tobytes()  # a quiet first consonant, below the threshold
+        loud = np.full(1600, 3000, np.int16).tobytes()
+        quiet = bytes(3200)
+        chunks = iter([quiet] * 5 + [soft] + [loud] * 3 + [quiet] * 10)
+        source = MagicMock(SAMPLE_RATE=16000, SAMPLE_WIDTH=2, CHUNK=1600)
+        source.stream.read.side_effect = lambda n: next(chunks)
+        self.config.capture_preroll_s = 0.1
+        self.config.capture_postroll_s = 0.2
+        ring = AudioRingBuffer.for_audio(10, 16000, 2)
+        self.handler.listening = True
+
+        start, audio = self.handler._cut_phrase(source, ring)
+
+        assert isinstance(audio.frame_data, memoryview)  # a view of the ring, not a copy
+        assert start == 5 * 3200
+        assert bytes(audio.frame_data) == soft + loud * 3 + quiet * 2
+        assert ring.written == (5 + 1 + 3 + 8) * 3200  # read up to pause_threshold of silence
+
+    @patch('speech_recognition.Microphone')
+    @patch.object(sr.Recognizer, 'adjust_for_ambient_noise')
+    def test_ring_capture_drives_pipeline(self, mock_adjust, mock_mic):
+        self.config.capture_ring_s = 5
+        self.config.recognizer_backend = "replay"
+        self.config.replay_transcripts = ["click", "scroll down", "stop"]
+        self.config.capture_overflow_policy = "block"
+        mock_mic.return_value.__enter__.return_value = self._fake_source([3, 4, 2])
+        handler = SpeechHandler(self.config, self.mock_parser, self.mock_mouse)
+        handler.stop_callback = MagicMock()
+        handler.recognizer.listen = MagicMock()
+
+        handler.start_listening()
+
+        executed = [c.args[0] for c in self.mock_parser.parse_command.call_args_list]
+        assert executed == ["click", "scroll down"]
+        handler.recognizer.listen.assert_not_called()
+
+    def test_overwritten_ring_audio_skipped(self, caplog):
+        from audio_processing import AudioRingBuffer
+        self.handler.listening = True
+        self.handler._ring = AudioRingBuffer(3200)
+        self.handler._ring.write(bytes(3200))
+        audio = sr.AudioData(self.handler._ring.segment(0, 3200), 16000, 2)
+        self.handler._ring.write(bytes(1600))  # the phrase waited too long in the queue
+        self.handler._ring_cuts = {0: 0}
+        self.handler.recognizer.recognize_google = MagicMock(return_value="click")
+        captured, results = StageQueue("capture"), StageQueue("execute")
+        captured.put((0, audio))
+        captured.close()
+
+        self.handler._recognize_worker(captured, results)
+
+        assert results.get() == (0, None)
+        self.handler.recognizer.recognize_google.assert_not_called()
+        assert "overwritten in the capture ring" in caplog.text
+
+    @patch('speech_recognition.Microphone')
+    @patch.object(sr.Recognizer, 'adjust_for_ambient_noise')
+    def test_streaming_commits_on_partial(self, mock_adjust, mock_mic):
+        from command_parser import CommandParser
+        self.config.recognizer_backend = "replay"
+        self.config.replay_transcripts = ["click", "click then scroll down", "stop"]
+        self.config.streaming_enabled = True
+        mock_mic.return_value.__enter__.return_value = self._fake_source([3, 4, 2])
+        self.mock_parser.early_command.side_effect = lambda p: p == "click"
+        self.mock_parser.continuation.side_effect = CommandParser.continuation
+        handler = SpeechHandler(self.config, self.mock_parser, self.mock_mouse)
+        handler.stop_callback = MagicMock()
+
+        handler.start_listening()
+
+        executed = [c.args[0] for c in self.mock_parser.parse_command.call_args_list]
+        assert executed == ["click", "click", "scroll down"]
+        handler.stop_callback.assert_called_once()
+        stats = handler.pipeline_stats()["streaming"]
+        assert stats == {"phrases": 3, "early_commits": 2, "confirmed": 1, "extended": 1, "cancelled": 0}
+
+    def test_streaming_guard_revokes_mismatched_commit(self):
+        self.mock_parser.continuation.return_value = None
+        jobs = StageQueue("execute")
+        committed = _StreamJob("click")
+        jobs.put(committed)
+
+        self.handler._guard(jobs, committed, "double click")
+
+        assert committed.revoked
+        self.mock_parser.cancel_plan.assert_not_called()  # still queued, so never started
+        jobs.close()
+        self.handler.listening = True
+        self.handler._stream_executor(jobs)
+        self.mock_parser.parse_command.assert_called_once_with("double click")
+        assert self.handler.pipeline_stats()["streaming"]["cancelled"] == 1
+
+    def test_streaming_guard_cancels_running_commit(self):
+        self.mock_parser.continuation.return_value = None
+        committed = _StreamJob("click")
+        self.handler._running_job = committed
+        self.handler._guard(StageQueue("execute"), committed, "double click")
+        self.mock_parser.cancel_plan.assert_called_once()
+
+
+class TestStageQueue:
+    def test_drop_oldest_evicts_and_reports(self):
+        dropped = []
+        q = StageQueue("capture", maxsize=2, policy="drop_oldest", on_drop=dropped.append)
+        for item in (1, 2, 3):
+            assert q.put(item)
+        assert dropped == [1]
+        assert q.get() == 2
+        stats = q.stats()
+        assert stats["dropped"] == 1
+        assert stats["high_water"] == 2
+        assert stats["depth"] == 1
+
+    def test_block_policy_times_out_when_full(self):
+        q = StageQueue("capture", maxsize=1, policy="block")
+        assert q.put("a")
+        assert q.put("b", timeout=0.01) is False
+        assert len(q) == 1
+
+    def test_close_drains_then_raises(self):
+        q = StageQueue("execute")
+        q.put("a")
+        q.close()
+        assert q.put("b") is False
+        assert q.get() == "a"
+        with pytest.raises(StageClosed):
+            q.get()
+
+    def test_get_timeout(self):
+        q = StageQueue("execute")
+        with pytest.raises(TimeoutError):
+            q.get(timeout=0.01)
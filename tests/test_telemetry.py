@@ -0,0 +1,88 @@
+"""
+Tests for telemetry.py
+"""
+
+import json
+from action_plan import Action, ActionPlan
+from telemetry import LatencyTracker, StartupTimer, percentile
+
+
+class TestStartupTimer:
+    def setup_method(self):
+        self.now = [10.0]
+        self.timer = StartupTimer(clock=lambda: self.now[0])
+
+    def test_milestones_measured_from_origin(self):
+        self.now[0] = 10.12
+        assert self.timer.mark("imports")
+        self.now[0] = 10.4
+        self.timer.mark("gui_ready")
+        assert round(self.timer.elapsed_ms("imports")) == 120
+        assert self.timer.summary() == "Startup: imports 120 ms | gui_ready 400 ms"
+
+    def test_first_mark_wins(self):
+        self.now[0] = 11.0
+        self.timer.mark("first_listen")
+        self.now[0] = 15.0
+        assert not self.timer.mark("first_listen")
+        assert self.timer.elapsed_ms("first_listen") == 1000.0
+        assert self.timer.elapsed_ms("gui_ready") is None
+
+
+class TestLatencyTracker:
+    def setup_method(self):
+        self.tracker = LatencyTracker(capacity=3)
+
+    def record(self, key, recognize_ms):
+        trace = self.tracker.begin(key)
+        trace.add("listen", 1.0)
+        trace.add("recognize", recognize_ms / 1000.0)
+        return self.tracker.finish(key, f"command {key}")
+
+    def test_percentile_nearest_rank(self):
+        values = list(range(1, 101))
+        assert percentile(values, 50) == 50
+        assert percentile(values, 95) == 95
+        assert percentile(values, 99) == 99
+        assert percentile([7], 99) == 7
+        assert percentile([], 50) is None
+
+    def test_ring_buffer_and_summary(self):
+        for key, ms in enumerate([100, 400, 200, 300]):
+            self.record(key, ms)
+        recent = self.tracker.recent()
+        assert [t["text"] for t in recent] == ["command 1", "command 2", "command 3"]  # oldest evicted
+        summary = self.tracker.summary()
+        assert summary["recognize"] == {"count": 3, "p50": 300.0, "p95": 400.0, "p99": 400.0}
+        assert summary["response"]["count"] == 3
+        assert "recognize: p50 300 | p95 400 | p99 400 ms (n=3)" in self.tracker.format_summary()
+
+    def test_plan_spans_and_unknown_keys(self):
+        plan = ActionPlan([Action("mouse", "click")])
+        plan.compile_s = 0.002
+        plan.run({"mouse": None})
+        trace = self.tracker.begin("job")
+        trace.add_plan(plan)
+        with self.tracker.span("gone", "recognize") as missing:
+            assert missing is None
+        self.tracker.discard("gone")
+        assert [name for name, _ in trace.spans] == ["parse", "mouse.click"]
+        assert trace.spans[0][1] == 2.0
+        assert self.tracker.finish("gone") is None
+
+    def test_on_complete_and_export(self, tmp_path):
+        done = []
+        self.tracker.on_complete = done.append
+        trace = self.record(0, 120)
+        assert done == [trace] and trace.response_ms is not None
+        path = tmp_path / "logs" / "latency.jsonl"
+        assert self.tracker.export_jsonl(str(path)) == 1
+        assert self.tracker.export_jsonl(str(path)) == 0  # nothing new since
+        self.record(1, 80)
+        assert self.tracker.export_jsonl(str(path)) == 1  # only the new trace is appended
+        lines = [json.loads(line) for line in path.read_text().splitlines()]
+        assert len(lines) == 2
+        assert lines[1]["text"] == "command 1"
+        assert self.tracker.export_jsonl(str(tmp_path / "other.jsonl")) == 2  # tracked per file
+        assert lines[0]["text"] == "command 0"
+        assert lines[0]["spans"] == [["listen", 1000.0], ["recognize", 120.0]]
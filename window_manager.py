@@ -1,5 +1,8 @@
 # window_manager.py
 import sys, subprocess, webbrowser, re
+from app_logging import get_logger
+
+logger = get_logger(__name__)
 
 class WindowManager:
     def __init__(self, site_aliases=None, preferred_browser=None):
@@ -28,9 +31,8 @@ class WindowManager:
         - If 'target' resolves to a URL, navigate to it.
         - Otherwise, just open the browser.
         """
-        print(f"[DEBUG] open() target='{target}'")  # NEW: debug
         url = self._to_url(target)
-        print(f"[DEBUG] resolved url={url}")  # NEW: debug
+        logger.debug("open() target='%s' resolved url=%s", target, url)
 
         if url:
             self.open_url(url)
@@ -59,7 +61,7 @@ class WindowManager:
         else:
             webbrowser.open(url)
 
-        print(f"Opening URL: {url}")
+        logger.info("Opening URL: %s", url)
 
     def open_browser(self):
         """
@@ -68,17 +70,17 @@ class WindowManager:
         if sys.platform == "darwin":
             app = self.preferred_browser or "Safari"
             subprocess.run(["open", "-a", app])
-            print(f"Opening browser app: {app}")
+            logger.info("Opening browser app: %s", app)
         elif sys.platform.startswith("win"):
             if self.preferred_browser and self.preferred_browser.lower() == "chrome":
                 try:
                     subprocess.Popen(["chrome"])
-                    print("Opening browser app: chrome")
+                    logger.info("Opening browser app: chrome")
                     return
                 except FileNotFoundError:
                     pass
             webbrowser.open("about:blank")
-            print("Opening default browser")
+            logger.info("Opening default browser")
         else:
             webbrowser.open("about:blank")
-            print("Opening default browser")
+            logger.info("Opening default browser")